@@ -0,0 +1,133 @@
+import numpy as np
+import pandas as pd
+
+from data_munging import serialize_dates
+
+# Output name -> pandas alias of the calendar period each bucket closes on
+FREQUENCIES = {
+    "weekly": "W",
+    "monthly": "ME",
+    "quarterly": "QE",
+    "yearly": "YE",
+}
+
+REDUCTIONS = ("mean", "sum", "compounded", "count")
+
+# 1970-01-01 is a Thursday; shifting by 3 days makes weeks run Monday..Sunday like resample("W")
+_WEEK_SHIFT = 3
+
+
+def period_codes(index: pd.DatetimeIndex) -> dict:
+    """
+    Computes integer bucket codes and period-end labels for every frequency in one pass.
+
+    Returns
+    -------
+    dict
+        Frequency name -> (codes, labels) where ``codes`` has one entry per row and
+        ``labels`` maps ``code - codes.min()`` to the period-end date as datetime64[D].
+    """
+    days = pd.DatetimeIndex(index).tz_localize(None).values.astype("datetime64[D]")
+    day_numbers = days.astype(np.int64)
+    months = days.astype("datetime64[M]").astype(np.int64)
+
+    weeks = (day_numbers + _WEEK_SHIFT) // 7
+    quarters = months // 3
+    years = days.astype("datetime64[Y]").astype(np.int64)
+
+    def _labels(codes, to_end):
+        span = np.arange(codes.min(), codes.max() + 1) if len(codes) else np.array([], dtype=np.int64)
+        return to_end(span)
+
+    return {
+        "weekly": (weeks, _labels(weeks, lambda w: (w * 7 + _WEEK_SHIFT).astype("datetime64[D]"))),
+        "monthly": (months, _labels(months, lambda m: (m + 1).astype("datetime64[M]").astype("datetime64[D]") - 1)),
+        "quarterly": (quarters, _labels(quarters, lambda q: (q * 3 + 3).astype("datetime64[M]").astype("datetime64[D]") - 1)),
+        "yearly": (years, _labels(years, lambda y: (y + 1).astype("datetime64[Y]").astype("datetime64[D]") - 1)),
+    }
+
+
+def aggregate_returns(returns: pd.Series, how=("mean",), frequencies=tuple(FREQUENCIES)) -> dict:
+    """
+    Aggregates daily returns to several calendar frequencies with one grouping pass.
+
+    Rows are bucketed once into week, month, quarter and year codes; because the index is
+    sorted every bucket is a contiguous run, so each reduction is a single ``np.add.reduceat``
+    over the bucket starts. Only periods that contain data are emitted, and NaN returns are
+    skipped the same way ``resample(...).mean()`` skips them.
+
+    Parameters
+    ----------
+    returns : pd.Series
+        Daily returns indexed by date
+    how : iterable of str
+        Reductions to compute, any of ``REDUCTIONS``. ``compounded`` is the period return
+        ``prod(1 + r) - 1``.
+    frequencies : iterable of str
+        Subset of ``FREQUENCIES`` to compute
+
+    Returns
+    -------
+    dict
+        Frequency name -> {"dates": [...], <reduction>: [...]} with dates as 'YYYY-MM-DD'
+    """
+    unknown = set(how) - set(REDUCTIONS)
+    if unknown:
+        raise ValueError(f"Unsupported reductions: {sorted(unknown)}")
+
+    if not returns.index.is_monotonic_increasing:
+        returns = returns.sort_index(kind="stable")
+
+    values = returns.to_numpy(dtype=float)
+    valid = ~np.isnan(values)
+    filled = np.where(valid, values, 0.0)
+    log_growth = np.log1p(filled) if "compounded" in how else None
+
+    output = {}
+    for name, (codes, labels) in period_codes(returns.index).items():
+        if name not in frequencies:
+            continue
+        if len(codes) == 0:
+            output[name] = {"dates": [], **{reduction: [] for reduction in how}}
+            continue
+
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(codes)) + 1))
+        counts = np.add.reduceat(valid.astype(np.int64), starts)
+        dates = labels[codes[starts] - codes.min()]
+
+        period = {"dates": np.datetime_as_string(dates, unit="D").tolist()}
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for reduction in how:
+                if reduction == "count":
+                    column = counts.astype(float)
+                elif reduction == "sum":
+                    column = np.where(counts > 0, np.add.reduceat(filled, starts), np.nan)
+                elif reduction == "mean":
+                    column = np.add.reduceat(filled, starts) / counts
+                else:
+                    column = np.where(counts > 0, np.expm1(np.add.reduceat(log_growth, starts)), np.nan)
+                period[reduction] = [None if np.isnan(v) else v for v in column.tolist()]
+        output[name] = period
+    return output
+
+
+def return_distribution(returns: pd.Series) -> dict:
+    """
+    Builds the ``distribution`` block returned by ``quant_stats``.
+
+    Each frequency keeps the period mean under "values" and adds the compounded period
+    return under "compounded".
+    """
+    distribution = {
+        "daily": {
+            "dates": serialize_dates(returns.index),
+            "values": returns.tolist(),
+        },
+    }
+    for name, period in aggregate_returns(returns, how=("mean", "compounded")).items():
+        distribution[name] = {
+            "dates": period["dates"],
+            "values": period["mean"],
+            "compounded": period["compounded"],
+        }
+    return distribution
@@ -1,27 +1,23 @@
 from flask import Flask, jsonify, request
 from flask_cors import CORS
-import pandas as pd
 import os
-import csv
 import warnings
 import logging
 
-from system import system
-from quant import quant_stats
-from data_access import DataAccess
-from data_munging import replace_nan_and_inf, replace_infinity_with_neg_one
-from glass_factory import (save_code_to_file, 
-                           import_custom_metric,
+# pandas, SQLAlchemy and quantstats (with matplotlib, seaborn and scipy) are imported inside
+# the routes that use them, so starting a worker does not pay for them up front.
+from glass_factory import (CUSTOM_CODE_DIR,
+                           save_code_to_file, 
                            get_all_custom_metrics, 
-                           load_custom_code, 
-                           execute_custom_code)
+                           load_custom_code)
+from metadata_service import HEADER_MAPPING, get_metadata_index
 
 # Set up logging
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     handlers=[
-        logging.FileHandler("custom_metrics.log"),
+        logging.FileHandler("custom_metrics.log", delay=True),
         logging.StreamHandler()
     ]
 )
@@ -38,77 +34,65 @@ warnings.filterwarnings("ignore", category=RuntimeWarning, message="invalid valu
 app = Flask(__name__)
 CORS(app)
 
-# Directory to store custom code files
-CUSTOM_CODE_DIR = os.path.join(os.getcwd(), "custom_metrics")
-os.makedirs(CUSTOM_CODE_DIR, exist_ok=True)
-logger.info(f"Custom metrics directory: {CUSTOM_CODE_DIR}")
-
 @app.route("/metadata", methods=["GET"])
 def write_metadata():
-    # Query contract metadata from the database using the DataAccess layer
-    data = DataAccess()
-    metadata_list = data.get_contract_metadata()
-    
-    app.logger.info(f"Fetched {len(metadata_list)} metadata records.")
-    
-    # Mapping of model property names to CSV header names
-    header_mapping = [
-        ("databento_symbol", "Databento Symbol"),
-        ("ib_symbol", "IB Symbol"),
-        ("name", "Name"),
-        ("exchange", "Exchange"),
-        ("intraday_initial_margin", "Intraday Initial Margin"),
-        ("intraday_maintenance_margin", "Intraday Maintenance Margin"),
-        ("overnight_initial_margin", "Overnight Initial Margin"),
-        ("overnight_maintenance_margin", "Overnight Maintenance Margin"),
-        ("asset_type", "Asset Type"),
-        ("sector", "Sector"),
-        ("contract_size", "Contract Size"),
-        ("units", "Units"),
-        ("minimum_price_fluctuation", "Minimum Price Fluctuation"),
-        ("tick_size", "Tick Size"),
-        ("settlement_type", "Settlement Type"),
-        ("trading_hours", "Trading Hours (EST)"),
-        ("data_provider", "Data Provider"),
-        ("dataset", "Dataset"),
-        ("newest_month_additions", "Newest Month Additions"),
-        ("contract_months", "Contract Months"),
-        ("time_of_expiry", "Time of Expiry")
-    ]
-    
-    # Extract CSV header names
-    csv_headers = [header for _, header in header_mapping]
+    index = get_metadata_index()
     
-    # Determine the project root directory.
-    # Since app.py is in root/backend/app.py, the project root is one directory up.
-    backend_dir = os.path.dirname(os.path.abspath(__file__))
-    project_root = os.path.dirname(backend_dir)
+    # Served from the in-memory index; the CSV is only rewritten when the content changes
+    try:
+        written = index.export_csv()
+        app.logger.info(f"Metadata CSV {'written' if written else 'unchanged'}: {index.csv_path}")
+    except Exception as e:
+        app.logger.error(f"Error writing CSV: {e}")
     
-    # Build the target folder path for frontend/public
-    target_folder = os.path.join(project_root, "frontend", "public")
-    os.makedirs(target_folder, exist_ok=True)
-    file_path = os.path.join(target_folder, "metadata.csv")
+    # Return the absolute file path in the response for debugging
+    return jsonify({"status": "CSV written successfully", "file": index.csv_path, "hash": index.content_hash})
+
+@app.route("/api/metadata", methods=["GET"])
+def query_metadata():
+    """
+    Filter, sort and paginate contract metadata without downloading the full CSV.
     
-    app.logger.info(f"Writing CSV to: {file_path}")
+    Query parameters:
+      sector, exchange, asset_type, ... : comma-separated accepted values per field
+      q        : case-insensitive search over name and symbols
+      sort     : model field to sort on (default databento_symbol)
+      order    : "asc" or "desc"
+      page     : 1-based page number
+      page_size: records per page (max 500)
+      refresh  : "true" to reload from the database
+    """
+    index = get_metadata_index()
+    args = request.args
+    field_names = {field for field, _ in HEADER_MAPPING}
+    filters = {
+        field: [value for value in args[field].split(",") if value]
+        for field in args if field in field_names
+    }
     
-    # Write metadata into metadata.csv (leaving the base CSV unchanged)
     try:
-        with open(file_path, "w", newline="", encoding="utf-8") as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=csv_headers)
-            writer.writeheader()
-            for record in metadata_list:
-                # Map the record's keys (from the model) to CSV header names
-                csv_row = {csv_header: record.get(model_field, "") for model_field, csv_header in header_mapping}
-                writer.writerow(csv_row)
-        if os.path.exists(file_path):
-            app.logger.info("CSV file written successfully.")
-        else:
-            app.logger.error("CSV file was not written!")
+        if args.get("refresh", "").lower() == "true":
+            index.refresh(force=True)
+        page = index.query(
+            filters=filters,
+            search=args.get("q", ""),
+            sort_by=args.get("sort", "databento_symbol"),
+            descending=args.get("order", "asc").lower() == "desc",
+            page=args.get("page", 1, type=int),
+            page_size=args.get("page_size", 50, type=int),
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
-        app.logger.error(f"Error writing CSV: {e}")
+        logger.error(f"Error in /api/metadata: {str(e)}")
+        return jsonify({"error": str(e)}), 500
     
-    # Return the absolute file path in the response for debugging
-    return jsonify({"status": "CSV written successfully", "file": file_path})
+    # Records use the same column names as metadata.csv
+    page["records"] = [
+        {header: record.get(field, "") for field, header in HEADER_MAPPING}
+        for record in page["records"]
+    ]
+    return jsonify(page)
 
 @app.route('/api/custom-metrics/<filename>', methods=['GET'])
 def get_custom_metric(filename):
@@ -157,26 +141,40 @@ def run_single_metric():
     if not code:
         return jsonify({"success": False, "error": "Metric file not found"}), 404
     
+    # Inputs declared in REQUIRES are resolved from a context for the requested category
+    from data_context import DataContext
+    from decimation import check_decimation
+    context = DataContext.from_params(data)
+    try:
+        max_points, decimation_method = check_decimation(data.get("maxPoints"), data.get("decimation", "lttb"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
     # Prepare input data if available
     input_data = data.get("data")
     if not input_data and "category" in data:
-        # If no data but category is specified, get data from system
+        # If no data but category is specified, get data from the cached system() output
         try:
-            strategy_groups = system()
-            category = data["category"]
-            
-            if category == "portfolio":
-                input_data = {"data": strategy_groups.get("portfolio")}
-            else:
-                group_df = strategy_groups.get(category)
-                if group_df is not None:
-                    pivot = group_df.pivot_table(values='close', index=group_df.index, columns='symbol')
-                    input_data = {"data": pivot.mean(axis=1).squeeze()}
+            input_data = {"data": context.get("category_prices")}
         except Exception as e:
             logger.error(f"Error preparing data for metric: {str(e)}")
     
-    # Execute the code
-    result = execute_custom_code(code, input_data)
+    # Execute the code, reusing the stored result when neither the code nor its inputs changed
+    from metric_cache import cached_execute
+    if data.get("profile"):
+        # Profile a real run, never a cache hit
+        from profiling import profile_call
+        result, report = profile_call(
+            lambda: cached_execute(code, input_data, use_cache=False, context=context)
+        )
+        result["profile"] = report
+    else:
+        result = cached_execute(code, input_data, use_cache=data.get("cache", True), context=context)
+
+    # Thin the chart to roughly one point per pixel if the client asked for it
+    if max_points and isinstance(result.get("chart_data"), dict):
+        from decimation import decimate_chart_data
+        result["chart_data"] = decimate_chart_data(result["chart_data"], max_points, decimation_method)
     
     return jsonify(result)
 
@@ -185,47 +183,13 @@ def run_custom_metrics():
     """
     Run selected custom metrics on provided data.
     """
+    from tasks import custom_metrics_task
+
     data = request.get_json()
-    if not data or "metrics" not in data:
-        return jsonify({"error": "Missing required fields"}), 400
-    
-    metrics = data["metrics"]
-    input_data = data.get("data")
-    
-    results = {}
-    for metric_filename in metrics:
-        logger.info(f"Running custom metric: {metric_filename}")
-        
-        # Try to import the module
-        module = import_custom_metric(metric_filename)
-        if module is None:
-            results[metric_filename] = {"success": False, "error": "Failed to import metric"}
-            continue
-        
-        # Check if the module has a custom_metric function
-        if hasattr(module, 'custom_metric') and callable(module.custom_metric):
-            try:
-                # Call the custom_metric function with the provided data
-                metric_result = module.custom_metric(input_data) if input_data else module.custom_metric()
-                results[metric_filename] = {
-                    "success": True,
-                    "metric_value": metric_result
-                }
-                logger.info(f"Successfully executed custom metric: {metric_filename}")
-            except Exception as e:
-                results[metric_filename] = {
-                    "success": False,
-                    "error": f"Error executing custom metric: {str(e)}"
-                }
-                logger.error(f"Error executing custom metric {metric_filename}: {str(e)}")
-        else:
-            # If no custom_metric function, try to execute the code directly
-            code = load_custom_code(metric_filename)
-            if code:
-                metric_result = execute_custom_code(code, input_data)
-                results[metric_filename] = metric_result
-            else:
-                results[metric_filename] = {"success": False, "error": "Metric file not found"}
+    try:
+        results = custom_metrics_task(data or {})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     
     return jsonify(results)
 
@@ -256,6 +220,76 @@ def custom_metrics():
                 "error": str(e)
             }), 500
 
+@app.route('/api/metric-cache', methods=['GET', 'DELETE'])
+def metric_cache_stats():
+    """
+    GET returns hit/miss statistics of the custom metric result cache; DELETE empties it.
+    """
+    from metric_cache import get_metric_cache
+
+    cache = get_metric_cache()
+    if request.method == 'DELETE':
+        cache.clear()
+        logger.info("Cleared custom metric cache")
+    return jsonify(cache.stats())
+
+def ndjson_response(records):
+    """
+    Streams an iterable of records as newline-delimited JSON, serialized like jsonify.
+    """
+    from flask import Response, stream_with_context
+
+    lines = (app.json.dumps(record) + "\n" for record in records)
+    return Response(
+        stream_with_context(lines),
+        mimetype="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+def stream_sections(first, sections):
+    """
+    NDJSON records for ``quantstats_sections`` output; an error after the first section
+    ends the stream with an "error" record since the status code is already sent.
+    """
+    yield {"section": first[0], "data": first[1]}
+    try:
+        for name, data in sections:
+            yield {"section": name, "data": data}
+    except Exception as e:
+        logger.error(f"Error streaming /api/quantstats: {str(e)}")
+        yield {"section": "error", "error": str(e)}
+        return
+    yield {"section": "done"}
+
+def stream_glassfactory(data):
+    """
+    Runs the glassfactory task on a worker thread and yields its printed lines as they
+    arrive, followed by the final payload.
+    """
+    import queue
+    import threading
+    from tasks import glassfactory_task
+
+    lines = queue.Queue()
+    outcome = {}
+
+    def run():
+        try:
+            outcome["data"] = glassfactory_task(data, on_output=lines.put)
+        except Exception as e:
+            logger.error(f"Error in /api/glassfactory: {str(e)}")
+            outcome["error"] = str(e)
+        finally:
+            lines.put(None)
+
+    threading.Thread(target=run, name="glassfactory-stream", daemon=True).start()
+    for line in iter(lines.get, None):
+        yield {"section": "stdout", "line": line}
+    if "error" in outcome:
+        yield {"section": "error", "error": outcome["error"]}
+    else:
+        yield {"section": "result", "data": outcome["data"]}
+
 @app.route('/api/glassfactory', methods=['POST'])
 def glass_factory():
     """
@@ -265,44 +299,26 @@ def glass_factory():
         "code": "print('Hello, World!')",
         "save": true,
         "name": "My Custom Metric",
-        "description": "Does something cool"
+        "description": "Does something cool",
+        "maxPoints": 1200,
+        "profile": false,
+        "stream": false
       }
+    With "stream": true the response is NDJSON: one {"section": "stdout", "line": ...}
+    record per printed line while the code runs, then {"section": "result", "data": ...}
+    with the usual payload (or {"section": "error", "error": ...}).
     """
+    from tasks import glassfactory_task
+
     try:
-        data = request.get_json()
-        if not data or "code" not in data:
-            return jsonify({"error": "No code provided"}), 400
-        
-        code = data["code"]
-        save_metric = data.get("save", False)
-        
-        # Execute the code
-        result = execute_custom_code(code)
-        
-        # Prepare response
-        response_data = {
-            "result": result.get("stdout", ""),
-            "success": result.get("success", False)
-        }
-        
-        # Add chart data if available
-        if "chart_data" in result:
-            response_data["chart_data"] = result["chart_data"]
-        
-        # Add error if any
-        if "error" in result:
-            response_data["error"] = result["error"]
-        
-        # Save the code if requested
-        if save_metric and "name" in data:
-            name = data["name"]
-            description = data.get("description", "")
-            filepath = save_code_to_file(code, name, description)
-            response_data["saved"] = True
-            response_data["filepath"] = filepath
-            logger.info(f"Saved custom metric from glassfactory: {name}")
-            
-        return jsonify(response_data)
+        data = request.get_json() or {}
+        if data.get("stream"):
+            if not data.get("code"):
+                return jsonify({"error": "No code provided"}), 400
+            return ndjson_response(stream_glassfactory(data))
+        return jsonify(glassfactory_task(data))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         logger.error(f"Error in /api/glassfactory: {str(e)}")
         return jsonify({"error": str(e)}), 500
@@ -316,148 +332,365 @@ def algo_scope():
     -------
     results : dict
         Jsonified dictionary of processed data filtered by the selected category.
+        With "stream": true in the payload the sections are streamed as NDJSON instead,
+        one {"section": name, "data": {...}} record each as soon as it is computed
+        (cumulative curves, rolling series, drawdowns, distribution, scalar metrics, then
+        each custom metric), ending with {"section": "done"}. A view already in the
+        response cache arrives as a single "cached" section.
+        "refresh": true recomputes instead of serving the cached payload.
+        "resolution" picks the bar size ("1d" by default, or e.g. "1h", "5m"; see
+        resample.RESOLUTIONS) and the annualization factor that goes with it.
+        "adjustment" picks the roll adjustment of continuous contracts ("ratio" by
+        default, "back" or "none").
     """
     try:
-        req_data = request.get_json()
-        # Get category (default "portfolio")
-        category = req_data.get("category", "portfolio")
-        # Get custom metrics to run (if any)
-        custom_metrics = req_data.get("customMetrics", [])
-        
-        logger.info(f"Running quantstats for category: {category}")
-        if custom_metrics:
-            logger.info(f"With custom metrics: {custom_metrics}")
+        from strategy_data import InsufficientDataError
+        from warmup import cached_quantstats, stream_quantstats
 
-        strategy_name = "Mean Reversion"
-        benchmark_name = "Index"
+        req_data = request.get_json() or {}
+        refresh = bool(req_data.get("refresh", False))
+        if req_data.get("stream"):
+            sections = stream_quantstats(req_data, refresh=refresh)
+            # Compute the first section here so loading errors keep their status codes
+            first = next(sections)
+            return ndjson_response(stream_sections(first, sections))
 
-        # Get the grouped dataframes from system
-        strategy_groups = system()
-        print(strategy_groups)
+        # Views warmed after the last ingest are served from the response cache
+        results = cached_quantstats(req_data, refresh=refresh)
+        return jsonify(results), 200
 
-        # Extract the appropriate series based on category.
-        if category == "portfolio":
-            strategy_filtered = strategy_groups.get("portfolio")
-        else:
-            group_df = strategy_groups.get(category)
-            if group_df is None:
-                raise ValueError(f"No data available for category '{category}'.")
-            # Pivot to get a series of average closes.
-            pivot = group_df.pivot_table(values='close', index=group_df.index, columns='symbol')
-            strategy_filtered = pivot.mean(axis=1).squeeze()
-
-        if strategy_filtered is None:
-            raise ValueError(f"No data available for category '{category}'.")
-
-        logger.info(f"Strategy data shape before processing: {strategy_filtered.shape}")
-        logger.info(f"Date range: {strategy_filtered.index.min()} to {strategy_filtered.index.max()}")
-
-        # Process the strategy series: convert to numeric, drop NAs, and compute percentage change.
-        strategy_processed = pd.to_numeric(strategy_filtered, errors='coerce')
-        strategy_processed = strategy_processed.dropna().pct_change().dropna()
-        
-        logger.info(f"Strategy data shape after processing: {strategy_processed.shape}")
-
-        # Check if we have enough data to proceed
-        if len(strategy_processed) < 2:
-            return jsonify({"error": "Insufficient strategy data for analysis"}), 400
-
-        # ----- Load benchmark data -----
-        sg_trend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), 'SG Trend Index.xlsx'))
-        benchmark = pd.read_excel(sg_trend_dir, skiprows=6)
-        benchmark.columns = [col.strip() for col in benchmark.columns]
-        benchmark.rename(columns={'PX_LAST': 'close', 'date': 'Date'}, inplace=True)
-        benchmark['Date'] = pd.to_datetime(benchmark['Date'])
-        benchmark.set_index('Date', inplace=True)
-        benchmark = benchmark.squeeze()
-
-        # Process benchmark data - no date filtering here either
-        benchmark = pd.to_numeric(benchmark, errors='coerce')
-        benchmark = benchmark.pct_change().dropna()
+    except ImportError as e:
+        logger.error(f"Error importing user function: {str(e)}")
+        return jsonify({"error": "Failed to load user function"}), 500
+    except InsufficientDataError as e:
+        return jsonify({"error": str(e)}), 400
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error in /api/quantstats: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/quantstats/checkpoints', methods=['POST'])
+def quantstats_checkpoints():
+    """
+    Returns headline metrics as of every checkpoint (month-end by default) for the
+    backtesting time-machine.
+    Expected JSON format:
+      {
+        "category": "portfolio",
+        "mode": "expanding",          # or "walk_forward"
+        "lookback": 252,              # window length for "walk_forward"
+        "frequency": "monthly",       # weekly, monthly, quarterly or yearly
+        "checkpoints": ["2020-03-31"] # optional explicit cutoffs instead of a frequency
+      }
+    """
+    try:
+        from benchmarks import DEFAULT_BENCHMARK, check_benchmarks
+        from strategy_data import InsufficientDataError, load_aligned_returns
+        from walk_forward import checkpoint_metrics, serialize_checkpoint_table
+        from data_munging import replace_nan_and_inf
+
+        data = request.get_json() or {}
+        category = data.get("category", "portfolio")
+        strategy_returns, benchmark = load_aligned_returns(
+            category, weighting=data.get("weighting", "price"), rebalance=data.get("rebalance", "monthly"),
+            benchmark=check_benchmarks(data.get("benchmark") or DEFAULT_BENCHMARK)[0],
+        )
         
-        logger.info(f"Benchmark data shape after processing: {benchmark.shape}")
+        table = checkpoint_metrics(
+            strategy_returns,
+            benchmark,
+            checkpoints=data.get("checkpoints"),
+            frequency=data.get("frequency", "monthly"),
+            mode=data.get("mode", "expanding"),
+            lookback=int(data.get("lookback", 252)),
+        )
+        results = serialize_checkpoint_table(table)
+        results["mode"] = data.get("mode", "expanding")
+        return jsonify(replace_nan_and_inf(results))
+    except ImportError as e:
+        logger.error(f"Error importing checkpoint dependencies: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+    except InsufficientDataError as e:
+        return jsonify({"error": str(e)}), 400
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error in /api/quantstats/checkpoints: {str(e)}")
+        return jsonify({"error": str(e)}), 500
 
-        # Check if we have enough benchmark data
-        if len(benchmark) < 2:
-            return jsonify({"error": "Insufficient benchmark data for analysis"}), 400
+@app.route('/api/sweep', methods=['POST'])
+def sweep():
+    """
+    Runs headline and rolling metrics for every combination of a grid of quant_stats
+    settings and returns one row per cell, with the time each cell took.
+    Expected JSON format:
+      {
+        "grid": {
+          "categories": ["portfolio", "futures"],
+          "benchmarks": ["SG Trend"],
+          "windows": [21, 30, 63],              # rolling window lengths
+          "rf": [0.0, 0.02],                    # annualized risk-free rates
+          "periods": [252],                     # periods per year
+          "dateRanges": [[null, null], ["2020-01-01", "2022-12-31"]]
+        },
+        "workers": 4                            # optional, at most (and by default) the CPU count
+      }
+    Large grids can be queued as a "sweep" job on /api/jobs instead.
+    """
+    try:
+        from strategy_data import InsufficientDataError
+        from tasks import sweep_task
 
-        # Ensure both series are sorted.
-        strategy_processed = strategy_processed.sort_index(ascending=True)
-        benchmark = benchmark.sort_index(ascending=True)
+        data = request.get_json() or {}
+        return jsonify(sweep_task(data))
+    except InsufficientDataError as e:
+        return jsonify({"error": str(e)}), 400
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error in /api/sweep: {str(e)}")
+        return jsonify({"error": str(e)}), 500
 
-        # Align both series on their common dates.
-        common_dates = strategy_processed.index.intersection(benchmark.index)
-        logger.info(f"Number of common dates: {len(common_dates)}")
-        
-        # Check if we have enough common dates
-        if len(common_dates) < 2:
-            return jsonify({"error": "Insufficient overlapping data between strategy and benchmark"}), 400
-            
-        strategy_processed = strategy_processed.loc[common_dates]
-        benchmark = benchmark.loc[common_dates]
-        
-        logger.info(f"Final data shapes - Strategy: {strategy_processed.shape}, Benchmark: {benchmark.shape}")
-
-        # Run quant_stats calculations with warning suppression
-        with warnings.catch_warnings():
-            warnings.simplefilter("ignore", category=RuntimeWarning)
-            results = quant_stats(strategy_name, strategy_processed, benchmark_name, benchmark)
-            
-        # Post-process results to handle any remaining NaN or infinity values
-        results = replace_infinity_with_neg_one(results)
-        results = replace_nan_and_inf(results)
+@app.route('/api/benchmarks', methods=['GET'])
+def list_benchmarks():
+    """
+    Lists the registered benchmarks, whether their data is present and which one is the
+    default; pass names as "benchmark" / "benchmarks" to /api/quantstats.
+    """
+    from benchmarks import BENCHMARKS, DEFAULT_BENCHMARK, available_benchmarks
+
+    available = set(available_benchmarks())
+    return jsonify({
+        "default": DEFAULT_BENCHMARK,
+        "benchmarks": [
+            {"name": name, "description": source["description"], "available": name in available}
+            for name, source in BENCHMARKS.items()
+        ],
+    })
+
+@app.route('/api/rolls', methods=['GET'])
+def list_rolls():
+    """
+    Lists the roll dates found for every continuous contract loaded by system().
+    Query parameters: "source" ("auto", "metadata" or "detect") and "resolution".
+    """
+    try:
+        from rolls import ROLL_SOURCES, get_roll_dates
+        from system import END_DATE, START_DATE, SYMBOLS
+
+        source = request.args.get("source", "auto")
+        if source not in ROLL_SOURCES:
+            return jsonify({"error": f"Unknown roll source '{source}'; use one of {list(ROLL_SOURCES)}"}), 400
+        resolution = request.args.get("resolution", "1d")
+        return jsonify({
+            "source": source,
+            "resolution": resolution,
+            "rolls": get_roll_dates(START_DATE, END_DATE, SYMBOLS, resolution=resolution, source=source),
+        })
+    except Exception as e:
+        logger.error(f"Error in /api/rolls: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/group-prices', methods=['GET'])
+def list_group_prices():
+    """
+    Group and portfolio average closes per time bucket, aggregated in the database.
+    Query parameters: "bucket" ("hour", "day", "week" or "month", default "week"),
+    "resolution" (bar table to read, default "1d") and "returns" (true for returns).
+    """
+    try:
+        from data_access import BUCKETS
+        from data_munging import make_serializable
+        from system import group_prices
+
+        bucket = request.args.get("bucket", "week")
+        if bucket not in BUCKETS:
+            return jsonify({"error": f"Unknown bucket '{bucket}'; use one of {list(BUCKETS)}"}), 400
+        returns = request.args.get("returns", "false").lower() in ("1", "true", "yes")
+        prices = group_prices(bucket=bucket, resolution=request.args.get("resolution", "1d"), returns=returns)
+        return jsonify({
+            "bucket": bucket,
+            "returns": returns,
+            "groups": {column: make_serializable(prices[column]) for column in prices.columns},
+        })
+    except Exception as e:
+        logger.error(f"Error in /api/group-prices: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/time-machine', methods=['POST'])
+def time_machine():
+    """
+    Returns holdings and prices as of one or many moments in time.
+    Expected JSON format:
+      {
+        "timestamp": "2020-03-16",             # or "timestamps": ["2020-03-16", ...]
+        "symbols": ["CL.v.0"],                 # optional, defaults to every symbol
+        "category": "futures",                 # optional, restricts symbols to one group
+        "refresh": false                       # optional, rebuild the index from the database
+      }
+    """
+    from time_machine import get_time_machine
+
+    data = request.get_json() or {}
+    if "timestamp" not in data and "timestamps" not in data:
+        return jsonify({"error": "Missing timestamp or timestamps"}), 400
+    
+    try:
+        index = get_time_machine(refresh=data.get("refresh", False))
+        symbols = data.get("symbols")
+        category = data.get("category")
+        if category and category != "portfolio":
+            symbols = [s for s in (symbols or index.symbols) if index.group_of.get(s) == category]
         
-        # Run custom metrics if requested
-        if custom_metrics:
-            logger.info(f"Running {len(custom_metrics)} custom metrics")
-            custom_results = {}
-            data_for_metrics = {
-                "strategy": strategy_processed,
-                "benchmark": benchmark,
-                "strategy_name": strategy_name,
-                "benchmark_name": benchmark_name
-            }
-            
-            for metric_filename in custom_metrics:
-                logger.info(f"Running custom metric: {metric_filename}")
-                code = load_custom_code(metric_filename)
-                if code:
-                    metric_result = execute_custom_code(code, data_for_metrics)
-                    
-                    # Extract the metric name from filename
-                    metric_name = os.path.splitext(metric_filename)[0]
-                    
-                    # Add metric value to results if available
-                    if metric_result.get("success", False):
-                        if "metric_value" in metric_result:
-                            results[f"custom_{metric_name}"] = metric_result["metric_value"]
-                            logger.info(f"Added custom metric value for {metric_name}")
-                        
-                        # Add chart data if available
-                        if "chart_data" in metric_result:
-                            if "charts" not in results:
-                                results["charts"] = {}
-                            results["charts"][metric_name] = metric_result["chart_data"]
-                            logger.info(f"Added custom chart for {metric_name}")
-                    else:
-                        # Log error
-                        error_msg = metric_result.get("error", "Unknown error")
-                        logger.error(f"Error running custom metric {metric_name}: {error_msg}")
-                        
-                        # Add error information to results
-                        if "charts" not in results:
-                            results["charts"] = {}
-                        results["charts"][f"error_{metric_name}"] = {"error": error_msg}
-                else:
-                    logger.error(f"Custom metric file not found: {metric_filename}")
+        if "timestamps" in data:
+            result = index.as_of_many(data["timestamps"], symbols)
+        else:
+            result = index.as_of(data["timestamp"], symbols)
+        return jsonify(result)
+    except KeyError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error in /api/time-machine: {str(e)}")
+        return jsonify({"error": str(e)}), 500
 
-        return jsonify(results), 200
+@app.route('/api/correlation', methods=['GET'])
+def correlation():
+    """
+    Returns cached covariance and correlation matrices for the symbol universe.
+    Query parameters:
+      kind      "ewma" (default) or "rolling"
+      lookback  half-life for "ewma", window length for "rolling" (default 63), at most
+                the history length
+      symbols   optional comma-separated subset
+      ordering  "clustered" (default), "alphabetical" or "none"
+      refresh   "true" to fold in bars loaded since the last sync
+    """
+    from correlation import get_correlation_service, serialize_matrices
 
-    except ImportError as e:
-        logger.error(f"Error importing user function: {str(e)}")
-        return jsonify({"error": "Failed to load user function"}), 500
+    try:
+        service = get_correlation_service(refresh=request.args.get("refresh", "false").lower() == "true")
+        symbols = request.args.get("symbols")
+        matrices = service.matrices(
+            kind=request.args.get("kind", "ewma"),
+            lookback=int(request.args.get("lookback", 63)),
+            symbols=symbols.split(",") if symbols else None,
+            ordering=request.args.get("ordering", "clustered"),
+        )
+        return jsonify(serialize_matrices(matrices))
+    except (KeyError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
-        logger.error(f"Error in /api/quantstats: {str(e)}")
+        logger.error(f"Error in /api/correlation: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/jobs', methods=['GET', 'POST'])
+def jobs():
+    """
+    POST queues a computation and returns its job ID; GET lists recent jobs.
+    Expected JSON format:
+      {
+        "kind": "quantstats",         # quantstats, custom_metrics, glassfactory or sweep
+        "params": {...},              # the payload the synchronous endpoint takes
+        "lane": "interactive",        # or "batch" (default) for heavy research runs
+        "priority": 0                 # higher runs first within its lane
+      }
+    Query parameters for GET:
+      state  optional filter (queued, running, succeeded, failed, cancelled)
+      limit  number of jobs to return (default 50)
+    """
+    from jobs import get_job_manager
+
+    manager = get_job_manager()
+    if request.method == 'GET':
+        return jsonify(manager.list(request.args.get("state"), request.args.get("limit", 50, type=int)))
+
+    data = request.get_json() or {}
+    if "kind" not in data:
+        return jsonify({"error": "Missing job kind"}), 400
+    try:
+        job_id = manager.submit(
+            data["kind"], data.get("params", {}),
+            lane=data.get("lane", "batch"), priority=data.get("priority", 0),
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"job_id": job_id, "state": "queued"}), 202
+
+@app.route('/api/jobs/<job_id>', methods=['GET', 'DELETE'])
+def job(job_id):
+    """
+    GET returns a job's state, progress and, once it succeeded, its result; DELETE cancels it.
+    """
+    from jobs import get_job_manager
+
+    manager = get_job_manager()
+    if request.method == 'DELETE' and not manager.cancel(job_id):
+        if manager.get(job_id, include_result=False) is None:
+            return jsonify({"error": "Job not found"}), 404
+        return jsonify({"error": "Job already finished"}), 409
+    record = manager.get(job_id, include_result=request.method == 'GET')
+    if record is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(record)
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """
+    Server-sent events with the job's state and progress on every change; the last
+    event carries the result (or error) and the stream then closes.
+    """
+    import json
+    from flask import Response
+    from jobs import FINISHED_STATES, get_job_manager
+
+    manager = get_job_manager()
+    if manager.get(job_id, include_result=False) is None:
+        return jsonify({"error": "Job not found"}), 404
+
+    def stream():
+        version = 0
+        while True:
+            record = manager.get(job_id, include_result=False)
+            finished = record["state"] in FINISHED_STATES
+            if finished:
+                record = manager.get(job_id)
+            yield f"event: {record['state']}\ndata: {json.dumps(record)}\n\n"
+            if finished:
+                return
+            version = manager.wait(job_id, version)
+
+    return Response(stream(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.route('/api/warmup', methods=['GET', 'POST'])
+def warmup():
+    """
+    GET returns the last warm-up report and response cache statistics. POST queues a
+    warm-up job (batch lane) and returns its ID, or runs it inline with "wait": true.
+    Expected JSON format:
+      {
+        "concurrency": 2,   # views computed at once
+        "popular": 5,       # most requested non-default views to warm as well
+        "wait": false
+      }
+    """
+    from warmup import get_response_cache, last_report
+
+    if request.method == 'GET':
+        return jsonify({"last": last_report(), "cache": get_response_cache().stats()})
+
+    data = request.get_json(silent=True) or {}
+    params = {key: data[key] for key in ("concurrency", "popular") if key in data}
+    params["reason"] = "manual"
+    try:
+        if data.get("wait"):
+            from tasks import warmup_task
+            return jsonify(warmup_task(params))
+        from jobs import get_job_manager
+        job_id = get_job_manager().submit("warmup", params, lane="batch", priority=10)
+        return jsonify({"job_id": job_id, "state": "queued"}), 202
+    except Exception as e:
+        logger.error(f"Error in /api/warmup: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
 @app.route('/')
@@ -470,6 +703,15 @@ def index():
 
 if __name__ == "__main__":
     logger.info("Starting Flask application")
+    logger.info(f"Custom metrics directory: {CUSTOM_CODE_DIR}")
+
+    # Refresh caches after bars are inserted by this process, and optionally poll for
+    # bars loaded elsewhere (WARMUP_INTERVAL_SECONDS, e.g. 900)
+    from warmup import install_ingest_hook, start_scheduler
+    install_ingest_hook()
+    if os.getenv("WARMUP_INTERVAL_SECONDS"):
+        start_scheduler(float(os.getenv("WARMUP_INTERVAL_SECONDS")))
+        logger.info(f"Scheduled warm-up every {os.getenv('WARMUP_INTERVAL_SECONDS')}s")
     try:
         app.run(host="0.0.0.0", port=5000, debug=True, use_reloader=False)
     except KeyboardInterrupt:
@@ -0,0 +1,96 @@
+"""
+Import-time benchmark for the backend process.
+
+Imports ``app`` in fresh interpreters with ``-X importtime`` and reports the median cold
+import time, the slowest top-level imports, and whether any heavy dependency was loaded
+eagerly. Exits non-zero when the budget is exceeded or a deferred module leaks in, so it
+can be run next to the rest of the checks:
+
+    python bench_import_time.py --runs 5 --budget-ms 1500
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+# Modules that must only be imported on first use
+DEFERRED_MODULES = ("quantstats", "matplotlib", "seaborn", "scipy", "pandas", "sqlalchemy", "openpyxl", "dotenv")
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def measure_once(module: str) -> tuple:
+    """
+    Imports ``module`` in a new interpreter.
+
+    Returns
+    -------
+    tuple
+        (total import time in ms, {module: cumulative ms}, eagerly loaded deferred modules)
+    """
+    probe = (
+        f"import sys, {module}; "
+        f"print(','.join(m for m in {DEFERRED_MODULES!r} if m in sys.modules))"
+    )
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", probe],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+    )
+
+    top_level = {}
+    cumulative_by_module = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        cumulative = cumulative.strip()
+        if not cumulative.isdigit():
+            continue
+        elapsed = int(cumulative) / 1000.0
+        cumulative_by_module[name.strip()] = elapsed
+        # Nested imports are indented by two extra spaces per level in the module column
+        if name.startswith(" ") and not name.startswith("  "):
+            top_level[name.strip()] = elapsed
+
+    leaked = [m for m in completed.stdout.strip().split(",") if m]
+    return top_level.get(module, sum(top_level.values())), cumulative_by_module, leaked
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app", help="module to import (default: app)")
+    parser.add_argument("--runs", type=int, default=5, help="number of cold imports to time")
+    parser.add_argument("--budget-ms", type=float, default=1500.0, help="fail when the median exceeds this")
+    parser.add_argument("--top", type=int, default=10, help="number of slowest imports to list")
+    args = parser.parse_args()
+
+    totals = []
+    slowest = {}
+    leaked = set()
+    for _ in range(args.runs):
+        total, by_module, eager = measure_once(args.module)
+        totals.append(total)
+        leaked.update(eager)
+        for name, elapsed in by_module.items():
+            if name != args.module:
+                slowest[name] = max(slowest.get(name, 0.0), elapsed)
+
+    median = statistics.median(totals)
+    print(f"import {args.module}: median {median:.1f} ms over {args.runs} runs "
+          f"(min {min(totals):.1f} ms, max {max(totals):.1f} ms)")
+    for name, elapsed in sorted(slowest.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {elapsed:8.1f} ms  {name}")
+
+    failed = False
+    if leaked:
+        print(f"FAIL: deferred modules imported eagerly: {', '.join(sorted(leaked))}")
+        failed = True
+    if median > args.budget_ms:
+        print(f"FAIL: median import time {median:.1f} ms exceeds budget {args.budget_ms:.1f} ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
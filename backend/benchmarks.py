@@ -0,0 +1,159 @@
+import logging
+import os
+from functools import lru_cache
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+BENCHMARK_DIR = os.path.abspath(os.path.dirname(__file__))
+SG_TREND_INDEX_PATH = os.path.join(BENCHMARK_DIR, 'SG Trend Index.xlsx')
+SG_CTA_INDEX_PATH = os.path.join(BENCHMARK_DIR, 'SG CTA Index.xlsx')
+
+# Benchmark quant_stats compares against (reported under the "Index" keys)
+DEFAULT_BENCHMARK = "SG Trend"
+
+# Benchmark name -> source. Workbook entries are Bloomberg exports (Date / PX_LAST);
+# rate entries are a constant annual rate compounded daily, e.g. a risk-free proxy.
+BENCHMARKS = {}
+
+
+def register_benchmark(name: str, description: str = "", path: str = None, annual_rate: float = None) -> None:
+    """
+    Adds a benchmark to the registry. Exactly one of ``path`` (a workbook in the same
+    format as the SG Trend export) or ``annual_rate`` must be given.
+    """
+    if (path is None) == (annual_rate is None):
+        raise ValueError("Give either a workbook path or an annual rate.")
+    BENCHMARKS[name] = {"description": description, "path": path, "annual_rate": annual_rate}
+
+
+register_benchmark("SG Trend", "SG Trend Index (NEIXCTAT)", path=SG_TREND_INDEX_PATH)
+register_benchmark("SG CTA", "SG CTA Index (NEIXCTA), if the workbook is present", path=SG_CTA_INDEX_PATH)
+register_benchmark("Risk-free", "Constant RISK_FREE_RATE (annual, default 0)",
+                   annual_rate=float(os.getenv("RISK_FREE_RATE", "0.0")))
+
+
+@lru_cache(maxsize=8)
+def _read_benchmark_returns(path: str, modified: float) -> pd.Series:
+    """
+    Parses a Bloomberg-style benchmark workbook into a sorted daily returns series.
+
+    ``modified`` is only part of the cache key, so replacing the workbook invalidates the
+    cached series. openpyxl is loaded by pandas here, i.e. only when the cache is cold.
+    """
+    benchmark = pd.read_excel(path, skiprows=6)
+    benchmark.columns = [col.strip() for col in benchmark.columns]
+    benchmark.rename(columns={'PX_LAST': 'close', 'date': 'Date'}, inplace=True)
+    benchmark['Date'] = pd.to_datetime(benchmark['Date'])
+    benchmark.set_index('Date', inplace=True)
+    benchmark = benchmark.squeeze()
+
+    benchmark = pd.to_numeric(benchmark, errors='coerce')
+    benchmark = benchmark.pct_change().dropna()
+    return benchmark.sort_index(ascending=True)
+
+
+def load_benchmark_returns(path: str = SG_TREND_INDEX_PATH) -> pd.Series:
+    """
+    Returns the benchmark's daily returns, reading the workbook only on the first call.
+
+    Parameters
+    ----------
+    path : str
+        Path to the benchmark workbook (defaults to the SG Trend Index)
+
+    Returns
+    -------
+    pd.Series
+        A copy of the cached returns, safe for callers to modify
+    """
+    return _read_benchmark_returns(path, os.path.getmtime(path)).copy()
+
+
+def available_benchmarks() -> list:
+    """Names of registered benchmarks whose data is present."""
+    return [
+        name for name, source in BENCHMARKS.items()
+        if source["path"] is None or os.path.exists(source["path"])
+    ]
+
+
+def check_benchmarks(names) -> list:
+    """
+    Returns ``names`` (one name or a list of them) as a list if every one is registered,
+    else raises ValueError listing the options; call it on request input before loading.
+    """
+    listed = [names] if isinstance(names, str) else names
+    if not isinstance(listed, (list, tuple)) or not all(isinstance(name, str) for name in listed):
+        raise ValueError(f"Benchmarks must be a name or a list of names, got {names!r}.")
+    unknown = [name for name in listed if name not in BENCHMARKS]
+    if unknown:
+        raise ValueError(f"Unknown benchmark(s) {unknown}; registered: {sorted(BENCHMARKS)}")
+    return list(listed)
+
+
+def load_benchmark(name: str = DEFAULT_BENCHMARK, index: pd.Index = None) -> pd.Series:
+    """
+    Daily returns of a registered benchmark.
+
+    Parameters
+    ----------
+    name : str
+        Registry name, see ``BENCHMARKS``
+    index : pd.Index, optional
+        Dates to build a rate benchmark on; workbook benchmarks ignore it
+
+    Raises
+    ------
+    KeyError
+        For an unregistered name
+    ValueError
+        If the workbook is missing, or a rate benchmark is requested without an index
+    """
+    if name not in BENCHMARKS:
+        raise KeyError(f"Unknown benchmark '{name}'; registered: {sorted(BENCHMARKS)}")
+    source = BENCHMARKS[name]
+    if source["path"] is not None:
+        if not os.path.exists(source["path"]):
+            raise ValueError(f"Benchmark '{name}' has no data at {source['path']}")
+        return load_benchmark_returns(source["path"]).rename(name)
+    if index is None:
+        raise ValueError(f"Benchmark '{name}' is a constant rate and needs an index")
+    daily = (1.0 + source["annual_rate"]) ** (1.0 / 252) - 1.0
+    return pd.Series(daily, index=index, name=name)
+
+
+def benchmark_matrix(index: pd.Index, names: list = None) -> pd.DataFrame:
+    """
+    Aligns several benchmarks on ``index`` as one date x benchmark returns matrix.
+
+    Each series is placed on the strategy's dates through the trading calendar's session
+    positions; dates a benchmark did not trade on stay NaN (they are not filled, so no
+    return is invented). On an intraday index each day's return is spread over that day's
+    bars (see ``resample.bars_from_daily``).
+
+    Parameters
+    ----------
+    index : pd.Index
+        Dates to align on, normally the strategy returns' index
+    names : list, optional
+        Benchmarks to include; defaults to every available one
+
+    Returns
+    -------
+    pd.DataFrame
+        One float column per benchmark, in ``names`` order
+    """
+    if names is None:
+        names = available_benchmarks()
+    from resample import bars_from_daily, is_intraday
+    from trading_calendar import get_trading_calendar
+
+    if is_intraday(index):
+        sessions = index.normalize().unique()
+        columns = {name: bars_from_daily(load_benchmark(name, sessions), index).to_numpy() for name in names}
+    else:
+        calendar = get_trading_calendar()
+        columns = {name: calendar.reindex(load_benchmark(name, index), index) for name in names}
+    return pd.DataFrame(columns, index=index, columns=list(names), dtype=float)
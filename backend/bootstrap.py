@@ -0,0 +1,225 @@
+import numbers
+
+import numpy as np
+import pandas as pd
+
+from process_pool import check_workers, get_process_pool
+
+HEADLINE_METRICS = ("sharpe", "sortino", "max_drawdown", "cagr", "volatility")
+
+# Upper bounds on what one request may ask for
+MAX_PATHS = 10_000
+MAX_MEAN_BLOCK = 1_000
+
+# Roughly how many float64-sized buffers of (observations x paths) a chunk keeps alive at once
+_BUFFERS_PER_CELL = 6
+
+
+def stationary_bootstrap_indices(n_obs: int, n_paths: int, mean_block: float, rng: np.random.Generator) -> np.ndarray:
+    """
+    Draws Politis-Romano stationary bootstrap indices for many paths at once.
+
+    Each path is a sequence of blocks with geometrically distributed lengths (mean
+    ``mean_block``) that start at uniformly random positions and wrap around the end of
+    the sample.
+
+    Returns
+    -------
+    np.ndarray
+        Integer matrix of shape (n_obs, n_paths); column j indexes the j-th resampled path
+    """
+    steps = np.arange(n_obs)[:, None]
+    new_block = rng.random((n_obs, n_paths)) < 1.0 / max(mean_block, 1.0)
+    new_block[0] = True
+
+    # Position of the most recent block start for every cell, carried forward down each column
+    block_row = np.maximum.accumulate(np.where(new_block, steps, 0), axis=0)
+    block_start = np.zeros((n_obs, n_paths), dtype=np.int64)
+    block_start[new_block] = rng.integers(0, n_obs, size=int(new_block.sum()))
+    block_start = np.take_along_axis(block_start, block_row, axis=0)
+
+    return (block_start + (steps - block_row)) % n_obs
+
+
+def headline_metrics(paths: np.ndarray, periods: int = 252) -> dict:
+    """
+    Computes the headline metrics for every column of a returns matrix.
+
+    As in quantstats, Sharpe and volatility use the sample standard deviation, Sortino
+    divides by ``sqrt(sum(r[r < 0] ** 2) / n)`` and max drawdown starts from a baseline of
+    1.0. CAGR annualizes over ``n / periods`` years of observations, not calendar years.
+    """
+    n_obs = paths.shape[0]
+    annual = np.sqrt(periods)
+    mean = paths.mean(axis=0)
+    std = paths.std(axis=0, ddof=1)
+    downside = np.sqrt((np.minimum(paths, 0.0) ** 2).sum(axis=0) / n_obs)
+
+    log_wealth = np.cumsum(np.log1p(paths), axis=0)
+    peaks = np.maximum(np.maximum.accumulate(log_wealth, axis=0), 0.0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return {
+            "sharpe": mean / std * annual,
+            "sortino": np.where(downside > 0, mean / downside * annual, np.nan),
+            "max_drawdown": np.expm1((log_wealth - peaks).min(axis=0)),
+            "cagr": np.expm1(log_wealth[-1] * periods / n_obs),
+            "volatility": std * annual,
+        }
+
+
+def _bootstrap_chunk(returns: np.ndarray, n_paths: int, mean_block: float, periods: int, seed) -> dict:
+    """Resamples one chunk of paths and reduces it to per-path metric values."""
+    rng = np.random.default_rng(seed)
+    indices = stationary_bootstrap_indices(len(returns), n_paths, mean_block, rng)
+    return headline_metrics(returns[indices], periods)
+
+
+def check_bootstrap_settings(settings: dict) -> dict:
+    """
+    Validates ``bootstrap_confidence_intervals`` settings taken from a request.
+
+    Parameters
+    ----------
+    settings : dict
+        Any of "n_paths", "mean_block", "confidence" and "seed"; other keys are dropped
+
+    Returns
+    -------
+    dict
+        The given settings, converted to int / float
+
+    Raises
+    ------
+    ValueError
+        If a setting has the wrong type or is out of range
+    """
+    def number(name, kind):
+        value = settings[name]
+        if isinstance(value, bool) or not isinstance(value, kind):
+            raise ValueError(f"Bootstrap {name} must be a number, got {value!r}.")
+        return value
+
+    checked = {}
+    if "n_paths" in settings:
+        checked["n_paths"] = int(number("n_paths", numbers.Integral))
+        if not 1 <= checked["n_paths"] <= MAX_PATHS:
+            raise ValueError(f"Bootstrap n_paths must be between 1 and {MAX_PATHS}.")
+    if "mean_block" in settings:
+        checked["mean_block"] = float(number("mean_block", numbers.Real))
+        if not 1.0 <= checked["mean_block"] <= MAX_MEAN_BLOCK:
+            raise ValueError(f"Bootstrap mean_block must be between 1 and {MAX_MEAN_BLOCK}.")
+    if "confidence" in settings:
+        checked["confidence"] = float(number("confidence", numbers.Real))
+        if not 0.0 < checked["confidence"] < 1.0:
+            raise ValueError("Bootstrap confidence must be between 0 and 1.")
+    if "seed" in settings and settings["seed"] is not None:
+        checked["seed"] = int(number("seed", numbers.Integral))
+        if checked["seed"] < 0:
+            raise ValueError("Bootstrap seed must not be negative.")
+    return checked
+
+
+def _chunk_sizes(n_obs: int, n_paths: int, max_bytes: int) -> list:
+    """Splits ``n_paths`` so that no chunk needs more than ``max_bytes`` of working memory."""
+    per_chunk = max(1, int(max_bytes // (n_obs * 8 * _BUFFERS_PER_CELL)))
+    sizes = [per_chunk] * (n_paths // per_chunk)
+    if n_paths % per_chunk:
+        sizes.append(n_paths % per_chunk)
+    return sizes
+
+
+def bootstrap_confidence_intervals(
+    returns: pd.Series,
+    n_paths: int = 2000,
+    mean_block: float = 10.0,
+    confidence: float = 0.95,
+    periods: int = 252,
+    seed: int = 42,
+    max_workers: int = None,
+    max_bytes: int = 256 * 1024 ** 2,
+) -> dict:
+    """
+    Estimates confidence intervals for the headline metrics with a stationary block bootstrap.
+
+    Paths are generated and reduced in chunks sized by ``max_bytes`` so that, for example,
+    10,000 observations x 2,000 paths never materialises the full matrix. Chunks are spread
+    over the shared process pool (``process_pool.get_process_pool``); every chunk gets its
+    own child of ``SeedSequence(seed)``, so results are reproducible and independent of the
+    number of workers.
+
+    Parameters
+    ----------
+    returns : pd.Series
+        Periodic returns of the strategy
+    n_paths : int
+        Number of resampled paths
+    mean_block : float
+        Expected block length in periods; preserves short-range autocorrelation
+    confidence : float
+        Two-sided confidence level of the reported interval
+    periods : int
+        Periods per year used for annualization
+    seed : int
+        Seed for the resampling
+    max_workers : int, optional
+        1 runs in-process; anything else (the default) uses the shared pool when there is
+        more than one CPU and more than one chunk
+    max_bytes : int
+        Working-memory budget per chunk
+
+    Returns
+    -------
+    dict
+        Metric name -> {"point", "mean", "std", "lower", "upper"} plus the run settings
+
+    Raises
+    ------
+    ValueError
+        If the settings are out of range (see ``check_bootstrap_settings``) or there are
+        fewer than two returns
+    """
+    check_bootstrap_settings({"n_paths": n_paths, "mean_block": mean_block, "confidence": confidence})
+    values = pd.to_numeric(returns, errors="coerce").dropna().to_numpy(dtype=float)
+    if len(values) < 2:
+        raise ValueError("At least two returns are required to bootstrap metrics.")
+
+    sizes = _chunk_sizes(len(values), n_paths, max_bytes)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    workers = min(check_workers(max_workers), len(sizes))
+
+    if workers <= 1:
+        chunks = [_bootstrap_chunk(values, size, mean_block, periods, s) for size, s in zip(sizes, seeds)]
+    else:
+        chunks = list(get_process_pool().map(
+            _bootstrap_chunk,
+            [values] * len(sizes), sizes, [mean_block] * len(sizes), [periods] * len(sizes), seeds,
+        ))
+
+    point = headline_metrics(values[:, None], periods)
+    tail = (1.0 - confidence) / 2.0
+    intervals = {}
+    for metric in HEADLINE_METRICS:
+        samples = np.concatenate([chunk[metric] for chunk in chunks])
+        samples = samples[np.isfinite(samples)]
+        if len(samples) == 0:
+            lower = upper = mean = std = np.nan
+        else:
+            lower, upper = np.quantile(samples, [tail, 1.0 - tail])
+            mean = samples.mean()
+            std = samples.std(ddof=1) if len(samples) > 1 else 0.0
+        intervals[metric] = {
+            "point": float(point[metric][0]),
+            "mean": float(mean),
+            "std": float(std),
+            "lower": float(lower),
+            "upper": float(upper),
+        }
+
+    intervals["settings"] = {
+        "n_paths": n_paths,
+        "mean_block": mean_block,
+        "confidence": confidence,
+        "seed": seed,
+    }
+    return intervals
@@ -0,0 +1,79 @@
+"""
+Consistency check between /api/sweep and /api/quantstats.
+
+Runs the quantstats view and a one-cell sweep at the same settings (the sweep's base
+cell: 30-bar window, no risk-free rate, daily annualization, default benchmark) and
+compares every figure both report. Exits non-zero on a mismatch, so it can be run next
+to the rest of the checks against the configured database:
+
+    python check_sweep_consistency.py --category portfolio
+"""
+import argparse
+import math
+import sys
+
+# Sweep column -> /api/quantstats key reporting the same figure
+SHARED_FIGURES = {
+    "sharpe": "sharpe",
+    "sortino": "sortino",
+    "max_drawdown": "max_drawdown",
+    "cagr": "cagr",
+    "volatility": "volatility",
+    "beta": "beta",
+    "information_ratio": "information_ratio",
+}
+
+
+def compare(category: str, tolerance: float) -> list:
+    """
+    Runs both views for ``category``.
+
+    Returns
+    -------
+    list of tuple
+        (figure, sweep value, quantstats value, matches) for every shared figure
+    """
+    from benchmarks import DEFAULT_BENCHMARK
+    from sweep import run_sweep
+    from tasks import quantstats_task
+
+    view = quantstats_task({"category": category})
+    cell = run_sweep({"categories": [category]}, max_workers=1)["rows"][0]
+
+    rolling_sharpe = [value for value in view["rolling_sharpe"].values() if value is not None]
+    expected = {sweep_key: view[view_key] for sweep_key, view_key in SHARED_FIGURES.items()}
+    expected["rolling_sharpe_last"] = rolling_sharpe[-1] if rolling_sharpe else math.nan
+    expected["rolling_sharpe_mean"] = sum(rolling_sharpe) / len(rolling_sharpe) if rolling_sharpe else math.nan
+    expected["benchmark beta"] = view["benchmarks"][DEFAULT_BENCHMARK]["beta"]
+    expected["benchmark information_ratio"] = view["benchmarks"][DEFAULT_BENCHMARK]["information_ratio"]
+
+    rows = []
+    for figure, reference in expected.items():
+        value = cell[figure.replace("benchmark ", "")]
+        # Undefined figures are None in the JSON payloads and match only each other
+        value = math.nan if value is None else float(value)
+        reference = math.nan if reference is None else float(reference)
+        matches = (math.isnan(value) and math.isnan(reference)) or math.isclose(
+            value, reference, rel_tol=tolerance, abs_tol=tolerance
+        )
+        rows.append((figure, value, reference, matches))
+    return rows
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--category", default="portfolio", help="category to compare (default: portfolio)")
+    parser.add_argument("--tolerance", type=float, default=1e-9, help="relative and absolute tolerance")
+    args = parser.parse_args()
+
+    failed = False
+    for figure, value, reference, matches in compare(args.category, args.tolerance):
+        print(f"  {figure:<30} sweep {value: .10g}  quantstats {reference: .10g}{'' if matches else '  MISMATCH'}")
+        failed |= not matches
+    if failed:
+        print("FAIL: the sweep's base cell does not reproduce /api/quantstats")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
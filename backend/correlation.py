@@ -0,0 +1,323 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from data_munging import make_serializable
+
+KINDS = ("rolling", "ewma")
+
+ORDERINGS = ("clustered", "alphabetical", "none")
+
+DEFAULT_TTL_SECONDS = 300
+
+# (kind, lookback) accumulators kept at once; each holds four N x N matrices that every
+# refresh updates, so the least recently used one is dropped beyond this
+MAX_ACCUMULATORS = 4
+
+
+class CovarianceAccumulator:
+    """
+    Pairwise-complete covariance and correlation kept as four N x N running sums.
+
+    For every pair (i, j) it holds the weighted sums over the dates on which both symbols
+    have a return: ``cross`` = sum w r_i r_j, ``first`` = sum w r_i, ``second`` = sum w r_i**2
+    and ``weight`` = sum w. Each new bar is a few rank-one updates, O(N^2), regardless of
+    how much history is already folded in.
+
+    ``kind="rolling"`` gives every bar in the last ``lookback`` bars weight 1 and removes
+    the bar leaving the window; the sums are rebuilt from the window buffer every
+    ``lookback`` updates to stop floating-point drift, which is still O(N^2) amortized.
+    ``kind="ewma"`` decays old bars by ``0.5 ** (1 / lookback)`` per bar, i.e. ``lookback``
+    is the half-life.
+    """
+
+    def __init__(self, symbols, kind: str = "ewma", lookback: int = 63) -> None:
+        if kind not in KINDS:
+            raise ValueError(f"Unknown kind '{kind}'; use one of {KINDS}.")
+        if int(lookback) < 2:
+            raise ValueError("lookback must be at least 2")
+        self.symbols = list(symbols)
+        self.kind = kind
+        self.lookback = int(lookback)
+        self.decay = 1.0 if kind == "rolling" else 0.5 ** (1.0 / self.lookback)
+        self.last_date = None
+        self._window = deque() if kind == "rolling" else None
+        self._since_rebuild = 0
+        n = len(self.symbols)
+        self.cross = np.zeros((n, n))
+        self.first = np.zeros((n, n))
+        self.second = np.zeros((n, n))
+        self.weight = np.zeros((n, n))
+
+    def _fold(self, rows: np.ndarray, weights: np.ndarray, sign: float = 1.0) -> None:
+        """Adds ``sign * weights``-weighted rows into the sums with four matrix products."""
+        valid = ~np.isnan(rows)
+        values = np.where(valid, rows, 0.0)
+        mask = valid.astype(float)
+        weighted_values = values * weights[:, None]
+        weighted_mask = mask * weights[:, None]
+        self.cross += sign * (weighted_values.T @ values)
+        self.first += sign * (weighted_values.T @ mask)
+        self.second += sign * ((weighted_values * values).T @ mask)
+        self.weight += sign * (weighted_mask.T @ mask)
+
+    def fit(self, returns: pd.DataFrame) -> "CovarianceAccumulator":
+        """Initializes the sums from a date x symbol history in one batch of matrix products."""
+        rows = returns.reindex(columns=self.symbols).to_numpy(dtype=float)
+        if self.kind == "rolling":
+            rows = rows[-self.lookback:]
+            self._window = deque(rows)
+            weights = np.ones(len(rows))
+        else:
+            weights = self.decay ** np.arange(len(rows) - 1, -1, -1, dtype=float)
+        for matrix in (self.cross, self.first, self.second, self.weight):
+            matrix.fill(0.0)
+        self._fold(rows, weights)
+        self._since_rebuild = 0
+        self.last_date = returns.index[-1] if len(returns) else None
+        return self
+
+    def update(self, row, date=None) -> None:
+        """Folds in one new bar of returns (aligned to ``symbols``) in O(N^2)."""
+        row = np.asarray(row, dtype=float)[None, :]
+        one = np.ones(1)
+        if self.kind == "ewma":
+            for matrix in (self.cross, self.first, self.second, self.weight):
+                matrix *= self.decay
+            self._fold(row, one)
+        else:
+            self._window.append(row[0])
+            self._fold(row, one)
+            if len(self._window) > self.lookback:
+                self._fold(self._window.popleft()[None, :], one, sign=-1.0)
+            self._since_rebuild += 1
+            if self._since_rebuild >= self.lookback:
+                rows = np.vstack(self._window)
+                for matrix in (self.cross, self.first, self.second, self.weight):
+                    matrix.fill(0.0)
+                self._fold(rows, np.ones(len(rows)))
+                self._since_rebuild = 0
+        if date is not None:
+            self.last_date = date
+
+    def covariance(self, min_periods: int = 2) -> np.ndarray:
+        """
+        Pairwise-complete covariance. The rolling kind uses the sample (n - 1) normalization,
+        matching ``DataFrame.cov()`` over the same window; EWMA is the weighted population form.
+        """
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean_i = self.first / self.weight
+            mean_j = self.first.T / self.weight
+            cov = self.cross / self.weight - mean_i * mean_j
+            if self.kind == "rolling":
+                cov = cov * self.weight / (self.weight - 1)
+        return np.where(self.weight >= min_periods, cov, np.nan)
+
+    def correlation(self, min_periods: int = 2) -> np.ndarray:
+        """Pairwise-complete Pearson correlation, matching ``DataFrame.corr()`` for the rolling kind."""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean_i = self.first / self.weight
+            mean_j = self.first.T / self.weight
+            cov = self.cross / self.weight - mean_i * mean_j
+            var_i = np.maximum(self.second / self.weight - mean_i ** 2, 0.0)
+            var_j = np.maximum(self.second.T / self.weight - mean_j ** 2, 0.0)
+            corr = np.clip(cov / np.sqrt(var_i * var_j), -1.0, 1.0)
+        corr = np.where(self.weight >= min_periods, corr, np.nan)
+        diagonal = np.diag(self.weight) >= min_periods
+        corr[np.diag_indices_from(corr)] = np.where(diagonal, 1.0, np.nan)
+        return corr
+
+
+def clustered_order(corr: np.ndarray) -> np.ndarray:
+    """
+    Heatmap ordering that places correlated symbols next to each other.
+
+    Uses average-linkage hierarchical clustering on ``sqrt((1 - corr) / 2)`` when scipy is
+    installed, and otherwise sorts by the loadings of the leading eigenvector.
+    """
+    n = len(corr)
+    if n < 3:
+        return np.arange(n)
+    filled = np.nan_to_num(corr, nan=0.0)
+    np.fill_diagonal(filled, 1.0)
+    try:
+        from scipy.cluster.hierarchy import leaves_list, linkage
+        from scipy.spatial.distance import squareform
+    except ImportError:
+        _, vectors = np.linalg.eigh(filled)
+        return np.argsort(vectors[:, -1])
+    distance = np.sqrt(np.clip((1.0 - filled) / 2.0, 0.0, None))
+    np.fill_diagonal(distance, 0.0)
+    condensed = squareform((distance + distance.T) / 2.0, checks=False)
+    return leaves_list(linkage(condensed, method="average"))
+
+
+class CorrelationService:
+    """
+    Covariance and correlation matrices for the whole symbol universe, one accumulator per
+    (kind, lookback), built lazily and kept current as new bars arrive. At most
+    ``max_accumulators`` are kept, least recently used first out.
+    """
+
+    def __init__(self, returns: pd.DataFrame, max_accumulators: int = MAX_ACCUMULATORS) -> None:
+        self._lock = threading.RLock()
+        self._returns = returns.sort_index()
+        self.max_accumulators = max_accumulators
+        self._accumulators: "OrderedDict[tuple, CovarianceAccumulator]" = OrderedDict()
+
+    @property
+    def symbols(self):
+        return list(self._returns.columns)
+
+    @property
+    def last_date(self):
+        return self._returns.index[-1] if len(self._returns) else None
+
+    def accumulator(self, kind: str = "ewma", lookback: int = 63) -> CovarianceAccumulator:
+        """
+        Returns the cached accumulator for ``(kind, lookback)``, fitting it on first use.
+
+        Raises
+        ------
+        ValueError
+            For an unknown kind, or a lookback below 2 or longer than the history
+        """
+        key = (kind, int(lookback))
+        with self._lock:
+            if key in self._accumulators:
+                self._accumulators.move_to_end(key)
+                return self._accumulators[key]
+            if key[1] > max(len(self._returns), 2):
+                raise ValueError(f"lookback must be at most the history length ({len(self._returns)} bars).")
+            accumulator = CovarianceAccumulator(self.symbols, kind, key[1]).fit(self._returns)
+            self._accumulators[key] = accumulator
+            while len(self._accumulators) > self.max_accumulators:
+                self._accumulators.popitem(last=False)
+            return accumulator
+
+    def append(self, returns: pd.DataFrame) -> int:
+        """
+        Folds bars dated after ``last_date`` into every cached accumulator.
+
+        Returns the number of new bars. A change of symbol universe drops the caches, as
+        the matrices would no longer line up.
+        """
+        with self._lock:
+            if list(returns.columns) != self.symbols:
+                self._returns = returns.sort_index()
+                self._accumulators.clear()
+                return len(returns)
+            new = returns.sort_index()
+            if self.last_date is not None:
+                new = new[new.index > self.last_date]
+            if new.empty:
+                return 0
+            self._returns = pd.concat([self._returns, new])
+            rows = new.to_numpy(dtype=float)
+            for accumulator in self._accumulators.values():
+                for date, row in zip(new.index, rows):
+                    accumulator.update(row, date)
+            return len(new)
+
+    def matrices(
+        self,
+        kind: str = "ewma",
+        lookback: int = 63,
+        symbols: Optional[Iterable[str]] = None,
+        ordering: str = "clustered",
+        min_periods: int = 2,
+    ) -> dict:
+        """
+        Covariance and correlation as DataFrames.
+
+        Returns
+        -------
+        dict
+            {"kind", "lookback", "as_of", "symbols", "covariance": pd.DataFrame,
+             "correlation": pd.DataFrame} with rows and columns in the requested ordering
+        """
+        if ordering not in ORDERINGS:
+            raise ValueError(f"Unknown ordering '{ordering}'; use one of {ORDERINGS}.")
+        with self._lock:
+            accumulator = self.accumulator(kind, lookback)
+            cov = accumulator.covariance(min_periods)
+            corr = accumulator.correlation(min_periods)
+            as_of = accumulator.last_date
+
+        names = accumulator.symbols
+        if symbols is not None:
+            symbols = list(symbols)
+            unknown = [s for s in symbols if s not in names]
+            if unknown:
+                raise KeyError(f"Unknown symbols: {unknown}")
+            keep = np.array([names.index(s) for s in symbols], dtype=np.int64)
+        else:
+            keep = np.arange(len(names))
+        cov, corr = cov[np.ix_(keep, keep)], corr[np.ix_(keep, keep)]
+        names = [names[i] for i in keep]
+
+        if ordering == "clustered":
+            order = clustered_order(corr)
+        elif ordering == "alphabetical":
+            order = np.argsort(names)
+        else:
+            order = np.arange(len(names))
+        names = [names[i] for i in order]
+        return {
+            "kind": kind,
+            "lookback": int(lookback),
+            "as_of": as_of,
+            "symbols": names,
+            "covariance": pd.DataFrame(cov[np.ix_(order, order)], index=names, columns=names),
+            "correlation": pd.DataFrame(corr[np.ix_(order, order)], index=names, columns=names),
+        }
+
+
+_lock = threading.Lock()
+_service: Optional[CorrelationService] = None
+_synced_at: Optional[float] = None
+
+
+def get_correlation_service(ttl_seconds: float = DEFAULT_TTL_SECONDS, refresh: bool = False) -> CorrelationService:
+    """
+    Returns the process-wide service. When it is older than ``ttl_seconds`` the returns
+    matrix is reloaded from ``system()`` and only the bars after the last seen date are
+    folded into the cached matrices.
+    """
+    global _service, _synced_at
+    with _lock:
+        expired = _synced_at is None or time.monotonic() - _synced_at >= ttl_seconds
+        if refresh or _service is None or expired:
+            from portfolio import returns_matrix
+            from system import system
+
+            # Unadjusted: an adjustment would rescale the history already folded in at every roll
+            returns = returns_matrix(system(adjustment="none"))
+            if _service is None:
+                _service = CorrelationService(returns)
+            else:
+                _service.append(returns)
+            _synced_at = time.monotonic()
+        return _service
+
+
+def correlation_matrices(kind: str = "ewma", lookback: int = 63, symbols=None, ordering: str = "clustered") -> dict:
+    """Shortcut for custom metrics: cached matrices from the process-wide service."""
+    return get_correlation_service().matrices(kind, lookback, symbols, ordering)
+
+
+def serialize_matrices(matrices: dict) -> dict:
+    """Packs ``CorrelationService.matrices`` output as nested lists for a heatmap."""
+    as_of = matrices["as_of"]
+    return {
+        "kind": matrices["kind"],
+        "lookback": matrices["lookback"],
+        "as_of": None if as_of is None else pd.Timestamp(as_of).strftime("%Y-%m-%d"),
+        "symbols": matrices["symbols"],
+        "covariance": [make_serializable(row) for row in matrices["covariance"].to_numpy().tolist()],
+        "correlation": [make_serializable(row) for row in matrices["correlation"].to_numpy().tolist()],
+    }
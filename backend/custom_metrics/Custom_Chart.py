@@ -7,17 +7,17 @@
 # - np (numpy)
 # - system() - returns strategy groups data
 # - quant_stats(strategy_name, strategy_data, benchmark_name, benchmark_data)
+#
+# Declare the data you need in REQUIRES and the runtime loads it once and binds it
+# to a variable of the same name: portfolio_returns, portfolio_prices, group_prices,
+# strategy_returns, benchmark_returns, category_prices, returns_matrix, strategy_groups
+REQUIRES = ["portfolio_returns"]
 
 import pandas as pd
 import numpy as np
 
-# Get data from system
-strategy_groups = system()
-portfolio_data = strategy_groups.get("portfolio")
-
-# Process the data
-processed_data = pd.to_numeric(portfolio_data, errors='coerce')
-processed_data = processed_data.dropna().pct_change().dropna()
+# Daily portfolio returns, supplied by the runtime
+processed_data = portfolio_returns
 
 # Create chart data structure for Chart.js
 dates = processed_data.index.strftime('%Y-%m-%d').tolist()
@@ -1,30 +1,71 @@
-from typing import List, Dict, Optional, Any, Type, Tuple
+from typing import Callable, Iterator, List, Dict, Optional, Any, Type, Tuple
+from sqlalchemy import select, text
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.engine import Engine
 from sqlalchemy.exc import SQLAlchemyError
-from db_models import get_engine, OHLCV, ContractMetadata
+from db_models import get_engine, OHLCV, OHLCV_MODELS, ContractMetadata
 import pandas as pd
 import logging
 
+# Bucket name -> (TimescaleDB interval, resample rule of the pandas fallback)
+BUCKETS: Dict[str, Tuple[str, str]] = {
+    "hour": ("1 hour", "1h"),
+    "day": ("1 day", "1D"),
+    "week": ("1 week", "W"),
+    "month": ("1 month", "MS"),
+}
+
+# Callbacks run after insert_data commits, e.g. to refresh caches built from the OHLCV table
+_ingest_listeners: List[Callable[[List[Dict[str, Any]]], None]] = []
+
+def on_ingest(callback: Callable[[List[Dict[str, Any]]], None]) -> Callable:
+    """
+    Registers ``callback(records)`` to run after every successful insert_data call.
+
+    Returns:
+        Callable: The callback, so this can be used as a decorator.
+    """
+    if callback not in _ingest_listeners:
+        _ingest_listeners.append(callback)
+    return callback
+
 class DataAccess:
     """
     A data access layer for querying the OHLCV table in PostgreSQL using SQLAlchemy ORM.
     """
 
-    def __init__(self) -> None:
+    def __init__(self, engine: Optional[Engine] = None) -> None:
         """
         Initializes the DataAccess class by creating a database engine and session maker.
+
+        Args:
+            engine (Optional[Engine]): Engine to use instead of the one configured in .env,
+                e.g. a SQLite engine for local tests.
         """
-        self.engine: Engine = get_engine()
+        self.engine: Engine = engine if engine is not None else get_engine()
         self.Session: Type[sessionmaker] = sessionmaker(bind=self.engine)
         self.logger: logging.Logger = logging.getLogger("DataAccess")
         self.logger.setLevel(logging.INFO)
+        self._has_time_bucket: Optional[bool] = None
+
+    @staticmethod
+    def _ohlcv_model(resolution: str) -> Type[OHLCV]:
+        """
+        Returns the model of the table storing bars at ``resolution``.
+
+        Raises:
+            ValueError: If no table stores that resolution.
+        """
+        if resolution not in OHLCV_MODELS:
+            raise ValueError(f"No OHLCV table for resolution '{resolution}'; stored: {list(OHLCV_MODELS)}")
+        return OHLCV_MODELS[resolution]
 
     def get_ohlcv_data(
         self, 
         start_date: str, 
         end_date: str, 
-        symbols: Optional[List[str]] = None
+        symbols: Optional[List[str]] = None,
+        resolution: str = "1d"
     ) -> List[Dict[str, Any]]:
         """
         Retrieves OHLCV data for the specified date range and symbols.
@@ -33,19 +74,21 @@ class DataAccess:
             start_date (str): The start date in 'YYYY-MM-DD' format.
             end_date (str): The end date in 'YYYY-MM-DD' format.
             symbols (Optional[List[str]]): A list of symbols to filter.
+            resolution (str): Bar resolution of the table to read, a key of OHLCV_MODELS.
 
         Returns:
             List[Dict[str, Any]]: A list of OHLCV records.
         """
+        model = self._ohlcv_model(resolution)
         with self.Session() as session:
-            query = session.query(OHLCV).filter(
-                OHLCV.time.between(start_date, end_date)
+            query = session.query(model).filter(
+                model.time.between(start_date, end_date)
             )
             if symbols:
-                query = query.filter(OHLCV.symbol.in_(symbols))
+                query = query.filter(model.symbol.in_(symbols))
 
             # Order by symbol and time
-            query = query.order_by(OHLCV.symbol, OHLCV.time)
+            query = query.order_by(model.symbol, model.time)
 
             data: List[OHLCV] = query.all()
             result: List[Dict[str, Any]] = [record.__dict__ for record in data if record]
@@ -56,6 +99,244 @@ class DataAccess:
             
             return result
 
+    def iter_ohlcv_data(
+        self,
+        start_date: str,
+        end_date: str,
+        symbols: Optional[List[str]] = None,
+        resolution: str = "1d",
+        chunk_size: int = 100_000
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Streams OHLCV data as DataFrames of at most ``chunk_size`` rows.
+
+        Rows are fetched through a server-side cursor as plain tuples (no ORM objects), so
+        minute bars can be read without holding the whole range in memory.
+
+        Args:
+            start_date (str): The start date in 'YYYY-MM-DD' format.
+            end_date (str): The end date in 'YYYY-MM-DD' format.
+            symbols (Optional[List[str]]): A list of symbols to filter.
+            resolution (str): Bar resolution of the table to read, a key of OHLCV_MODELS.
+            chunk_size (int): Maximum rows per DataFrame.
+
+        Returns:
+            Iterator[pd.DataFrame]: Chunks with time, open, high, low, close, volume and
+            symbol columns, sorted by symbol and time across chunks.
+        """
+        model = self._ohlcv_model(resolution)
+        columns = ["time", "open", "high", "low", "close", "volume", "symbol"]
+        query = select(*(getattr(model, column) for column in columns)).where(
+            model.time.between(start_date, end_date)
+        )
+        if symbols:
+            query = query.where(model.symbol.in_(symbols))
+        query = query.order_by(model.symbol, model.time)
+
+        with self.Session() as session:
+            result = session.execute(query.execution_options(yield_per=chunk_size))
+            for rows in result.partitions():
+                yield pd.DataFrame(rows, columns=columns)
+
+    def supports_time_bucket(self) -> bool:
+        """
+        Checks (once per instance) whether the database is PostgreSQL with TimescaleDB,
+        which the bucketed queries below push their work down to.
+
+        Returns:
+            bool: True if time_bucket, first() and last() are available.
+        """
+        if self._has_time_bucket is None:
+            self._has_time_bucket = False
+            if self.engine.dialect.name == "postgresql":
+                try:
+                    with self.engine.connect() as connection:
+                        self._has_time_bucket = connection.execute(
+                            text("SELECT 1 FROM pg_extension WHERE extname = 'timescaledb'")
+                        ).first() is not None
+                except SQLAlchemyError as e:
+                    self.logger.warning(f"Could not check for TimescaleDB: {e}")
+        return self._has_time_bucket
+
+    def _bucket_query(self, bucket: str, resolution: str, symbols: Optional[List[str]]) -> Tuple[str, Dict[str, Any]]:
+        """
+        Builds the bucketed OHLCV subquery: one row per symbol and bucket, aggregated in
+        the database with time_bucket, first() and last().
+        """
+        if bucket not in BUCKETS:
+            raise ValueError(f"Unknown bucket '{bucket}'; use one of {list(BUCKETS)}")
+        table = self._ohlcv_model(resolution).__table__
+        params: Dict[str, Any] = {"width": BUCKETS[bucket][0]}
+        symbol_filter = ""
+        if symbols:
+            symbol_filter = "AND symbol = ANY(:symbols)"
+            params["symbols"] = list(symbols)
+        query = f"""
+            SELECT time_bucket(CAST(:width AS interval), time) AS time, symbol,
+                   first(open, time) AS open, max(high) AS high, min(low) AS low,
+                   last(close, time) AS close, sum(volume) AS volume
+            FROM {table.schema}.{table.name}
+            WHERE time BETWEEN :start_date AND :end_date {symbol_filter}
+            GROUP BY symbol, 1
+        """
+        return query, params
+
+    def _read_frame(self, query: str, params: Dict[str, Any], columns: List[str]) -> pd.DataFrame:
+        with self.engine.connect() as connection:
+            rows = connection.execute(text(query), params).fetchall()
+        frame = pd.DataFrame(rows, columns=columns)
+        frame["time"] = pd.to_datetime(frame["time"])
+        return frame
+
+    def _resampled_frame(
+        self, start_date: str, end_date: str, symbols: Optional[List[str]], bucket: str, resolution: str
+    ) -> pd.DataFrame:
+        """Pandas fallback of the bucketed subquery, streamed through resample.resample_bars."""
+        from resample import BAR_COLUMNS, resample_bars
+
+        if bucket not in BUCKETS:
+            raise ValueError(f"Unknown bucket '{bucket}'; use one of {list(BUCKETS)}")
+        chunks = self.iter_ohlcv_data(start_date, end_date, symbols, resolution=resolution)
+        frames = list(resample_bars(chunks, BUCKETS[bucket][1]))
+        if not frames:
+            return pd.DataFrame(columns=BAR_COLUMNS)
+        return pd.concat(frames, ignore_index=True)[BAR_COLUMNS]
+
+    def get_bucketed_ohlcv(
+        self,
+        start_date: str,
+        end_date: str,
+        symbols: Optional[List[str]] = None,
+        bucket: str = "week",
+        resolution: str = "1d"
+    ) -> pd.DataFrame:
+        """
+        Retrieves OHLCV bars aggregated into hour, day, week or month buckets.
+
+        On TimescaleDB the aggregation runs in the database and only one row per symbol and
+        bucket is transferred; elsewhere (plain PostgreSQL, SQLite) the rows are streamed
+        and resampled in pandas with the same bucket boundaries (weeks start on Monday,
+        months on the 1st) and the same output.
+
+        Args:
+            start_date (str): The start date in 'YYYY-MM-DD' format.
+            end_date (str): The end date in 'YYYY-MM-DD' format.
+            symbols (Optional[List[str]]): A list of symbols to filter.
+            bucket (str): One of BUCKETS.
+            resolution (str): Bar resolution of the table to read, a key of OHLCV_MODELS.
+
+        Returns:
+            pd.DataFrame: time (bucket start), open, high, low, close, volume and symbol
+            columns, sorted by symbol and time.
+        """
+        columns = ["time", "open", "high", "low", "close", "volume", "symbol"]
+        if not self.supports_time_bucket():
+            return self._resampled_frame(start_date, end_date, symbols, bucket, resolution)
+        query, params = self._bucket_query(bucket, resolution, symbols)
+        query = f"SELECT {', '.join(columns)} FROM ({query}) AS bars ORDER BY symbol, time"
+        return self._read_frame(query, {**params, "start_date": start_date, "end_date": end_date}, columns)
+
+    def get_bucket_returns(
+        self,
+        start_date: str,
+        end_date: str,
+        symbols: Optional[List[str]] = None,
+        bucket: str = "week",
+        resolution: str = "1d"
+    ) -> pd.DataFrame:
+        """
+        Retrieves close-to-close returns between consecutive buckets of each symbol.
+
+        On TimescaleDB the returns come from a lag() window over the bucketed closes, so only
+        the returns are transferred; elsewhere they are computed in pandas with the same output.
+
+        Args:
+            start_date (str): The start date in 'YYYY-MM-DD' format.
+            end_date (str): The end date in 'YYYY-MM-DD' format.
+            symbols (Optional[List[str]]): A list of symbols to filter.
+            bucket (str): One of BUCKETS.
+            resolution (str): Bar resolution of the table to read, a key of OHLCV_MODELS.
+
+        Returns:
+            pd.DataFrame: time, symbol and return columns sorted by symbol and time; a
+            symbol's first bucket has a NaN return.
+        """
+        columns = ["time", "symbol", "return"]
+        if not self.supports_time_bucket():
+            bars = self._resampled_frame(start_date, end_date, symbols, bucket, resolution)
+            close = pd.to_numeric(bars["close"])
+            returns = close / close.groupby(bars["symbol"]).shift(1) - 1
+            return pd.DataFrame({"time": bars["time"], "symbol": bars["symbol"], "return": returns.astype(float)})
+        query, params = self._bucket_query(bucket, resolution, symbols)
+        query = f"""
+            SELECT time, symbol, close / lag(close) OVER (PARTITION BY symbol ORDER BY time) - 1 AS "return"
+            FROM ({query}) AS bars
+            ORDER BY symbol, time
+        """
+        frame = self._read_frame(query, {**params, "start_date": start_date, "end_date": end_date}, columns)
+        frame["return"] = frame["return"].astype(float)
+        return frame
+
+    def get_group_averages(
+        self,
+        start_date: str,
+        end_date: str,
+        groups: Dict[str, List[str]],
+        bucket: str = "day",
+        resolution: str = "1d"
+    ) -> pd.DataFrame:
+        """
+        Retrieves each group's equal-weighted average close per bucket, plus a "portfolio"
+        column averaging the groups: the price construction of system(), without
+        transferring a row per symbol and bar.
+
+        On TimescaleDB the bucketing and the per-group averages run in the database;
+        elsewhere they are computed in pandas with the same output.
+
+        Args:
+            start_date (str): The start date in 'YYYY-MM-DD' format.
+            end_date (str): The end date in 'YYYY-MM-DD' format.
+            groups (Dict[str, List[str]]): Group name -> symbols.
+            bucket (str): One of BUCKETS.
+            resolution (str): Bar resolution of the table to read, a key of OHLCV_MODELS.
+
+        Returns:
+            pd.DataFrame: One row per bucket (named "Date") and one column per group, then
+            "portfolio"; a group without bars in a bucket is NaN there.
+        """
+        members = [(symbol, group) for group, symbols in groups.items() for symbol in symbols]
+        all_symbols = [symbol for symbol, _ in members]
+        if self.supports_time_bucket():
+            query, params = self._bucket_query(bucket, resolution, all_symbols)
+            query = f"""
+                SELECT bars.time, members.grp AS symbol, avg(bars.close) AS close
+                FROM ({query}) AS bars
+                JOIN unnest(CAST(:member_symbols AS text[]), CAST(:member_groups AS text[]))
+                     AS members(symbol, grp) ON members.symbol = bars.symbol
+                GROUP BY bars.time, members.grp
+            """
+            params.update({
+                "start_date": start_date,
+                "end_date": end_date,
+                "member_symbols": all_symbols,
+                "member_groups": [group for _, group in members],
+            })
+            averages = self._read_frame(query, params, ["time", "symbol", "close"])
+        else:
+            bars = self._resampled_frame(start_date, end_date, all_symbols, bucket, resolution)
+            group_of = pd.DataFrame(members, columns=["symbol", "group"])
+            bars = bars.merge(group_of, on="symbol")
+            averages = bars.groupby(["time", "group"], as_index=False)["close"].mean()
+            averages = averages.rename(columns={"group": "symbol"})
+
+        # The compact result is pivoted here: one row per bucket, one column per group
+        wide = averages.pivot(index="time", columns="symbol", values="close").astype(float)
+        wide = wide.reindex(columns=list(groups)).sort_index()
+        wide.index.name = "Date"
+        wide.columns.name = None
+        wide["portfolio"] = wide.mean(axis=1)
+        return wide
+
     def get_symbols(self) -> List[str]:
         """
         Retrieves all unique symbols from the OHLCV table.
@@ -154,6 +435,13 @@ class DataAccess:
                 self.logger.error(f"Error inserting data: {e}")
                 raise
 
+        # A failing listener must not turn a committed insert into an error
+        for listener in list(_ingest_listeners):
+            try:
+                listener(records)
+            except Exception as e:
+                self.logger.error(f"Ingest listener {getattr(listener, '__name__', listener)} failed: {e}")
+
     def delete_data(
         self, 
         start_date: str, 
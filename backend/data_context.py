@@ -0,0 +1,223 @@
+import ast
+import threading
+import time
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, Optional
+
+import pandas as pd
+
+DEFAULT_TTL_SECONDS = 300
+
+# Name a custom metric assigns to declare the inputs it needs, e.g. REQUIRES = ["portfolio_returns"]
+REQUIRES_NAME = "REQUIRES"
+
+# /api/quantstats settings that change what the inputs are, with that endpoint's defaults
+# (None means the default benchmark)
+CONTEXT_SETTINGS = {
+    "weighting": "price",
+    "rebalance": "monthly",
+    "benchmark": None,
+    "resolution": "1d",
+    "adjustment": "ratio",
+}
+
+
+def requires(*names):
+    """
+    Decorator form of ``REQUIRES`` for a metric's ``custom_metric`` function::
+
+        @requires("portfolio_returns", "benchmark_returns")
+        def custom_metric(data):
+            ...
+    """
+    def decorate(func):
+        func.REQUIRES = list(names)
+        return func
+    return decorate
+
+
+@lru_cache(maxsize=256)
+def _declared_inputs(code: str) -> tuple:
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return ()
+    names = []
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(
+            isinstance(target, ast.Name) and target.id == REQUIRES_NAME for target in node.targets
+        ):
+            try:
+                names.extend(ast.literal_eval(node.value))
+            except ValueError:
+                pass
+        elif isinstance(node, ast.FunctionDef):
+            for decorator in node.decorator_list:
+                if (isinstance(decorator, ast.Call) and isinstance(decorator.func, ast.Name)
+                        and decorator.func.id == "requires"):
+                    names.extend(arg.value for arg in decorator.args
+                                 if isinstance(arg, ast.Constant) and isinstance(arg.value, str))
+    return tuple(dict.fromkeys(name for name in names if isinstance(name, str)))
+
+
+def declared_inputs(code: str) -> list:
+    """
+    Input names a metric declares through a top-level ``REQUIRES`` list or ``@requires(...)``.
+
+    The source is parsed, not executed, so the runtime knows what to load before running
+    the metric; the result is memoized per source string.
+    """
+    return list(_declared_inputs(code))
+
+
+_lock = threading.Lock()
+# Roll adjustment -> (output of system(), loaded_at)
+_strategy_groups: Dict[str, tuple] = {}
+
+
+def get_strategy_groups(adjustment: str = "none", ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                        refresh: bool = False) -> dict:
+    """
+    Returns the output of ``system(adjustment=adjustment)``, reloaded from the database at
+    most every ``ttl_seconds``. The default "none" is the prices that traded; returns
+    analysis asks for ``rolls.RETURNS_ADJUSTMENT``.
+    """
+    with _lock:
+        groups, loaded_at = _strategy_groups.get(adjustment, (None, None))
+        expired = loaded_at is None or time.monotonic() - loaded_at >= ttl_seconds
+        if refresh or groups is None or expired:
+            from system import system
+
+            groups = system(adjustment=adjustment)
+            _strategy_groups[adjustment] = (groups, time.monotonic())
+        return groups
+
+
+def invalidate_strategy_groups() -> None:
+    """Drops the cached ``system()`` output, e.g. after new bars are inserted."""
+    with _lock:
+        _strategy_groups.clear()
+
+
+def _context_groups(context: "DataContext"):
+    settings = context.settings
+    # Price-weighted daily groups are cached process-wide, one per adjustment
+    if (settings["weighting"], settings["resolution"]) == ("price", "1d"):
+        return get_strategy_groups(settings["adjustment"])
+    from system import system
+    return system(weighting=settings["weighting"], rebalance=settings["rebalance"],
+                  resolution=settings["resolution"], adjustment=settings["adjustment"])
+
+
+def _portfolio_prices(context: "DataContext"):
+    return context.get("strategy_groups").get("portfolio")
+
+
+def _portfolio_returns(context: "DataContext"):
+    # For the portfolio page these are exactly the returns its metrics were computed on
+    if context.category == "portfolio":
+        return context.get("strategy_returns")
+    prices = pd.to_numeric(context.get("portfolio_prices"), errors="coerce")
+    return prices.dropna().pct_change().dropna()
+
+
+def _group_prices(context: "DataContext"):
+    return {
+        group: df.pivot_table(values="close", index=df.index, columns="symbol")
+        for group, df in context.get("strategy_groups").items()
+        if isinstance(df, pd.DataFrame)
+    }
+
+
+def _category_prices(context: "DataContext"):
+    from strategy_data import category_series
+    return category_series(context.get("strategy_groups"), context.category)
+
+
+def _aligned(context: "DataContext"):
+    from benchmarks import DEFAULT_BENCHMARK
+    from strategy_data import load_aligned_returns
+    settings = context.settings
+    strategy, benchmark = load_aligned_returns(
+        context.category, context.get("strategy_groups"), weighting=settings["weighting"],
+        rebalance=settings["rebalance"], benchmark=settings["benchmark"] or DEFAULT_BENCHMARK,
+        resolution=settings["resolution"], adjustment=settings["adjustment"],
+    )
+    context.seed(strategy_returns=strategy, benchmark_returns=benchmark)
+    return strategy, benchmark
+
+
+def _benchmark_matrix(context: "DataContext"):
+    from benchmarks import benchmark_matrix
+    return benchmark_matrix(context.get("strategy_returns").index)
+
+
+def _returns_matrix(context: "DataContext"):
+    from portfolio import returns_matrix
+    return returns_matrix(context.get("strategy_groups"))
+
+
+def _ohlcv_store(context: "DataContext"):
+    from rolls import get_adjusted_store
+    from system import END_DATE, START_DATE, SYMBOLS
+    return get_adjusted_store(START_DATE, END_DATE, SYMBOLS, resolution=context.settings["resolution"],
+                              adjustment=context.settings["adjustment"])
+
+
+# Input name -> resolver; each runs at most once per DataContext
+RESOLVERS: Dict[str, Callable] = {
+    "strategy_groups": _context_groups,
+    "ohlcv_store": _ohlcv_store,
+    "portfolio_prices": _portfolio_prices,
+    "portfolio_returns": _portfolio_returns,
+    "group_prices": _group_prices,
+    "category_prices": _category_prices,
+    "strategy_returns": lambda context: _aligned(context)[0],
+    "benchmark_returns": lambda context: _aligned(context)[1],
+    "returns_matrix": _returns_matrix,
+    "benchmark_matrix": _benchmark_matrix,
+    "category": lambda context: context.category,
+}
+
+
+class DataContext:
+    """
+    Per-request store of the inputs custom metrics can declare.
+
+    Each input is resolved on first use and memoized, so a batch of metrics sharing one
+    context loads ``system()`` (itself cached process-wide) and derives each series once.
+    Inputs follow the request's ``CONTEXT_SETTINGS`` (weighting, resolution, roll
+    adjustment, ...), so a metric measures the same portfolio as the page it runs on.
+    Values the caller already holds, such as the aligned returns in ``algo_scope``, can be
+    seeded so they are never recomputed.
+    """
+
+    def __init__(self, category: str = "portfolio", settings: Optional[dict] = None, **seeded) -> None:
+        self.category = category
+        self.settings = {name: (settings or {}).get(name) or default for name, default in CONTEXT_SETTINGS.items()}
+        self._values: dict = {}
+        self._lock = threading.RLock()
+        self.seed(**seeded)
+
+    @classmethod
+    def from_params(cls, params: dict, **seeded) -> "DataContext":
+        """Context for a request body: its "category" and any ``CONTEXT_SETTINGS`` fields."""
+        return cls(params.get("category", "portfolio"), settings=params, **seeded)
+
+    def seed(self, **values) -> None:
+        """Stores already-computed inputs."""
+        with self._lock:
+            self._values.update(values)
+
+    def get(self, name: str):
+        """Returns one input, resolving it on first use."""
+        with self._lock:
+            if name not in self._values:
+                if name not in RESOLVERS:
+                    raise KeyError(f"Unknown input '{name}'; available inputs: {sorted(RESOLVERS)}")
+                self._values[name] = RESOLVERS[name](self)
+            return self._values[name]
+
+    def resolve(self, names: Iterable[str]) -> dict:
+        """Returns {name: value} for every requested input."""
+        return {name: self.get(name) for name in names}
@@ -1,5 +1,4 @@
 import numpy as np
-import quantstats as qs
 import pandas as pd
 import math
 
@@ -29,6 +28,14 @@ def make_serializable(data):
     else:
         return data  # Return data as is if already serializable
 
+def serialize_dates(index) -> list:
+    """
+    Formats a DatetimeIndex as 'YYYY-MM-DD' strings in one vectorized call
+    instead of calling strftime on every timestamp.
+    """
+    values = pd.DatetimeIndex(index).tz_localize(None).values
+    return np.datetime_as_string(values, unit="D").tolist()
+
 def replace_infinity_with_neg_one(obj):
     """
     Recursively walks through a data structure (dict, list, float, etc.)
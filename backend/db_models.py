@@ -4,16 +4,15 @@ from sqlalchemy.orm import sessionmaker
 from sqlalchemy.engine.base import Engine
 from sqlalchemy.orm.session import Session
 from typing import Optional
-from dotenv import load_dotenv
 import os
 
 # Base class for SQLAlchemy models
 Base = declarative_base()
 
-class OHLCV(Base):
+class OHLCVColumns:
     """
-    SQLAlchemy model representing the `ohlcv_1d` table in the `futures_data` schema.
-    
+    Columns shared by the OHLCV tables of every bar resolution.
+
     Attributes:
         time (datetime): The timestamp for the data entry (primary key).
         symbol (str): The symbol or identifier for the instrument (primary key).
@@ -23,16 +22,41 @@ class OHLCV(Base):
         close (float): The closing price for the interval.
         volume (int): The trading volume for the interval.
     """
+    time = Column(DateTime, primary_key=True, nullable=False)
+    symbol = Column(String, primary_key=True, nullable=False)
+    open = Column(Float, nullable=False)
+    high = Column(Float, nullable=False)
+    low = Column(Float, nullable=False)
+    close = Column(Float, nullable=False)
+    volume = Column(Integer, nullable=False)
+
+class OHLCV(OHLCVColumns, Base):
+    """
+    SQLAlchemy model representing the `ohlcv_1d` table in the `futures_data` schema.
+    """
     __tablename__ = "ohlcv_1d"
     __table_args__ = {"schema": "futures_data"}
 
-    time: Column = Column(DateTime, primary_key=True, nullable=False)
-    symbol: Column = Column(String, primary_key=True, nullable=False)
-    open: Column = Column(Float, nullable=False)
-    high: Column = Column(Float, nullable=False)
-    low: Column = Column(Float, nullable=False)
-    close: Column = Column(Float, nullable=False)
-    volume: Column = Column(Integer, nullable=False)
+class OHLCV1h(OHLCVColumns, Base):
+    """
+    SQLAlchemy model representing the `ohlcv_1h` table (hourly bars) in the `futures_data` schema.
+    """
+    __tablename__ = "ohlcv_1h"
+    __table_args__ = {"schema": "futures_data"}
+
+class OHLCV1m(OHLCVColumns, Base):
+    """
+    SQLAlchemy model representing the `ohlcv_1m` table (minute bars) in the `futures_data` schema.
+    """
+    __tablename__ = "ohlcv_1m"
+    __table_args__ = {"schema": "futures_data"}
+
+# Bar resolution -> model of the table storing bars at that resolution
+OHLCV_MODELS = {
+    "1m": OHLCV1m,
+    "1h": OHLCV1h,
+    "1d": OHLCV,
+}
 
 class ContractMetadata(Base):
     __tablename__ = "contract_metadata"
@@ -79,6 +103,7 @@ def get_engine() -> Engine:
         ValueError: If any required environment variable is missing.
     """
     # Load environment variables from .env file
+    from dotenv import load_dotenv
     load_dotenv()
 
     # Retrieve database connection parameters from environment variables
@@ -0,0 +1,194 @@
+import numbers
+
+import numpy as np
+
+METHODS = ("lttb", "minmax")
+
+# Below this many points a series is returned untouched
+MIN_POINTS = 3
+
+
+def check_decimation(max_points, method: str = "lttb") -> tuple:
+    """
+    Validates the decimation settings of a request.
+
+    Returns
+    -------
+    tuple
+        (max_points as an int, or None when omitted or 0, i.e. no decimation; method)
+
+    Raises
+    ------
+    ValueError
+        If ``max_points`` is not a positive integer or ``method`` is not in ``METHODS``
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown decimation method '{method}'; use one of {METHODS}.")
+    if not max_points:
+        return None, method
+    if isinstance(max_points, bool) or isinstance(max_points, float) and not max_points.is_integer():
+        raise ValueError(f"maxPoints must be an integer, got {max_points!r}.")
+    try:
+        max_points = int(max_points)
+    except (TypeError, ValueError):
+        raise ValueError(f"maxPoints must be an integer, got {max_points!r}.")
+    if max_points < 1:
+        raise ValueError("maxPoints must be positive.")
+    return max_points, method
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: indices of ``n_out`` points that preserve the visual shape.
+
+    The first and last points are always kept. The interior is split into ``n_out - 2``
+    buckets; from each bucket the point forming the largest triangle with the previously
+    kept point and the mean of the next bucket is selected. Each bucket is a vectorized
+    NumPy step, so the cost is O(n) with a loop over buckets, not points.
+    """
+    n = len(y)
+    if n_out >= n or n_out < MIN_POINTS:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+
+    previous = 0
+    for bucket in range(n_out - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        if bucket + 2 < len(edges):
+            next_start, next_stop = edges[bucket + 1], edges[bucket + 2]
+        else:
+            next_start, next_stop = n - 1, n
+        avg_x = x[next_start:next_stop].mean()
+        avg_y = y[next_start:next_stop].mean()
+
+        ax, ay = x[previous], y[previous]
+        areas = np.abs((ax - avg_x) * (y[start:stop] - ay) - (ax - x[start:stop]) * (avg_y - ay))
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+    return selected
+
+
+def minmax_indices(y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Min/max decimation: the lowest and highest point of ``n_out // 2`` equal-width buckets.
+
+    Fully vectorized (one reshape and two arg-reductions); never hides a spike.
+    """
+    n = len(y)
+    if n_out >= n or n_out < MIN_POINTS:
+        return np.arange(n)
+
+    n_buckets = max(1, n_out // 2)
+    size = int(np.ceil(n / n_buckets))
+    padded = np.full(n_buckets * size, np.nan)
+    padded[:n] = y
+    blocks = padded.reshape(n_buckets, size)
+    offsets = np.arange(n_buckets) * size
+    # Buckets past the end of the data are all NaN; point them at their first slot and drop them
+    filled = ~np.all(np.isnan(blocks), axis=1)
+    lows = np.where(filled, np.nanargmin(np.where(filled[:, None], blocks, 0.0), axis=1), 0) + offsets
+    highs = np.where(filled, np.nanargmax(np.where(filled[:, None], blocks, 0.0), axis=1), 0) + offsets
+    picked = np.concatenate((lows[filled], highs[filled], [0, n - 1]))
+    return np.unique(picked[picked < n])
+
+
+def decimate_indices(x: np.ndarray, y: np.ndarray, max_points: int, method: str = "lttb") -> np.ndarray:
+    """
+    Indices to keep so that at most ``max_points`` (plus the global extremes) remain.
+
+    NaN values are skipped by the selection; the global minimum and maximum are always
+    kept so peaks and troughs stay visible at any zoom level.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown decimation method '{method}'; use one of {METHODS}.")
+    valid = np.flatnonzero(~np.isnan(y))
+    if len(valid) <= max_points:
+        return valid
+
+    vx, vy = x[valid], y[valid]
+    if method == "lttb":
+        local = lttb_indices(vx, vy, max_points)
+    else:
+        local = minmax_indices(vy, max_points)
+    local = np.union1d(local, [np.argmin(vy), np.argmax(vy)])
+    return valid[local]
+
+
+def _to_float(values) -> np.ndarray:
+    return np.array([np.nan if v is None else v for v in values], dtype=float)
+
+
+def _is_numeric_series(values) -> bool:
+    return all(v is None or (isinstance(v, numbers.Number) and not isinstance(v, bool)) for v in values)
+
+
+def _x_axis(labels) -> np.ndarray:
+    """Timestamps in seconds when every label parses as a date, else positions."""
+    try:
+        return np.array(labels, dtype="datetime64[s]").astype(np.int64).astype(float)
+    except (ValueError, TypeError):
+        return np.arange(len(labels), dtype=float)
+
+
+def decimate_series(series: dict, max_points: int, method: str = "lttb") -> dict:
+    """Decimates a {date string: value} series as produced by ``make_serializable``."""
+    if len(series) <= max_points:
+        return series
+    keys = list(series.keys())
+    values = list(series.values())
+    if not _is_numeric_series(values):
+        return series
+    keep = decimate_indices(_x_axis(keys), _to_float(values), max_points, method)
+    return {keys[i]: values[i] for i in keep}
+
+
+def decimate_chart_data(chart_data: dict, max_points: int, method: str = "lttb") -> dict:
+    """
+    Decimates Chart.js style {"labels": [...], "datasets": [{"data": [...]}, ...]}.
+
+    Every dataset gets an equal share of the budget; the union of their picks is kept
+    so all datasets stay on the same labels.
+    """
+    if not isinstance(chart_data, dict):
+        return chart_data
+    labels = chart_data.get("labels")
+    datasets = chart_data.get("datasets")
+    if not isinstance(labels, list) or not isinstance(datasets, list) or len(labels) <= max_points:
+        return chart_data
+
+    x = _x_axis(labels)
+    budget = max(MIN_POINTS, max_points // max(1, len(datasets)))
+    keep = np.array([0, len(labels) - 1])
+    for dataset in datasets:
+        data = dataset.get("data") if isinstance(dataset, dict) else None
+        if not isinstance(data, list) or len(data) != len(labels) or not _is_numeric_series(data):
+            # Unknown dataset shapes are left alone rather than misaligned
+            return chart_data
+        keep = np.union1d(keep, decimate_indices(x, _to_float(data), budget, method))
+
+    decimated = dict(chart_data)
+    decimated["labels"] = [labels[i] for i in keep]
+    decimated["datasets"] = [
+        {**dataset, "data": [dataset["data"][i] for i in keep]} for dataset in datasets
+    ]
+    return decimated
+
+
+def decimate_results(results: dict, max_points: int, method: str = "lttb") -> dict:
+    """
+    Decimates every time series in a ``quant_stats`` result dict in place.
+
+    Top-level {date: value} series and the custom charts under "charts" are reduced; scalar
+    metrics and the return distribution are left alone.
+    """
+    for key, value in results.items():
+        if key == "charts" and isinstance(value, dict):
+            results[key] = {
+                name: decimate_chart_data(chart, max_points, method) for name, chart in value.items()
+            }
+        elif isinstance(value, dict) and len(value) > max_points:
+            results[key] = decimate_series(value, max_points, method)
+    return results
@@ -0,0 +1,159 @@
+import numpy as np
+import pandas as pd
+
+from data_munging import make_serializable, serialize_dates
+
+EPISODE_COLUMNS = ("start", "valley", "end", "depth", "bars", "duration_days", "recovery_days", "recovered")
+
+
+def underwater(returns):
+    """
+    Drawdown from the running peak of compounded wealth, in one cumulative pass.
+
+    Wealth starts from a baseline of 1.0, so a loss on the first observation already
+    counts as drawdown (as in ``qs.stats.max_drawdown``). DataFrames are handled
+    column-wise with the same array operations.
+
+    Parameters
+    ----------
+    returns : pd.Series or pd.DataFrame
+        Periodic returns; NaN is treated as a flat period
+
+    Returns
+    -------
+    pd.Series or pd.DataFrame
+        Drawdown (<= 0) with the same shape and index as ``returns``
+    """
+    values = np.nan_to_num(np.asarray(returns, dtype=float))
+    wealth = np.cumprod(1.0 + values, axis=0)
+    peaks = np.maximum(np.maximum.accumulate(wealth, axis=0), 1.0)
+    drawdown = wealth / peaks - 1.0
+    if isinstance(returns, pd.DataFrame):
+        return pd.DataFrame(drawdown, index=returns.index, columns=returns.columns)
+    return pd.Series(drawdown, index=returns.index, name=getattr(returns, "name", None))
+
+
+def _episodes(drawdown: np.ndarray, index: pd.DatetimeIndex) -> pd.DataFrame:
+    """Episodes of one underwater curve, found from the change points of ``drawdown < 0``."""
+    below = drawdown < 0
+    n = len(below)
+    edges = np.diff(np.concatenate(([False], below, [False])).astype(np.int8))
+    starts = np.flatnonzero(edges == 1)
+    # ``stops`` is the first row back at the peak, or n for an episode still open
+    stops = np.flatnonzero(edges == -1)
+    if len(starts) == 0:
+        return pd.DataFrame(columns=list(EPISODE_COLUMNS))
+
+    # fmin skips NaN (a wealth curve that overflowed), so every episode keeps its valley
+    depth = np.fmin.reduceat(drawdown, starts) if n else np.array([])
+    # Episode id of every underwater row; the first row hitting the episode minimum is the valley
+    episode = np.cumsum(edges[:-1] == 1) - 1
+    hits = np.flatnonzero(below & (drawdown == depth[np.maximum(episode, 0)]))
+    first_hit = np.concatenate(([True], episode[hits][1:] != episode[hits][:-1]))
+    valleys = hits[first_hit]
+
+    recovered = stops < n
+    dates = pd.DatetimeIndex(index)
+    last_row = np.minimum(stops, n - 1)
+    end_dates = dates[last_row]
+    return pd.DataFrame({
+        "start": dates[starts],
+        "valley": dates[valleys],
+        "end": end_dates.where(recovered),
+        "depth": depth,
+        "bars": stops - starts,
+        "duration_days": (end_dates - dates[starts]).days,
+        "recovery_days": np.where(recovered, (end_dates - dates[valleys]).days, np.nan),
+        "recovered": recovered,
+    })
+
+
+def drawdown_episodes(returns, top: int = None):
+    """
+    Every drawdown episode: when it started, bottomed and recovered, and how deep and long it was.
+
+    Episodes are found with vectorized change-point detection on the underwater curve
+    and their depths with a single ``np.minimum.reduceat``, so the cost is O(n) per
+    column with no Python loop over rows.
+
+    Parameters
+    ----------
+    returns : pd.Series or pd.DataFrame
+        Periodic returns; DataFrames produce one table per column
+    top : int, optional
+        Keep only the ``top`` deepest episodes, deepest first; otherwise episodes are
+        listed in chronological order
+
+    Returns
+    -------
+    pd.DataFrame or dict
+        Columns ``EPISODE_COLUMNS`` ("end" is NaT and "recovery_days" NaN for an episode
+        that has not recovered, "duration_days" then runs to the last observation);
+        a dict of column name -> table for DataFrame input
+    """
+    curve = underwater(returns)
+    if isinstance(curve, pd.DataFrame):
+        return {
+            column: _top(_episodes(curve[column].to_numpy(), curve.index), top)
+            for column in curve.columns
+        }
+    return _top(_episodes(curve.to_numpy(), curve.index), top)
+
+
+def _top(episodes: pd.DataFrame, top: int = None) -> pd.DataFrame:
+    if top is None:
+        return episodes
+    return episodes.sort_values("depth", kind="stable").head(int(top)).reset_index(drop=True)
+
+
+def drawdown_summary(episodes: pd.DataFrame, curve: pd.Series) -> dict:
+    """Headline figures from an episode table and its underwater curve."""
+    return {
+        "max_drawdown": float(curve.min()) if len(curve) else 0.0,
+        "current_drawdown": float(curve.iloc[-1]) if len(curve) else 0.0,
+        "episodes": int(len(episodes)),
+        "average_depth": float(episodes["depth"].mean()) if len(episodes) else 0.0,
+        "average_duration_days": float(episodes["duration_days"].mean()) if len(episodes) else 0.0,
+        "longest_duration_days": int(episodes["duration_days"].max()) if len(episodes) else 0,
+    }
+
+
+def serialize_episodes(episodes: pd.DataFrame) -> list:
+    """Episode table as a list of records with ISO dates and nulls for open episodes."""
+    starts = serialize_dates(episodes["start"])
+    valleys = serialize_dates(episodes["valley"])
+    ends = serialize_dates(episodes["end"])
+    return [
+        {
+            "start": start,
+            "valley": valley,
+            "end": end if recovered else None,
+            "depth": float(depth),
+            "bars": int(bars),
+            "duration_days": int(duration),
+            "recovery_days": int(recovery) if recovered else None,
+            "recovered": bool(recovered),
+        }
+        for start, valley, end, depth, bars, duration, recovery, recovered in zip(
+            starts, valleys, ends, episodes["depth"], episodes["bars"],
+            episodes["duration_days"], episodes["recovery_days"], episodes["recovered"],
+        )
+    ]
+
+
+def drawdown_report(returns: pd.Series, top: int = 10) -> tuple:
+    """
+    Underwater curve and top episodes of one strategy, ready for JSON.
+
+    Returns
+    -------
+    tuple
+        ({date: drawdown}, {"episodes": [...], "summary": {...}})
+    """
+    curve = underwater(returns)
+    episodes = drawdown_episodes(returns)
+    report = {
+        "episodes": serialize_episodes(_top(episodes, top)),
+        "summary": drawdown_summary(episodes, curve),
+    }
+    return make_serializable(curve), report
@@ -5,14 +5,70 @@ import traceback
 import json
 import importlib.util
 import logging
+import threading
 from datetime import datetime
 import uuid
 
 logger = logging.getLogger(__name__)
 
-# Directory to store custom code files
+# Directory to store custom code files (created on first save, not at import)
 CUSTOM_CODE_DIR = os.path.join(os.getcwd(), "custom_metrics")
-os.makedirs(CUSTOM_CODE_DIR, exist_ok=True)
+
+# Modules and helpers injected into every custom code run, resolved on first use
+_runtime_namespace = None
+
+def get_runtime_namespace():
+    """
+    Import pandas, numpy and the backend helpers exposed to custom code once and return them as a dict.
+
+    Returns:
+    --------
+    dict
+        Names made available to custom code in addition to input_data and result
+    """
+    global _runtime_namespace
+    if _runtime_namespace is None:
+        namespace = {
+            "pd": importlib.import_module("pandas"),
+            "np": importlib.import_module("numpy"),
+        }
+        # Add system function if it can be imported
+        try:
+            from system import system
+            namespace["system"] = system
+        except ImportError:
+            pass
+
+        # Add quant_stats function if it can be imported
+        try:
+            from quant import quant_stats
+            namespace["quant_stats"] = quant_stats
+        except ImportError:
+            pass
+
+        # Add the cached universe covariance/correlation matrices
+        try:
+            from correlation import correlation_matrices
+            namespace["correlation_matrices"] = correlation_matrices
+        except ImportError:
+            pass
+
+        # Decorator form of the REQUIRES input declaration
+        try:
+            from data_context import requires
+            namespace["requires"] = requires
+        except ImportError:
+            pass
+
+        # Add the drawdown analytics helpers
+        try:
+            from drawdown import drawdown_episodes, underwater
+            namespace["drawdown_episodes"] = drawdown_episodes
+            namespace["underwater"] = underwater
+        except ImportError:
+            pass
+        _runtime_namespace = namespace
+    return _runtime_namespace
 
 def save_code_to_file(code, name, description=""):
     """
@@ -40,6 +96,7 @@ def save_code_to_file(code, name, description=""):
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"{clean_name}_{timestamp}.py"
         filepath = os.path.join(CUSTOM_CODE_DIR, filename)
+        os.makedirs(CUSTOM_CODE_DIR, exist_ok=True)
         
         # Add header with metadata
         header = f"""# Name: {name}
@@ -67,6 +124,8 @@ def get_all_custom_metrics():
         A list of dictionaries containing information about each metric
     """
     metrics = []
+    if not os.path.isdir(CUSTOM_CODE_DIR):
+        return metrics
     try:
         for filename in os.listdir(CUSTOM_CODE_DIR):
             if filename.endswith('.py'):
@@ -118,7 +177,7 @@ def load_custom_code(filename):
             return f.read()
     return None
 
-def import_custom_metric(filename):
+def import_custom_metric(filename, inputs=None):
     """
     Import a custom metric module from a file.
     
@@ -126,6 +185,8 @@ def import_custom_metric(filename):
     -----------
     filename : str
         The filename of the custom metric
+    inputs : dict, optional
+        Resolved declared inputs, bound as module globals before the module runs
     
     Returns:
     --------
@@ -145,6 +206,9 @@ def import_custom_metric(filename):
         # Import the module from the file
         spec = importlib.util.spec_from_file_location(module_name, filepath)
         module = importlib.util.module_from_spec(spec)
+        # Give imported metrics the same helpers (requires, np, pd, ...) as executed ones
+        module.__dict__.update(get_runtime_namespace())
+        module.__dict__.update(inputs or {})
         spec.loader.exec_module(module)
         
         return module
@@ -152,7 +216,118 @@ def import_custom_metric(filename):
         logger.error(f"Error importing custom metric {filename}: {str(e)}")
         return None
 
-def execute_custom_code(code, input_data=None):
+def resolve_declared_inputs(code, input_data=None, context=None):
+    """
+    Add the inputs a metric declares (REQUIRES = [...] or @requires(...)) to its input data.
+    
+    Parameters:
+    -----------
+    code : str
+        The metric source
+    input_data : dict, optional
+        Inputs supplied by the caller; these win over resolved ones with the same name
+    context : DataContext, optional
+        Shared per-request context to resolve from; a fresh one is used if omitted
+    
+    Returns:
+    --------
+    dict
+        input_data extended with every declared input, or input_data unchanged when
+        the metric declares nothing
+    """
+    from data_context import DataContext, declared_inputs
+
+    names = declared_inputs(code)
+    if not names:
+        return input_data
+    merged = dict(input_data or {})
+    missing = [name for name in names if name not in merged]
+    if missing:
+        merged.update((context or DataContext()).resolve(missing))
+    return merged
+
+def error_result(error):
+    """The ``execute_custom_code`` result of a run that failed with ``error`` before any code ran."""
+    return {
+        "success": False,
+        "stdout": "",
+        "error": f"{type(error).__name__}: {str(error)}",
+        "traceback": "".join(traceback.format_exception(error)),
+    }
+
+class LineStream(io.StringIO):
+    """
+    stdout replacement that keeps the full output and also hands every completed line
+    to ``on_line`` as soon as it is printed.
+    """
+    def __init__(self, on_line):
+        super().__init__()
+        self.on_line = on_line
+        self._partial = ""
+
+    def write(self, text):
+        written = super().write(text)
+        lines = (self._partial + text).split("\n")
+        self._partial = lines.pop()
+        for line in lines:
+            self.on_line(line)
+        return written
+
+    def finish(self):
+        """Emits a trailing line that was printed without a newline."""
+        if self._partial:
+            self.on_line(self._partial)
+            self._partial = ""
+
+class ThreadStdout:
+    """
+    ``sys.stdout`` replacement that sends each thread's writes to that thread's capture
+    buffer, or to the real stdout when the thread is not capturing.
+
+    It is installed once and never swapped back, so custom code running on several server
+    threads at once cannot read each other's output or restore each other's buffer.
+    """
+    def __init__(self, default):
+        self.default = default
+        self._local = threading.local()
+
+    @property
+    def target(self):
+        return getattr(self._local, "buffer", None) or self.default
+
+    def write(self, text):
+        return self.target.write(text)
+
+    def flush(self):
+        return self.target.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.target, name)
+
+_stdout_lock = threading.Lock()
+
+def _thread_stdout():
+    """Installs the ``ThreadStdout`` proxy as ``sys.stdout`` (again, if something replaced it)."""
+    with _stdout_lock:
+        if not isinstance(sys.stdout, ThreadStdout):
+            sys.stdout = ThreadStdout(sys.stdout)
+        return sys.stdout
+
+def start_capture(buffer):
+    """
+    Sends what the current thread prints to ``buffer`` until ``stop_capture``; returns the
+    thread's previous buffer (captures can nest).
+    """
+    proxy = _thread_stdout()
+    previous = getattr(proxy._local, "buffer", None)
+    proxy._local.buffer = buffer
+    return previous
+
+def stop_capture(previous):
+    """Restores the current thread's buffer from before ``start_capture``."""
+    _thread_stdout()._local.buffer = previous
+
+def execute_custom_code(code, input_data=None, context=None, on_output=None):
     """
     Execute custom Python code and return the result.
     
@@ -162,6 +337,11 @@ def execute_custom_code(code, input_data=None):
         The Python code to execute
     input_data : dict, optional
         Input data to make available to the code
+    context : DataContext, optional
+        Source for the inputs the code declares in REQUIRES; each declared input is
+        also bound as a variable of the same name
+    on_output : callable, optional
+        Called with each line the code prints, while it runs
     
     Returns:
     --------
@@ -169,10 +349,7 @@ def execute_custom_code(code, input_data=None):
         A dictionary containing the execution results
     """
     # Create a string buffer to capture stdout
-    stdout_buffer = io.StringIO()
-    
-    # Store the original stdout
-    original_stdout = sys.stdout
+    stdout_buffer = LineStream(on_output) if on_output else io.StringIO()
     
     # Prepare the result dictionary
     result = {
@@ -181,31 +358,19 @@ def execute_custom_code(code, input_data=None):
         "error": None
     }
     
+    # Capture what this thread prints; other threads keep their own output
+    previous_buffer = start_capture(stdout_buffer)
     try:
-        # Redirect stdout to our buffer
-        sys.stdout = stdout_buffer
+        # Resolve declared inputs before running anything
+        from data_context import declared_inputs
+        input_data = resolve_declared_inputs(code, input_data, context)
         
         # Create a local namespace
-        local_namespace = {
-            "input_data": input_data,
-            "pd": __import__("pandas"),
-            "np": __import__("numpy"),
-            "result": result
-        }
-        
-        # Add system function if it's defined in the global scope
-        try:
-            from system import system
-            local_namespace["system"] = system
-        except ImportError:
-            pass
-        
-        # Add quant_stats function if it's defined in the global scope
-        try:
-            from quant import quant_stats
-            local_namespace["quant_stats"] = quant_stats
-        except ImportError:
-            pass
+        local_namespace = dict(get_runtime_namespace())
+        for name in declared_inputs(code):
+            local_namespace[name] = input_data[name]
+        local_namespace["input_data"] = input_data
+        local_namespace["result"] = result
         
         # Execute the code
         exec(code, local_namespace)
@@ -235,7 +400,9 @@ def execute_custom_code(code, input_data=None):
         result["traceback"] = traceback.format_exc()
         
     finally:
-        # Restore the original stdout
-        sys.stdout = original_stdout
+        # Stop capturing this thread's output
+        stop_capture(previous_buffer)
+        if on_output:
+            stdout_buffer.finish()
     
     return result
\ No newline at end of file
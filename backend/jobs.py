@@ -0,0 +1,330 @@
+import itertools
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from typing import Callable, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Runtime state (job store, metric cache) lives in $DATA_DIR, next to this module by default,
+# so it does not depend on the directory the server was started from
+DATA_DIR = os.getenv("DATA_DIR") or os.path.dirname(os.path.abspath(__file__))
+JOBS_DB_PATH = os.path.join(DATA_DIR, "jobs.sqlite3")
+
+STATES = ("queued", "running", "succeeded", "failed", "cancelled")
+FINISHED_STATES = ("succeeded", "failed", "cancelled")
+
+# Separate worker pools, so dashboard requests never wait behind research batches
+LANES = ("interactive", "batch")
+DEFAULT_WORKERS = {"interactive": 2, "batch": 2}
+
+
+class JobCancelled(Exception):
+    """Raised inside a task when its job has been cancelled."""
+
+
+def _to_json(value):
+    """json.dumps fallback for NumPy and pandas values left in task results."""
+    if isinstance(value, np.generic):
+        return None if isinstance(value, np.floating) and np.isnan(value) else value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, (pd.Series, pd.DataFrame, pd.Timestamp)):
+        from data_munging import make_serializable
+        return make_serializable(value)
+    return str(value)
+
+
+class JobStore:
+    """
+    SQLite persistence for job state, so results survive the request that started them
+    and the job list survives a restart.
+    """
+
+    def __init__(self, path: str = JOBS_DB_PATH) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    lane TEXT NOT NULL,
+                    priority INTEGER NOT NULL DEFAULT 0,
+                    state TEXT NOT NULL,
+                    progress REAL NOT NULL DEFAULT 0,
+                    message TEXT,
+                    params TEXT,
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )"""
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, created_at)")
+
+    def insert(self, job: dict) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT INTO jobs ({', '.join(job)}) VALUES ({', '.join('?' for _ in job)})",
+                list(job.values()),
+            )
+
+    def update(self, job_id: str, **fields) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"UPDATE jobs SET {', '.join(f'{name} = ?' for name in fields)} WHERE id = ?",
+                [*fields.values(), job_id],
+            )
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def list(self, state: str = None, limit: int = 50) -> list:
+        query = "SELECT id, kind, lane, priority, state, progress, message, error, created_at, started_at, finished_at FROM jobs"
+        args = []
+        if state:
+            query += " WHERE state = ?"
+            args.append(state)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        args.append(int(limit))
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(query, args).fetchall()]
+
+    def by_state(self, state: str) -> list:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM jobs WHERE state = ? ORDER BY created_at", (state,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+
+class Job:
+    """Handle passed to a running task for progress reports and cancellation checks."""
+
+    def __init__(self, manager: "JobManager", job_id: str, kind: str, params: dict) -> None:
+        self.id = job_id
+        self.kind = kind
+        self.params = params
+        self._manager = manager
+        self._cancel = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def check_cancelled(self) -> None:
+        """Raises JobCancelled if the job was cancelled; call between units of work."""
+        if self._cancel.is_set():
+            raise JobCancelled(self.id)
+
+    def report(self, progress: float, message: str = None) -> None:
+        """Records progress in [0, 1] and an optional status message."""
+        self._manager._update(self.id, progress=float(progress), message=message)
+
+
+class JobManager:
+    """
+    Runs registered tasks on bounded worker pools, one pool per lane.
+
+    Each lane has its own priority queue and threads: a job's ``priority`` orders it
+    within its lane (higher first, then oldest first), and a full batch lane cannot
+    delay the interactive one. Cancellation removes queued jobs immediately and stops
+    running ones at their next ``job.check_cancelled()``.
+    """
+
+    def __init__(self, tasks: Dict[str, Callable], store: JobStore = None, workers: dict = None) -> None:
+        self.tasks = dict(tasks)
+        self.store = store or JobStore()
+        self._queues = {lane: queue.PriorityQueue() for lane in LANES}
+        self._sequence = itertools.count()
+        self._active: Dict[str, Job] = {}
+        # Guards a job's start and finish against cancel(), so a cancellation is either seen
+        # before the job starts, delivered to the running job, or refused once it finished
+        self._lock = threading.Lock()
+        # Change counter of every unfinished job, and of finished ones until their last
+        # waiter has seen the final change; a missing entry means the job has finished
+        self._versions: Dict[str, int] = {}
+        self._waiters: Dict[str, int] = {}
+        self._finished_ids = set()
+        self._changed = threading.Condition()
+        self._stopping = threading.Event()
+        self._threads = []
+        for lane, count in {**DEFAULT_WORKERS, **(workers or {})}.items():
+            for number in range(int(count)):
+                thread = threading.Thread(
+                    target=self._work, args=(lane,), name=f"jobs-{lane}-{number}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+        self._recover()
+
+    def _recover(self) -> None:
+        """Fails jobs interrupted by a restart and re-queues the ones that never started."""
+        for job in self.store.by_state("running"):
+            self.store.update(job["id"], state="failed", error="Interrupted by server restart",
+                              finished_at=time.time())
+        for job in self.store.by_state("queued"):
+            with self._changed:
+                self._versions.setdefault(job["id"], 0)
+            self._queues.get(job["lane"], self._queues["batch"]).put(
+                (-job["priority"], next(self._sequence), job["id"])
+            )
+
+    def _update(self, job_id: str, **fields) -> None:
+        self.store.update(job_id, **fields)
+        with self._changed:
+            self._versions[job_id] = self._versions.get(job_id, 0) + 1
+            self._changed.notify_all()
+            if fields.get("state") in FINISHED_STATES:
+                if self._waiters.get(job_id):
+                    self._finished_ids.add(job_id)
+                else:
+                    self._versions.pop(job_id, None)
+
+    def submit(self, kind: str, params: dict = None, lane: str = "batch", priority: int = 0) -> str:
+        """
+        Queues a task and returns its job ID.
+
+        Raises
+        ------
+        ValueError
+            For an unknown task kind or lane, or a priority that is not an integer
+        """
+        if kind not in self.tasks:
+            raise ValueError(f"Unknown job kind '{kind}'; use one of {sorted(self.tasks)}.")
+        if lane not in LANES:
+            raise ValueError(f"Unknown lane '{lane}'; use one of {LANES}.")
+        try:
+            priority = int(priority)
+        except (TypeError, ValueError):
+            raise ValueError(f"priority must be an integer, got {priority!r}.")
+        job_id = uuid.uuid4().hex
+        with self._changed:
+            self._versions[job_id] = 0
+        self.store.insert({
+            "id": job_id, "kind": kind, "lane": lane, "priority": priority, "state": "queued",
+            "progress": 0.0, "params": json.dumps(params or {}, default=_to_json), "created_at": time.time(),
+        })
+        self._queues[lane].put((-priority, next(self._sequence), job_id))
+        logger.info(f"Queued {kind} job {job_id} on the {lane} lane")
+        return job_id
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancels a queued or running job; returns False if it already finished or does not exist."""
+        with self._lock:
+            job = self.store.get(job_id)
+            if job is None or job["state"] in FINISHED_STATES:
+                return False
+            active = self._active.get(job_id)
+            if active is not None:
+                active._cancel.set()
+            else:
+                # Still queued: the worker that dequeues it skips it as no longer "queued"
+                self._update(job_id, state="cancelled", finished_at=time.time())
+            return True
+
+    def get(self, job_id: str, include_result: bool = True) -> Optional[dict]:
+        """Job state with parsed params and, once finished, the parsed result."""
+        job = self.store.get(job_id)
+        if job is None:
+            return None
+        job["params"] = json.loads(job["params"]) if job["params"] else {}
+        if include_result and job["result"] is not None:
+            job["result"] = json.loads(job["result"])
+        elif not include_result:
+            job.pop("result")
+        return job
+
+    def list(self, state: str = None, limit: int = 50) -> list:
+        return self.store.list(state, limit)
+
+    def wait(self, job_id: str, version: int = 0, timeout: float = 15.0) -> int:
+        """
+        Blocks until the job changes past ``version`` (or ``timeout``) and returns its new
+        version. Returns at once for a job that has already finished.
+        """
+        with self._changed:
+            self._waiters[job_id] = self._waiters.get(job_id, 0) + 1
+            try:
+                self._changed.wait_for(lambda: self._versions.get(job_id, version + 1) > version, timeout=timeout)
+                return self._versions.get(job_id, version + 1)
+            finally:
+                self._waiters[job_id] -= 1
+                if not self._waiters[job_id]:
+                    del self._waiters[job_id]
+                    if job_id in self._finished_ids:
+                        self._finished_ids.discard(job_id)
+                        self._versions.pop(job_id, None)
+
+    def _work(self, lane: str) -> None:
+        while not self._stopping.is_set():
+            try:
+                _, _, job_id = self._queues[lane].get(timeout=0.5)
+            except queue.Empty:
+                continue
+            with self._lock:
+                record = self.store.get(job_id)
+                if record is None or record["state"] != "queued":
+                    continue
+                params = json.loads(record["params"]) if record["params"] else {}
+                job = Job(self, job_id, record["kind"], params)
+                self._active[job_id] = job
+                self._update(job_id, state="running", started_at=time.time())
+            self._run(job)
+
+    def _run(self, job: Job) -> None:
+        job_id = job.id
+        try:
+            result = self.tasks[job.kind](job.params, job)
+            outcome = {"state": "succeeded", "progress": 1.0, "result": json.dumps(result, default=_to_json)}
+        except JobCancelled:
+            outcome = {"state": "cancelled"}
+        except Exception as e:
+            logger.error(f"Job {job_id} ({job.kind}) failed: {str(e)}")
+            outcome = {"state": "failed", "error": f"{type(e).__name__}: {str(e)}",
+                       "message": traceback.format_exc(limit=5)}
+        # A cancel() that got in before this point wins, whatever the task returned
+        with self._lock:
+            if job.cancelled:
+                outcome = {"state": "cancelled"}
+            self._update(job_id, finished_at=time.time(), **outcome)
+            self._active.pop(job_id, None)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stops the workers after their current job."""
+        self._stopping.set()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+
+_manager: Optional[JobManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_job_manager() -> JobManager:
+    """Returns the process-wide job manager, starting its workers on first use."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            from tasks import TASKS
+            _manager = JobManager(TASKS)
+        return _manager
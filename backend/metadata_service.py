@@ -0,0 +1,285 @@
+import csv
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# Mapping of model property names to CSV header names
+HEADER_MAPPING = [
+    ("databento_symbol", "Databento Symbol"),
+    ("ib_symbol", "IB Symbol"),
+    ("name", "Name"),
+    ("exchange", "Exchange"),
+    ("intraday_initial_margin", "Intraday Initial Margin"),
+    ("intraday_maintenance_margin", "Intraday Maintenance Margin"),
+    ("overnight_initial_margin", "Overnight Initial Margin"),
+    ("overnight_maintenance_margin", "Overnight Maintenance Margin"),
+    ("asset_type", "Asset Type"),
+    ("sector", "Sector"),
+    ("contract_size", "Contract Size"),
+    ("units", "Units"),
+    ("minimum_price_fluctuation", "Minimum Price Fluctuation"),
+    ("tick_size", "Tick Size"),
+    ("settlement_type", "Settlement Type"),
+    ("trading_hours", "Trading Hours (EST)"),
+    ("data_provider", "Data Provider"),
+    ("dataset", "Dataset"),
+    ("newest_month_additions", "Newest Month Additions"),
+    ("contract_months", "Contract Months"),
+    ("time_of_expiry", "Time of Expiry")
+]
+
+# Fields with a prebuilt value -> symbols lookup
+INDEXED_FIELDS = ("sector", "exchange", "asset_type")
+
+# Fields matched by the free-text search
+SEARCH_FIELDS = ("name", "databento_symbol", "ib_symbol")
+
+DEFAULT_TTL_SECONDS = 300
+MAX_PAGE_SIZE = 500
+
+# Default location of the CSV served by the frontend (root/frontend/public/metadata.csv)
+DEFAULT_CSV_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "frontend", "public", "metadata.csv"
+)
+
+
+def _load_from_database() -> List[Dict[str, Any]]:
+    from data_access import DataAccess
+
+    return DataAccess().get_contract_metadata()
+
+
+class _Snapshot(NamedTuple):
+    """One loaded version of the table; replaced whole, never modified."""
+
+    records: List[Dict[str, Any]]
+    by_symbol: Dict[str, Dict[str, Any]]
+    by_field: Dict[str, Dict[str, List[str]]]
+    content_hash: Optional[str]
+
+
+_EMPTY = _Snapshot([], {}, {field: {} for field in INDEXED_FIELDS}, None)
+
+
+class MetadataIndex:
+    """
+    In-memory index over ``metadata.contract_metadata``.
+
+    The table is read once and kept with symbol, sector, exchange and asset-type lookups.
+    It is reloaded when the TTL expires or after ``invalidate()`` (called after every
+    ingest), and the CSV export is rewritten only when the content hash changes.
+
+    The records and lookups are published together as one immutable snapshot, so a reader
+    that takes the snapshot once never mixes the records of one load with the lookups of
+    another.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[], List[Dict[str, Any]]] = _load_from_database,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        csv_path: str = DEFAULT_CSV_PATH,
+    ) -> None:
+        self.loader = loader
+        self.ttl_seconds = ttl_seconds
+        self.csv_path = csv_path
+        self.logger: logging.Logger = logger
+
+        self._lock = threading.RLock()
+        self._loaded_at: Optional[float] = None
+        self._stale = True
+        self._snapshot = _EMPTY
+        self._written_hash: Optional[str] = None
+
+    def invalidate(self) -> None:
+        """Marks the index stale so the next read reloads it from the database."""
+        self._stale = True
+
+    def _is_fresh(self) -> bool:
+        return (
+            not self._stale
+            and self._loaded_at is not None
+            and time.monotonic() - self._loaded_at < self.ttl_seconds
+        )
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        Reloads the index if it is stale, expired or ``force`` is set.
+
+        Returns:
+            bool: True if the content changed.
+        """
+        if not force and self._is_fresh():
+            return False
+        with self._lock:
+            # Another request may have refreshed while this one waited for the lock
+            if not force and self._is_fresh():
+                return False
+
+            records = [
+                {field: record.get(field, "") for field, _ in HEADER_MAPPING}
+                for record in self.loader()
+            ]
+            records.sort(key=lambda record: str(record["databento_symbol"]))
+            content_hash = hashlib.sha256(
+                json.dumps(records, sort_keys=True, default=str).encode("utf-8")
+            ).hexdigest()
+
+            changed = content_hash != self._snapshot.content_hash
+            if changed:
+                by_field = {field: {} for field in INDEXED_FIELDS}
+                for record in records:
+                    for field in INDEXED_FIELDS:
+                        by_field[field].setdefault(str(record[field]), []).append(record["databento_symbol"])
+                by_symbol = {record["databento_symbol"]: record for record in records}
+                self._snapshot = _Snapshot(records, by_symbol, by_field, content_hash)
+                self.logger.info(f"Loaded {len(records)} metadata records (hash {content_hash[:12]}).")
+
+            self._loaded_at = time.monotonic()
+            self._stale = False
+            return changed
+
+    def snapshot(self) -> _Snapshot:
+        """Refreshes if needed and returns the current (records, by_symbol, by_field, content_hash)."""
+        self.refresh()
+        return self._snapshot
+
+    @property
+    def content_hash(self) -> Optional[str]:
+        return self._snapshot.content_hash
+
+    @property
+    def records(self) -> List[Dict[str, Any]]:
+        return self.snapshot().records
+
+    def get(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """Returns the record for a databento symbol, or None."""
+        return self.snapshot().by_symbol.get(symbol)
+
+    def symbols_by(self, field: str, value: str) -> List[str]:
+        """Returns the symbols whose ``field`` (sector, exchange or asset_type) equals ``value``."""
+        if field not in INDEXED_FIELDS:
+            raise ValueError(f"'{field}' is not an indexed field; use one of {INDEXED_FIELDS}.")
+        return list(self.snapshot().by_field[field].get(value, []))
+
+    def facets(self) -> Dict[str, List[str]]:
+        """Returns the distinct values of every indexed field, for filter dropdowns."""
+        return {field: sorted(values) for field, values in self.snapshot().by_field.items()}
+
+    def query(
+        self,
+        filters: Optional[Dict[str, List[str]]] = None,
+        search: str = "",
+        sort_by: str = "databento_symbol",
+        descending: bool = False,
+        page: int = 1,
+        page_size: int = 50,
+    ) -> Dict[str, Any]:
+        """
+        Filters, sorts and paginates the metadata records.
+
+        Args:
+            filters (Optional[Dict[str, List[str]]]): Field -> accepted values. Indexed
+                fields are resolved through the prebuilt lookups.
+            search (str): Case-insensitive substring matched against name and symbols.
+            sort_by (str): Model field to sort on.
+            descending (bool): Sort order.
+            page (int): 1-based page number.
+            page_size (int): Records per page, capped at MAX_PAGE_SIZE.
+
+        Returns:
+            Dict[str, Any]: {"total", "page", "page_size", "records", "facets", "hash"}, all
+            from the same snapshot of the table
+        """
+        fields = {field for field, _ in HEADER_MAPPING}
+        if sort_by not in fields:
+            raise ValueError(f"Unknown sort field '{sort_by}'.")
+        snapshot = self.snapshot()
+
+        candidates = None
+        for field, values in (filters or {}).items():
+            if field not in fields:
+                raise ValueError(f"Unknown filter field '{field}'.")
+            if field in INDEXED_FIELDS:
+                matched = {symbol for value in values for symbol in snapshot.by_field[field].get(value, [])}
+            else:
+                accepted = set(values)
+                matched = {r["databento_symbol"] for r in snapshot.records if str(r[field]) in accepted}
+            candidates = matched if candidates is None else candidates & matched
+
+        records = snapshot.records if candidates is None else [
+            r for r in snapshot.records if r["databento_symbol"] in candidates
+        ]
+        if search:
+            needle = search.lower()
+            records = [
+                r for r in records
+                if any(needle in str(r[field]).lower() for field in SEARCH_FIELDS)
+            ]
+        if sort_by != "databento_symbol" or descending:
+            records = sorted(records, key=lambda r: str(r[sort_by]), reverse=descending)
+
+        page_size = max(1, min(int(page_size), MAX_PAGE_SIZE))
+        page = max(1, int(page))
+        start = (page - 1) * page_size
+        return {
+            "total": len(records),
+            "page": page,
+            "page_size": page_size,
+            "records": records[start:start + page_size],
+            "facets": {field: sorted(values) for field, values in snapshot.by_field.items()},
+            "hash": snapshot.content_hash,
+        }
+
+    def to_csv(self, records: Optional[List[Dict[str, Any]]] = None) -> str:
+        """Renders the records (the current ones by default) with the CSV header names used by the frontend."""
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=[header for _, header in HEADER_MAPPING])
+        writer.writeheader()
+        for record in self.records if records is None else records:
+            writer.writerow({header: record.get(field, "") for field, header in HEADER_MAPPING})
+        return buffer.getvalue()
+
+    def export_csv(self) -> bool:
+        """
+        Writes the CSV export if the content changed since the last write.
+
+        The file is written to a temporary path and atomically renamed, so concurrent
+        readers never see a partially written file.
+
+        Returns:
+            bool: True if the file was rewritten.
+        """
+        snapshot = self.snapshot()
+        if self._written_hash == snapshot.content_hash and os.path.exists(self.csv_path):
+            return False
+        with self._lock:
+            snapshot = self._snapshot
+            if self._written_hash == snapshot.content_hash and os.path.exists(self.csv_path):
+                return False
+            os.makedirs(os.path.dirname(self.csv_path), exist_ok=True)
+            temp_path = f"{self.csv_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, "w", newline="", encoding="utf-8") as csvfile:
+                csvfile.write(self.to_csv(snapshot.records))
+            os.replace(temp_path, self.csv_path)
+            self._written_hash = snapshot.content_hash
+            self.logger.info(f"Wrote metadata CSV to {self.csv_path}.")
+            return True
+
+
+_metadata_index: Optional[MetadataIndex] = None
+
+
+def get_metadata_index() -> MetadataIndex:
+    """Returns the process-wide metadata index, creating it on first use."""
+    global _metadata_index
+    if _metadata_index is None:
+        _metadata_index = MetadataIndex()
+    return _metadata_index
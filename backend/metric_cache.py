@@ -0,0 +1,285 @@
+import hashlib
+import logging
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Default on-disk location under $DATA_DIR, the same data directory as the job store
+# (``jobs.DATA_DIR``), next to this module by default (created on first store)
+CACHE_DIR = os.path.join(os.getenv("DATA_DIR") or os.path.dirname(os.path.abspath(__file__)), "metric_cache")
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_DISK_BYTES = 256 * 1024 * 1024
+# Metrics may read the database themselves, so entries also expire after this long
+DEFAULT_TTL_SECONDS = 3600
+
+# Input keys that identify a transport rather than data (e.g. a shared-memory block name)
+UNHASHED_INPUTS = ("shared_data",)
+
+
+class Uncacheable(Exception):
+    """Raised when an input cannot be fingerprinted, so the call must not be cached."""
+
+
+def _hash_array(digest, values: np.ndarray) -> None:
+    if values.dtype.kind in "biufcmM":
+        digest.update(np.ascontiguousarray(values).view(np.uint8).data)
+    else:
+        digest.update(pd.util.hash_array(np.asarray(values, dtype=object)).view(np.uint8).data)
+
+
+def fingerprint(value, digest=None) -> str:
+    """
+    Cheap content fingerprint of custom metric inputs.
+
+    Arrays, Series and DataFrames contribute their type, shape, dtype and first/last index
+    labels followed by a BLAKE2 hash of their raw buffers (one linear pass, no copies for
+    contiguous numeric data). Dicts, lists and scalars are walked recursively.
+
+    Raises
+    ------
+    Uncacheable
+        For objects whose content cannot be described this way
+    """
+    top = digest is None
+    digest = digest or hashlib.blake2b(digest_size=16)
+
+    if isinstance(value, pd.DataFrame):
+        digest.update(f"DataFrame{value.shape}{list(value.columns)}{list(value.dtypes)}".encode())
+        fingerprint(value.index, digest)
+        for column in value.columns:
+            _hash_array(digest, value[column].to_numpy())
+    elif isinstance(value, pd.Series):
+        digest.update(f"Series{value.shape}{value.dtype}{value.name}".encode())
+        fingerprint(value.index, digest)
+        _hash_array(digest, value.to_numpy())
+    elif isinstance(value, pd.Index):
+        bounds = (value[0], value[-1]) if len(value) else ()
+        digest.update(f"Index{len(value)}{value.dtype}{bounds}".encode())
+        _hash_array(digest, value.to_numpy())
+    elif isinstance(value, np.ndarray):
+        digest.update(f"ndarray{value.shape}{value.dtype}".encode())
+        _hash_array(digest, value)
+    elif isinstance(value, dict):
+        digest.update(b"dict")
+        for key in sorted(value, key=str):
+            if key in UNHASHED_INPUTS:
+                continue
+            digest.update(repr(key).encode())
+            fingerprint(value[key], digest)
+    elif isinstance(value, (list, tuple)):
+        digest.update(f"{type(value).__name__}{len(value)}".encode())
+        for item in value:
+            fingerprint(item, digest)
+    elif value is None or isinstance(value, (str, bytes, bool, int, float, np.generic, pd.Timestamp)):
+        digest.update(f"{type(value).__name__}:{value!r}".encode())
+    else:
+        raise Uncacheable(f"Cannot fingerprint {type(value).__name__}")
+
+    return digest.hexdigest() if top else ""
+
+
+def cache_key(code: str, input_data=None, namespace: str = "execute") -> str:
+    """
+    SHA-256 of the metric source plus the fingerprint of its inputs. ``namespace`` keeps
+    results of different call paths over the same source (exec vs import) apart.
+    """
+    code_hash = hashlib.sha256(f"{namespace}\0{code}".encode("utf-8")).hexdigest()
+    return f"{code_hash}-{fingerprint(input_data)}"
+
+
+class MetricCache:
+    """
+    Two-level memo of custom metric results: an in-process LRU of pickled results bounded
+    by entry count and bytes, backed by one pickle file per key bounded by total disk size.
+
+    Results are stored pickled so every hit hands out a fresh copy that callers may mutate.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = CACHE_DIR,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        max_disk_bytes: int = DEFAULT_MAX_DISK_BYTES,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+    ) -> None:
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._stats = {"hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0, "uncacheable": 0}
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def _remember(self, key: str, payload: bytes, stored_at: float) -> None:
+        if key in self._entries:
+            self._bytes -= len(self._entries.pop(key)[0])
+        self._entries[key] = (payload, stored_at)
+        self._bytes += len(payload)
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            _, (evicted, _) = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+            self._stats["evictions"] += 1
+
+    def get(self, key: str):
+        """Returns ``(True, result)`` on a fresh hit, else ``(False, None)``."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[1] < self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return True, pickle.loads(entry[0])
+
+            if self.cache_dir:
+                path = self._path(key)
+                try:
+                    stored_at = os.path.getmtime(path)
+                    if now - stored_at < self.ttl_seconds:
+                        with open(path, "rb") as f:
+                            payload = f.read()
+                        result = pickle.loads(payload)
+                        self._remember(key, payload, stored_at)
+                        self._stats["disk_hits"] += 1
+                        return True, result
+                except (OSError, pickle.UnpicklingError, EOFError):
+                    pass
+
+            self._stats["misses"] += 1
+            return False, None
+
+    def put(self, key: str, result) -> None:
+        """Stores a result in memory and on disk; unpicklable results are skipped."""
+        try:
+            payload = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            logger.warning(f"Not caching metric result: {e}")
+            return
+        with self._lock:
+            self._remember(key, payload, time.time())
+            self._stats["stores"] += 1
+        if self.cache_dir and len(payload) <= self.max_disk_bytes:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                tmp_path = f"{self._path(key)}.{os.getpid()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(payload)
+                os.replace(tmp_path, self._path(key))
+                self._trim_disk()
+            except OSError as e:
+                logger.warning(f"Could not write metric cache file: {e}")
+
+    def _trim_disk(self) -> None:
+        """Deletes the oldest cache files until the directory fits in ``max_disk_bytes``."""
+        files = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".pkl"):
+                stat = os.stat(os.path.join(self.cache_dir, name))
+                files.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in files)
+        for _, size, name in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            os.remove(os.path.join(self.cache_dir, name))
+            total -= size
+
+    def get_or_compute(
+        self,
+        code: str,
+        input_data,
+        compute: Callable[[], dict],
+        cache_if: Callable = None,
+        namespace: str = "execute",
+    ):
+        """
+        Returns the cached result for ``(code, input_data)`` or calls ``compute()`` and stores
+        its result when ``cache_if(result)`` is true (by default, always).
+        """
+        try:
+            key = cache_key(code, input_data, namespace)
+        except Uncacheable as e:
+            with self._lock:
+                self._stats["uncacheable"] += 1
+            logger.info(f"Metric inputs not cacheable: {e}")
+            return compute()
+
+        found, result = self.get(key)
+        if found:
+            return result
+        result = compute()
+        if cache_if is None or cache_if(result):
+            self.put(key, result)
+        return result
+
+    def clear(self) -> None:
+        """Drops every entry in memory and on disk."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            if self.cache_dir and os.path.isdir(self.cache_dir):
+                for name in os.listdir(self.cache_dir):
+                    if name.endswith(".pkl"):
+                        os.remove(os.path.join(self.cache_dir, name))
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["disk_hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": (self._stats["hits"] + self._stats["disk_hits"]) / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "max_disk_bytes": self.max_disk_bytes,
+                "ttl_seconds": self.ttl_seconds,
+            }
+
+
+_metric_cache: Optional[MetricCache] = None
+
+
+def get_metric_cache() -> MetricCache:
+    """Returns the process-wide metric cache."""
+    global _metric_cache
+    if _metric_cache is None:
+        _metric_cache = MetricCache()
+    return _metric_cache
+
+
+def cached_execute(code: str, input_data=None, use_cache: bool = True, context=None) -> dict:
+    """
+    ``execute_custom_code`` memoized on the code and a fingerprint of ``input_data``.
+
+    Inputs the code declares in ``REQUIRES`` are resolved from ``context`` first so they
+    are part of the fingerprint. Failed runs are never cached so a fixed metric or a
+    transient error reruns next time.
+    """
+    from glass_factory import error_result, execute_custom_code, resolve_declared_inputs
+
+    try:
+        input_data = resolve_declared_inputs(code, input_data, context)
+    except Exception as e:
+        # Reported like any other failed run, without loading the inputs a second time
+        return error_result(e)
+    if not use_cache:
+        return execute_custom_code(code, input_data)
+    return get_metric_cache().get_or_compute(
+        code, input_data, lambda: execute_custom_code(code, input_data),
+        cache_if=lambda result: result.get("success", False),
+    )
@@ -0,0 +1,243 @@
+import logging
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+PRICE_FIELDS = ("open", "high", "low", "close")
+FIELDS = PRICE_FIELDS + ("volume",)
+# Column order of the long-format frames ``system()`` has always returned
+FRAME_COLUMNS = FIELDS + ("symbol",)
+
+DEFAULT_TTL_SECONDS = 300
+
+
+def _readonly(array: np.ndarray) -> np.ndarray:
+    array.flags.writeable = False
+    return array
+
+
+def _code_dtype(count: int) -> np.dtype:
+    """Smallest signed integer type that holds ``count`` symbol codes."""
+    for dtype in (np.int8, np.int16, np.int32):
+        if count <= np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+class OHLCVStore:
+    """
+    Bars of many symbols in one set of contiguous, typed, read-only columns.
+
+    Rows are sorted by (symbol code, time). Symbols are stored once as categories and each
+    row only carries a small integer code; ``offsets`` gives every symbol its [start, end)
+    row range, so selecting a symbol is a dict lookup and a date range within it is two
+    binary searches. ``arrays`` and ``frame`` return views over the columns instead of
+    copies, flagged non-writeable so one consumer cannot change another's bars.
+
+    Symbol codes follow the order the symbols were listed in when the store was built, so
+    symbols that are read together (a group in ``system()``) can be kept adjacent and
+    served as a single zero-copy slice.
+    """
+
+    def __init__(self, times: np.ndarray, codes: np.ndarray, categories: List[str],
+                 columns: Dict[str, np.ndarray]) -> None:
+        self.categories = list(categories)
+        self.times = _readonly(times)
+        self.codes = _readonly(codes)
+        self.columns = {field: _readonly(columns[field]) for field in FIELDS}
+        self._dtype = pd.CategoricalDtype(self.categories)
+
+        bounds = np.searchsorted(self.codes, np.arange(len(self.categories) + 1))
+        self.offsets: Dict[str, tuple] = {
+            symbol: (int(bounds[code]), int(bounds[code + 1]))
+            for code, symbol in enumerate(self.categories)
+            if bounds[code + 1] > bounds[code]
+        }
+
+    @classmethod
+    def from_records(cls, records: List[dict], symbols: Optional[Iterable[str]] = None,
+                     price_dtype=np.float64) -> "OHLCVStore":
+        """
+        Builds a store from ``DataAccess.get_ohlcv_data`` records.
+
+        Parameters
+        ----------
+        records : list of dict
+            OHLCV rows with "time", "symbol" and the ``FIELDS`` keys, in any order
+        symbols : iterable of str, optional
+            Symbol order for the codes; symbols with no records still get a code and
+            symbols missing from this list are appended in sorted order
+        price_dtype : numpy dtype
+            np.float64 (default) or np.float32 to halve the price columns
+
+        Returns
+        -------
+        OHLCVStore
+        """
+        frame = pd.DataFrame(records, columns=["time", *FIELDS, "symbol"])
+        return cls.from_frame(frame.set_index("time"), symbols=symbols, price_dtype=price_dtype)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, symbols: Optional[Iterable[str]] = None,
+                   price_dtype=np.float64) -> "OHLCVStore":
+        """Builds a store from a long-format frame with a time index and a "symbol" column."""
+        order = list(dict.fromkeys(symbols or []))
+        order += sorted(set(df["symbol"].astype(str)) - set(order))
+
+        index = pd.DatetimeIndex(pd.to_datetime(df.index))
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        times = index.values
+        codes = pd.Categorical(df["symbol"].astype(str), categories=order).codes.astype(_code_dtype(len(order)))
+
+        # One sort by (code, time) for every column; stable so equal keys keep input order
+        rows = np.lexsort((times, codes))
+        columns = {
+            field: pd.to_numeric(df[field], errors="coerce").to_numpy(dtype=price_dtype)[rows]
+            for field in PRICE_FIELDS
+        }
+        columns["volume"] = pd.to_numeric(df["volume"], errors="coerce").fillna(0).to_numpy(dtype=np.int64)[rows]
+        return cls(times[rows], codes[rows], order, columns)
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    @property
+    def symbols(self) -> List[str]:
+        """Symbols with at least one bar, in code order."""
+        return list(self.offsets)
+
+    @property
+    def nbytes(self) -> int:
+        return self.times.nbytes + self.codes.nbytes + sum(array.nbytes for array in self.columns.values())
+
+    def rows(self, symbol: str, start=None, end=None) -> tuple:
+        """
+        [start, end) rows of ``symbol`` between two dates (inclusive), by binary search.
+
+        Raises
+        ------
+        KeyError
+            If the store has no bars for ``symbol``
+        """
+        if symbol not in self.offsets:
+            raise KeyError(f"No bars for symbol '{symbol}'")
+        first, last = self.offsets[symbol]
+        times = self.times[first:last]
+        low = 0 if start is None else np.searchsorted(times, pd.Timestamp(start).to_datetime64(), side="left")
+        high = len(times) if end is None else np.searchsorted(times, pd.Timestamp(end).to_datetime64(), side="right")
+        return first + int(low), first + int(max(low, high))
+
+    def _row_ranges(self, symbols: Optional[Iterable[str]], start, end) -> List[tuple]:
+        symbols = self.symbols if symbols is None else [s for s in symbols if s in self.offsets]
+        return [self.rows(symbol, start, end) for symbol in symbols]
+
+    def _take(self, ranges: List[tuple]):
+        """Slice covering ``ranges`` when they are adjacent (a view), else row positions to gather."""
+        ranges = [r for r in ranges if r[1] > r[0]]
+        if not ranges:
+            return slice(0, 0)
+        if all(ranges[i][1] == ranges[i + 1][0] for i in range(len(ranges) - 1)):
+            return slice(ranges[0][0], ranges[-1][1])
+        return np.concatenate([np.arange(low, high) for low, high in ranges])
+
+    def arrays(self, symbol: str, start=None, end=None) -> Dict[str, np.ndarray]:
+        """Read-only views of one symbol's "time" and ``FIELDS`` columns; nothing is copied."""
+        low, high = self.rows(symbol, start, end)
+        return {"time": self.times[low:high], **{field: array[low:high] for field, array in self.columns.items()}}
+
+    def frame(self, symbols: Optional[Iterable[str]] = None, start=None, end=None) -> pd.DataFrame:
+        """
+        Long-format frame (Date index, ``FRAME_COLUMNS``) of the given symbols and dates.
+
+        The columns wrap the store's arrays directly when the selected rows are contiguous
+        (one symbol, or adjacent symbols with no date cut); otherwise they are gathered
+        once. Either way the data is read-only: add columns or copy before modifying.
+        Symbols without bars are skipped and "symbol" is categorical.
+        """
+        take = self._take(self._row_ranges(symbols, start, end))
+        times = self.times[take]
+        codes = self.codes[take]
+        columns = {field: array[take] for field, array in self.columns.items()}
+        if not isinstance(take, slice):
+            times, codes = _readonly(times), _readonly(codes)
+            columns = {field: _readonly(array) for field, array in columns.items()}
+
+        columns["symbol"] = pd.Series(
+            pd.Categorical.from_codes(codes, dtype=self._dtype, validate=False), copy=False
+        ).array
+        return pd.DataFrame(columns, index=pd.DatetimeIndex(times, name="Date"), copy=False)
+
+    def stats(self) -> dict:
+        """Row, symbol and memory counts, e.g. for a diagnostics endpoint."""
+        return {
+            "rows": len(self),
+            "symbols": len(self.offsets),
+            "nbytes": self.nbytes,
+            "first": str(self.times.min()) if len(self) else None,
+            "last": str(self.times.max()) if len(self) else None,
+        }
+
+
+def load_bars(start_date: str, end_date: str, symbols: Optional[Iterable[str]] = None,
+              resolution: str = "1d") -> pd.DataFrame:
+    """
+    Long-format bars at ``resolution``, with a "time" column, sorted by (symbol, time).
+
+    Stored resolutions are read in chunks; the others are resampled from their source
+    table chunk by chunk as it streams in, so the raw fine bars are never all in memory.
+    """
+    from data_access import DataAccess
+    from resample import RESOLUTIONS, check_resolution, resample_bars
+
+    spec = RESOLUTIONS[check_resolution(resolution)]
+    chunks = DataAccess().iter_ohlcv_data(start_date, end_date, symbols, resolution=spec["source"])
+    if spec["source"] != resolution:
+        chunks = resample_bars(chunks, spec["rule"])
+    frames = list(chunks)
+    if not frames:
+        return pd.DataFrame(columns=["time", *FIELDS, "symbol"])
+    return pd.concat(frames, ignore_index=True)
+
+
+_lock = threading.Lock()
+# Resolution -> (store, (start_date, end_date, symbols), loaded_at)
+_stores: Dict[str, tuple] = {}
+
+
+def get_ohlcv_store(start_date: str, end_date: str, symbols: Optional[Iterable[str]] = None,
+                    resolution: str = "1d", ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                    refresh: bool = False) -> OHLCVStore:
+    """
+    Returns the process-wide store of ``resolution`` bars between two dates, loaded once.
+
+    The loaded store is reused for ``ttl_seconds`` by every caller asking for the same
+    resolution and dates and a subset of its symbols (None means every symbol in the table).
+    """
+    symbols = None if symbols is None else list(dict.fromkeys(symbols))
+    with _lock:
+        store, key, loaded_at = _stores.get(resolution, (None, None, None))
+        expired = loaded_at is None or time.monotonic() - loaded_at >= ttl_seconds
+        covered = key is not None and key[:2] == (start_date, end_date) and (
+            key[2] is None or (symbols is not None and set(symbols) <= set(key[2]))
+        )
+        if refresh or expired or not covered:
+            started = time.perf_counter()
+            bars = load_bars(start_date, end_date, symbols, resolution)
+            store = OHLCVStore.from_frame(bars.set_index("time"), symbols)
+            key = (start_date, end_date, None if symbols is None else tuple(symbols))
+            _stores[resolution] = (store, key, time.monotonic())
+            logger.info(f"Loaded {len(store)} {resolution} bars for {len(store.offsets)} symbols "
+                        f"({store.nbytes / 1e6:.1f} MB) in {time.perf_counter() - started:.2f}s")
+        return store
+
+
+def invalidate_ohlcv_store() -> None:
+    """Drops every cached store, e.g. after new bars are inserted."""
+    with _lock:
+        _stores.clear()
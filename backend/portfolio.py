@@ -0,0 +1,216 @@
+import numpy as np
+import pandas as pd
+
+from aggregation import FREQUENCIES, period_codes
+from rolling import padded_cumsum, window_sum
+
+WEIGHTINGS = ("equal", "inverse_vol", "vol_target")
+
+REBALANCE_FREQUENCIES = ("daily",) + tuple(FREQUENCIES)
+
+
+def returns_matrix(group_dataframes: dict, field: str = "close") -> pd.DataFrame:
+    """
+    Builds a date x symbol matrix of simple returns from the output of ``system()``.
+
+    All groups are scattered into one array with integer codes instead of one pivot per
+    group. Prices are carried forward over days a symbol did not trade, so those days
+    have a zero return; dates before a symbol's first bar stay NaN.
+
+    Parameters
+    ----------
+    group_dataframes : dict
+        Group name -> long-format DataFrame with ``field`` and "symbol" columns; Series
+        entries (such as a precomputed "portfolio") are ignored
+    field : str
+        Price column to compute returns from
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per date and one column per symbol
+    """
+    frames = [df for df in group_dataframes.values() if isinstance(df, pd.DataFrame)]
+    if not frames:
+        return pd.DataFrame(dtype=float)
+    bars = pd.concat(frames)
+    dates, date_index = pd.factorize(bars.index, sort=True)
+    symbols, symbol_index = pd.factorize(bars["symbol"], sort=True)
+
+    prices = np.full((len(date_index), len(symbol_index)), np.nan)
+    # Duplicate (date, symbol) bars resolve to the last one, as pivot(..., aggfunc="last") would
+    prices[dates, symbols] = pd.to_numeric(bars[field], errors="coerce").to_numpy(dtype=float)
+    prices = pd.DataFrame(prices, index=pd.DatetimeIndex(date_index), columns=symbol_index).ffill()
+
+    values = prices.to_numpy()
+    returns = np.full_like(values, np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns[1:] = values[1:] / values[:-1] - 1
+    return pd.DataFrame(returns, index=prices.index, columns=prices.columns)
+
+
+def rolling_volatility(returns: np.ndarray, window: int = 63, periods: int = 252, min_periods: int = None) -> np.ndarray:
+    """
+    Annualized trailing volatility of every column from shared cumulative sums.
+
+    NaN returns are skipped; a cell is NaN until its window holds ``min_periods``
+    observations (``window`` by default).
+    """
+    min_periods = window if min_periods is None else min_periods
+    valid = ~np.isnan(returns)
+    x = np.where(valid, returns, 0.0)
+    # Center each column before accumulating squares, as ``rolling_metrics`` does
+    counts_total = valid.sum(axis=0)
+    shift = np.divide(x.sum(axis=0), counts_total, out=np.zeros(x.shape[1:]), where=counts_total > 0)
+    xc = np.where(valid, x - shift, 0.0)
+
+    count = window_sum(padded_cumsum(valid.astype(float)), window)
+    s1 = window_sum(padded_cumsum(xc), window)
+    s2 = window_sum(padded_cumsum(xc * xc), window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        variance = (s2 - s1 * s1 / count) / (count - 1)
+    vol = np.sqrt(np.maximum(variance, 0.0)) * np.sqrt(periods)
+    return np.where(count >= max(min_periods, 2), vol, np.nan)
+
+
+def rebalance_positions(index: pd.DatetimeIndex, frequency: str = "monthly") -> np.ndarray:
+    """Row positions on which weights are reset: the first row plus the last row of every period."""
+    if frequency not in REBALANCE_FREQUENCIES:
+        raise ValueError(f"Unknown rebalance frequency '{frequency}'; use one of {REBALANCE_FREQUENCIES}.")
+    n = len(index)
+    if n == 0:
+        return np.array([], dtype=np.int64)
+    if frequency == "daily":
+        return np.arange(n)
+    codes, _ = period_codes(index)[frequency]
+    return np.unique(np.concatenate(([0], np.flatnonzero(np.diff(codes)))))
+
+
+def target_weights(
+    returns: np.ndarray,
+    weighting: str = "equal",
+    vol_window: int = 63,
+    target_vol: float = 0.10,
+    max_leverage: float = 2.0,
+    periods: int = 252,
+) -> np.ndarray:
+    """
+    Target weights for every date using only information up to and including that date.
+
+    "equal" splits the book across symbols that have a price; "inverse_vol" weights them
+    by ``1 / vol`` normalized to sum to one; "vol_target" sizes each symbol to an equal
+    share of ``target_vol`` (``target_vol / (n * vol)``, ignoring correlations) and scales
+    the book down if gross exposure would exceed ``max_leverage``. The remainder of the
+    book is held as cash earning zero. Symbols without a volatility estimate get no weight.
+    """
+    if weighting not in WEIGHTINGS:
+        raise ValueError(f"Unknown weighting '{weighting}'; use one of {WEIGHTINGS}.")
+
+    if weighting == "equal":
+        # A symbol is investable from its first price: the row before its first return.
+        # Equal weights need no history, so the book is invested from the first row.
+        priced = ~np.isnan(returns)
+        priced[:-1] |= priced[1:].copy()
+        live = np.maximum.accumulate(priced, axis=0).astype(float)
+        n_live = live.sum(axis=1, keepdims=True)
+        return np.divide(live, n_live, out=np.zeros_like(live), where=n_live > 0)
+
+    vol = rolling_volatility(returns, vol_window, periods)
+    with np.errstate(divide="ignore"):
+        inverse = np.where(vol > 0, 1.0 / vol, 0.0)
+    inverse = np.nan_to_num(inverse)
+    if weighting == "inverse_vol":
+        total = inverse.sum(axis=1, keepdims=True)
+        return np.divide(inverse, total, out=np.zeros_like(inverse), where=total > 0)
+
+    n_live = (inverse > 0).sum(axis=1, keepdims=True)
+    weights = np.divide(target_vol * inverse, n_live, out=np.zeros_like(inverse), where=n_live > 0)
+    gross = weights.sum(axis=1, keepdims=True)
+    scale = np.where(gross > max_leverage, max_leverage / np.where(gross > 0, gross, 1.0), 1.0)
+    return weights * scale
+
+
+def portfolio_returns(
+    returns: pd.DataFrame,
+    weighting: str = "equal",
+    rebalance: str = "monthly",
+    vol_window: int = 63,
+    target_vol: float = 0.10,
+    max_leverage: float = 2.0,
+    periods: int = 252,
+) -> dict:
+    """
+    Simulates a periodically rebalanced portfolio over a date x symbol returns matrix.
+
+    Weights are set at the close of each rebalance date and held from the next row,
+    drifting with each symbol's growth until the following rebalance. The history starts
+    on the first date with a target weight (the first date with prices for "equal", the
+    first volatility estimate for the others), which is also the first rebalance, so the
+    book is never held in cash while waiting for a period end. The drift is
+    evaluated in closed form: within a segment every holding is its weight times the
+    symbol's growth since the segment start, read off one cumulative log-return matrix,
+    so the whole history is a handful of O(dates x symbols) array operations.
+
+    Parameters
+    ----------
+    returns : pd.DataFrame
+        Simple returns, one column per symbol (see ``returns_matrix``)
+    weighting : str
+        One of ``WEIGHTINGS``
+    rebalance : str
+        One of ``REBALANCE_FREQUENCIES``
+    vol_window : int
+        Lookback of the volatility estimate for "inverse_vol" and "vol_target"
+    target_vol : float
+        Annualized volatility budget for "vol_target"
+    max_leverage : float
+        Cap on gross exposure for "vol_target"
+    periods : int
+        Periods per year used for annualization
+
+    Returns
+    -------
+    dict
+        {"returns": pd.Series, "equity": pd.Series starting from 1.0,
+         "weights": pd.DataFrame of the weights set on each rebalance date}
+    """
+    r = returns.to_numpy(dtype=float)
+    all_targets = target_weights(r, weighting, vol_window, target_vol, max_leverage, periods)
+    invested = np.flatnonzero(all_targets.sum(axis=1) > 0)
+    if len(invested) == 0:
+        empty = pd.Series(dtype=float)
+        return {"returns": empty, "equity": empty, "weights": pd.DataFrame(columns=returns.columns)}
+
+    first = invested[0]
+    returns, r, all_targets = returns.iloc[first:], r[first:], all_targets[first:]
+    n = len(r)
+    rebalances = rebalance_positions(returns.index, rebalance)
+    targets = all_targets[rebalances]
+
+    # Segment of each row: the latest rebalance strictly before it (row 0 has no position)
+    marks = np.zeros(n, dtype=np.int64)
+    marks[rebalances[rebalances + 1 < n] + 1] = np.arange(1, len(rebalances) + 1)[rebalances + 1 < n]
+    segment = np.maximum.accumulate(marks) - 1
+
+    log_growth = padded_cumsum(np.log1p(np.nan_to_num(r)))[1:]
+    held = segment >= 0
+    seg = np.where(held, segment, 0)
+    start_level = log_growth[rebalances[seg]]
+    weights = targets[seg]
+    cash = 1.0 - weights.sum(axis=1)
+
+    value = cash + (weights * np.exp(log_growth - start_level)).sum(axis=1)
+    # The value entering each row is 1.0 on the first row of a segment, else the previous row's value
+    previous = np.ones(n)
+    continuing = np.zeros(n, dtype=bool)
+    continuing[1:] = held[1:] & (segment[1:] == segment[:-1])
+    previous[1:][continuing[1:]] = value[:-1][continuing[1:]]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        period_returns = np.where(held, value / previous - 1, 0.0)
+
+    series = pd.Series(period_returns, index=returns.index, name=f"portfolio_{weighting}")
+    return {
+        "returns": series,
+        "equity": (1 + series).cumprod(),
+        "weights": pd.DataFrame(targets, index=returns.index[rebalances], columns=returns.columns),
+    }
@@ -0,0 +1,66 @@
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Workers are started by a fork server, never forked from the server process itself: the
+# Flask and job threads may hold locks (logging, connection pools) at fork time, which
+# would leave the child deadlocked. "spawn" is the fallback where forkserver is missing.
+START_METHODS = ("forkserver", "spawn")
+
+
+def cpu_count() -> int:
+    return os.cpu_count() or 1
+
+
+def check_workers(workers) -> int:
+    """
+    Number of worker processes to use for a request: ``workers`` clamped to the CPU count,
+    or the CPU count when omitted.
+
+    Raises
+    ------
+    ValueError
+        If ``workers`` is not an integer of at least 1
+    """
+    if workers is None:
+        return cpu_count()
+    if isinstance(workers, bool) or not isinstance(workers, int):
+        raise ValueError(f"workers must be an integer, got {workers!r}.")
+    if workers < 1:
+        raise ValueError("workers must be at least 1.")
+    return min(workers, cpu_count())
+
+
+_lock = threading.Lock()
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """
+    Returns the process-wide worker pool, one process per CPU, created on first use.
+
+    Every request shares it, so concurrent requests queue for the same CPUs instead of each
+    starting its own processes. A pool broken by a crashed worker is replaced.
+    """
+    global _pool
+    with _lock:
+        if _pool is None or getattr(_pool, "_broken", False):
+            available = multiprocessing.get_all_start_methods()
+            method = next(m for m in START_METHODS if m in available)
+            _pool = ProcessPoolExecutor(max_workers=cpu_count(), mp_context=multiprocessing.get_context(method))
+            logger.info(f"Started a {method} process pool with {cpu_count()} workers")
+        return _pool
+
+
+def shutdown_process_pool() -> None:
+    """Stops the worker processes, e.g. at interpreter exit or in scripts."""
+    global _pool
+    with _lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
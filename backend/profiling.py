@@ -0,0 +1,157 @@
+import cProfile
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from typing import Callable
+
+DEFAULT_TOP = 20
+
+# Code run through exec() has no real file; its frames report one of these names
+USER_CODE_FILES = ("<string>", "<custom_metric>")
+
+# Path fragments -> category used for the self-time breakdown (first match wins)
+CATEGORIES = (
+    ("user", USER_CODE_FILES),
+    ("database", (f"{os.sep}sqlalchemy{os.sep}", f"{os.sep}psycopg2{os.sep}", "data_access.py", "db_models.py")),
+    ("pandas", (f"{os.sep}pandas{os.sep}", f"{os.sep}numpy{os.sep}")),
+)
+
+
+# tracemalloc is process-wide while profiled runs overlap on server threads: it is started
+# by the first run that needs it and stopped only when the last of them finishes
+_lock = threading.Lock()
+_tracing_runs = 0
+_started_tracing = False
+
+
+def _acquire_tracing() -> None:
+    global _tracing_runs, _started_tracing
+    with _lock:
+        if _tracing_runs == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _started_tracing = True
+        _tracing_runs += 1
+
+
+def _release_tracing() -> None:
+    global _tracing_runs, _started_tracing
+    with _lock:
+        _tracing_runs -= 1
+        if _tracing_runs == 0 and _started_tracing:
+            tracemalloc.stop()
+            _started_tracing = False
+
+
+def _category(filename: str) -> str:
+    for name, fragments in CATEGORIES:
+        if any(fragment in filename for fragment in fragments):
+            return name
+    return "other"
+
+
+def _function_label(filename: str, line: int, name: str) -> str:
+    if filename == "~":
+        return name  # built-in
+    return f"{os.path.basename(filename)}:{line}({name})"
+
+
+def _cpu_report(stats: pstats.Stats, top: int) -> tuple:
+    """Top functions by cumulative time, self time per category and time inside system()."""
+    rows = []
+    breakdown = {"user": 0.0, "database": 0.0, "pandas": 0.0, "other": 0.0}
+    system_calls = {"calls": 0, "cumulative_seconds": 0.0}
+    for (filename, line, name), (_, calls, self_time, cumulative, _) in stats.stats.items():
+        rows.append({
+            "function": _function_label(filename, line, name),
+            "calls": calls,
+            "self_seconds": self_time,
+            "cumulative_seconds": cumulative,
+        })
+        breakdown[_category(filename)] += self_time
+        if name == "system" and os.path.basename(filename) == "system.py":
+            system_calls["calls"] += calls
+            system_calls["cumulative_seconds"] += cumulative
+    rows.sort(key=lambda row: row["cumulative_seconds"], reverse=True)
+    return rows[:top], breakdown, system_calls
+
+
+def _memory_report(snapshot: tracemalloc.Snapshot, peak: int, current: int, top: int) -> dict:
+    statistics = snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+    )).statistics("lineno")
+    return {
+        "peak_bytes": peak,
+        "retained_bytes": current,
+        "top_allocations": [
+            {
+                "site": f"{os.path.basename(stat.traceback[0].filename)}:{stat.traceback[0].lineno}",
+                "file": stat.traceback[0].filename,
+                "size_bytes": stat.size,
+                "count": stat.count,
+            }
+            for stat in statistics[:top]
+        ],
+    }
+
+
+def profile_call(func: Callable, top: int = DEFAULT_TOP, memory: bool = True) -> tuple:
+    """
+    Runs ``func()`` under cProfile and tracemalloc and summarizes where time and memory went.
+
+    Parameters
+    ----------
+    func : callable
+        Zero-argument callable to profile, e.g. ``lambda: execute_custom_code(code)``
+    top : int
+        Number of functions and allocation sites to report
+    memory : bool
+        Also trace allocations (slows the run down noticeably)
+
+    Returns
+    -------
+    tuple
+        (func's return value, report dict with "wall_seconds", "top_functions",
+        "breakdown" (self time by user / database / pandas / other), "system_calls"
+        and "memory" (peak traced bytes plus the allocation sites still holding
+        memory when the run finished), or None when tracing was unavailable)
+
+    Notes
+    -----
+    Allocation tracing is process-wide: when profiled runs overlap, each one's peak and
+    allocation sites include the others' allocations.
+    """
+    if memory:
+        _acquire_tracing()
+        tracemalloc.reset_peak()
+
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    profiler.enable()
+    try:
+        result = func()
+    finally:
+        profiler.disable()
+        wall = time.perf_counter() - start
+        memory_report = None
+        if memory:
+            try:
+                current, peak = tracemalloc.get_traced_memory()
+                memory_report = _memory_report(tracemalloc.take_snapshot(), peak, current, top)
+            except RuntimeError:
+                # Tracing was stopped from outside (e.g. by user code); report no memory
+                memory_report = None
+            finally:
+                _release_tracing()
+
+    top_functions, breakdown, system_calls = _cpu_report(pstats.Stats(profiler), top)
+    report = {
+        "wall_seconds": wall,
+        "top_functions": top_functions,
+        "breakdown": breakdown,
+        "system_calls": system_calls,
+        "memory": memory_report,
+    }
+    return result, report
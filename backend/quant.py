@@ -1,10 +1,21 @@
-import quantstats as qs
+import inspect
+
 import numpy as np
 import pandas as pd
 
 from data_munging import make_serializable
-
-def quant_stats(strategy_name : str, strategy : pd.Series, benchmark_name : str, benchmark : pd.Series) -> dict:
+from aggregation import return_distribution
+from bootstrap import bootstrap_confidence_intervals
+from drawdown import drawdown_report
+from resample import TRADING_DAYS
+from rolling import rolling_metrics, serialize_rolling_metrics
+from trading_calendar import align
+
+# Order in which quant_stats_sections yields its parts, cheapest and most visible first
+SECTIONS = ("cumulative", "rolling", "drawdowns", "distribution", "metrics", "confidence_intervals")
+
+def quant_stats(strategy_name : str, strategy : pd.Series, benchmark_name : str, benchmark : pd.Series,
+                rolling_windows : list = None, bootstrap : dict = None, periods : int = TRADING_DAYS) -> dict:
     """Utilizes the quantstats library and other processing to return the results dictionary
 
     Parameters
@@ -12,11 +23,19 @@ def quant_stats(strategy_name : str, strategy : pd.Series, benchmark_name : str,
     strategy_name : str
         The name of the over-arching strategy behind the positions obtained from the system
     strategy : pd.Series
-        The positions of the strategy
+        The periodic returns of the strategy
     benchmark_name : str
         The name of the benchmark used to find performance metrics
     benchmark : pd.Series
-        The positions of the benchmark
+        The periodic returns of the benchmark
+    rolling_windows : list, optional
+        Extra rolling window lengths to report side by side under "rolling_windows"
+    bootstrap : dict, optional
+        Keyword arguments for ``bootstrap_confidence_intervals``; when given, confidence
+        intervals for the headline metrics are reported under "confidence_intervals"
+    periods : int, optional
+        Bars per year used to annualize, ``resample.annualization_factor`` of the bar
+        resolution (252 for daily bars)
         
 
     Returns
@@ -24,12 +43,51 @@ def quant_stats(strategy_name : str, strategy : pd.Series, benchmark_name : str,
     dict
         The processed data
     """
-    strategy = strategy.pct_change().dropna()
-    benchmark = benchmark.pct_change().dropna()
-    
-    # Align the data to include full benchmark history
-    full_history = pd.DataFrame({benchmark_name: benchmark, strategy_name: strategy})
-    full_history = full_history.loc[strategy.index].dropna()
+    results = {}
+    for _, section in quant_stats_sections(strategy_name, strategy, benchmark_name, benchmark,
+                                           rolling_windows=rolling_windows, bootstrap=bootstrap, periods=periods):
+        results.update(section)
+    return results
+
+def quant_stats_sections(strategy_name : str, strategy : pd.Series, benchmark_name : str, benchmark : pd.Series,
+                         rolling_windows : list = None, bootstrap : dict = None, periods : int = TRADING_DAYS):
+    """Yields the ``quant_stats`` results one section at a time, as soon as each is computed
+
+    The cumulative curves come first, then the rolling series, the drawdowns, the return
+    distribution, the scalar metrics and finally the (slow) bootstrap confidence intervals,
+    so a streaming client can draw the first charts before the scalar metrics are done.
+
+    Parameters
+    ----------
+    strategy_name : str
+        The name of the over-arching strategy behind the positions obtained from the system
+    strategy : pd.Series
+        The periodic returns of the strategy
+    benchmark_name : str
+        The name of the benchmark used to find performance metrics
+    benchmark : pd.Series
+        The periodic returns of the benchmark
+    rolling_windows : list, optional
+        Extra rolling window lengths to report side by side under "rolling_windows"
+    bootstrap : dict, optional
+        Keyword arguments for ``bootstrap_confidence_intervals``; when given, confidence
+        intervals for the headline metrics are reported under "confidence_intervals"
+    periods : int, optional
+        Bars per year used to annualize, ``resample.annualization_factor`` of the bar
+        resolution (252 for daily bars)
+        
+
+    Yields
+    ------
+    tuple
+        (section name from ``SECTIONS``, dict of result keys in that section)
+    """
+    # Deferred so importing this module does not load matplotlib, seaborn and scipy
+    import quantstats as qs
+
+    # Align the data on the dates both have a return, in one sorted merge over the trading calendar.
+    # The inputs are already returns, the same series the relative metrics and sweeps use
+    full_history = align({benchmark_name: benchmark, strategy_name: strategy})
     
     strategy = full_history[strategy_name]
     benchmark = full_history[benchmark_name]
@@ -42,50 +100,45 @@ def quant_stats(strategy_name : str, strategy : pd.Series, benchmark_name : str,
         full_history["Stock_Cumulative"] - full_history[benchmark_name+"_Cumulative"]
     )
 
-    # Rolling Metrics
-    rolling_window = 30  # 30-day rolling window
-    rolling_sharpe = qs.stats.rolling_sharpe(strategy, rolling_window)
-    rolling_sortino = qs.stats.rolling_sortino(strategy, rolling_window)
-    rolling_volatility = strategy.rolling(rolling_window).std() * np.sqrt(252)  # Annualized
-
-    # Calculate distributions with serialized dates
-    distribution = {
-        "daily": {
-            "dates": [date.strftime('%Y-%m-%d') for date in strategy.index],
-            "values": strategy.tolist(),
-        },
-        "weekly": {
-            "dates": [date.strftime('%Y-%m-%d') for date in strategy.resample("W").mean().index],
-            "values": strategy.resample("W").mean().tolist(),
-        },
-        "monthly": {
-            "dates": [date.strftime('%Y-%m-%d') for date in strategy.resample("ME").mean().index],
-            "values": strategy.resample("ME").mean().tolist(),
-        },
-        "quarterly": {
-            "dates": [date.strftime('%Y-%m-%d') for date in strategy.resample("QE").mean().index],
-            "values": strategy.resample("QE").mean().tolist(),
-        },
-        "yearly": {
-            "dates": [date.strftime('%Y-%m-%d') for date in strategy.resample("YE").mean().index],
-            "values": strategy.resample("YE").mean().tolist(),
-        },
-    }
-    # Prepare initial response with charts
-    results = {
+    # Cumulative curves first: they are the first charts on the page
+    yield "cumulative", {
         "stock_price": make_serializable(full_history["Stock_Cumulative"]),
         benchmark_name+"_cumulative": make_serializable(full_history[benchmark_name+"_Cumulative"]),
         "percentage_change_vs_"+benchmark_name: make_serializable(
             full_history["Pct_Change_VS_"+benchmark_name]
         ),
+    }
+
+    # Rolling Metrics
+    # All windows share one cumulative-sum sweep instead of a rolling pass per metric
+    rolling_window = 30  # 30-bar rolling window (30 days on daily bars)
+    windows = [rolling_window] + list(rolling_windows or [])
+    rolling = rolling_metrics(strategy, benchmark, windows=windows, periods=periods)
+    rolling_sharpe = rolling["sharpe"].loc[rolling_window]
+    rolling_sortino = rolling["sortino"].loc[rolling_window]
+    rolling_volatility = rolling["std"].loc[rolling_window] * np.sqrt(periods)  # Annualized
+
+    section = {
         "implied_volatility": make_serializable(
             qs.stats.implied_volatility(full_history[strategy_name])
         ),
         "rolling_sharpe": make_serializable(rolling_sharpe),
         "rolling_sortino": make_serializable(rolling_sortino),
         "rolling_volatility": make_serializable(rolling_volatility),
-        "distribution": distribution,
     }
+    if rolling_windows:
+        section["rolling_windows"] = serialize_rolling_metrics(
+            {metric: frame.loc[sorted(set(rolling_windows))] for metric, frame in rolling.items()}
+        )
+    yield "rolling", section
+
+    # Underwater curve plus the deepest drawdown episodes from one O(n) pass
+    underwater, drawdowns = drawdown_report(strategy, top=10)
+    yield "drawdowns", {"underwater": underwater, "drawdowns": drawdowns}
+
+    # Calculate distributions with serialized dates (one grouping pass for all frequencies)
+    yield "distribution", {"distribution": return_distribution(strategy)}
+
     functions_list = [
         "adjusted_sortino", "avg_loss", "avg_return", "avg_win", "best", "cagr", "calmar",
         "common_sense_ratio", "comp", "conditional_value_at_risk", "consecutive_losses",
@@ -100,6 +153,7 @@ def quant_stats(strategy_name : str, strategy : pd.Series, benchmark_name : str,
     ]
     
     # Add calculated metrics to the results
+    results = {}
     for func_name in functions_list:
         try:
             func = getattr(qs.stats, func_name)
@@ -108,7 +162,7 @@ def quant_stats(strategy_name : str, strategy : pd.Series, benchmark_name : str,
             if func_name in ["information_ratio", "r_squared"]:
                 result = func(strategy, benchmark)
             else:
-                result = func(strategy)
+                result = func(strategy, **_periods_kwargs(func, periods))
 
             results[func_name] = make_serializable(result)
 
@@ -116,17 +170,39 @@ def quant_stats(strategy_name : str, strategy : pd.Series, benchmark_name : str,
             results[func_name] = f"Error in {func_name}: {e}"
 
     # Calculate extended metrics (including omega and additional Greeks)
-    extended_metrics = calculate_extended_metrics(strategy, benchmark)
+    extended_metrics = calculate_extended_metrics(strategy, benchmark, periods=periods)
 
     results.update(extended_metrics.to_dict())
+    yield "metrics", results
 
-    return results
+    if bootstrap is not None:
+        yield "confidence_intervals", {
+            "confidence_intervals": bootstrap_confidence_intervals(strategy, **{"periods": periods, **bootstrap})
+        }
+
+def _periods_kwargs(func, periods: int) -> dict:
+    """
+    ``periods`` for a quantstats function that annualizes, scaled from its daily default
+    (252 for most, 365 for ``cagr``) by the bars per day; empty for daily bars so the
+    library defaults apply unchanged.
+    """
+    if periods == TRADING_DAYS:
+        return {}
+    try:
+        parameter = inspect.signature(func).parameters.get("periods")
+    except (TypeError, ValueError):
+        return {}
+    if parameter is None or not isinstance(parameter.default, (int, float)):
+        return {}
+    return {"periods": int(round(parameter.default * periods / TRADING_DAYS))}
 
 def calculate_extended_metrics(returns, benchmark, rf=0.0, periods=252):
     """
     Calculates additional metrics including delta, gamma, theta, and omega.
     Uses the existing `greeks` function for alpha and beta.
     """
+    import quantstats as qs
+
     try:
         # Use quantstats' greeks function for alpha and beta
         greeks = qs.stats.greeks(returns, benchmark)
@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+
+RELATIVE_METRICS = (
+    "observations", "correlation", "r_squared", "beta", "alpha", "tracking_error",
+    "information_ratio", "up_capture", "down_capture",
+)
+
+
+def _masked_moments(strategy: np.ndarray, benchmarks: np.ndarray, valid: np.ndarray) -> tuple:
+    """Per-column count, means and centred values over the rows where both series exist."""
+    count = valid.sum(axis=0)
+    s = np.where(valid, strategy[:, None], 0.0)
+    b = np.where(valid, benchmarks, 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_s = s.sum(axis=0) / count
+        mean_b = b.sum(axis=0) / count
+    centred_s = np.where(valid, s - mean_s, 0.0)
+    centred_b = np.where(valid, b - mean_b, 0.0)
+    return count, s, b, mean_s, mean_b, centred_s, centred_b
+
+
+def _capture(s: np.ndarray, b: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    """Geometric mean strategy return over geometric mean benchmark return on ``rows``."""
+    count = rows.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        strategy_mean = np.expm1(np.where(rows, np.log1p(s), 0.0).sum(axis=0) / count)
+        benchmark_mean = np.expm1(np.where(rows, np.log1p(b), 0.0).sum(axis=0) / count)
+        return strategy_mean / benchmark_mean
+
+
+def relative_metrics(strategy: pd.Series, benchmarks: pd.DataFrame, periods: int = 252) -> pd.DataFrame:
+    """
+    Strategy-versus-benchmark statistics against every column of ``benchmarks`` at once.
+
+    All benchmarks share one set of masked matrix operations over the date x benchmark
+    array, so adding an index adds a column rather than another pass over the history.
+    Each benchmark uses the dates where both it and the strategy have a return.
+
+    Definitions follow quantstats where it has one: ``alpha`` is annualized
+    ``mean(s) - beta * mean(b)``, ``information_ratio`` is the (unannualized) mean over the
+    standard deviation of active returns, and ``tracking_error`` is that deviation
+    annualized. Up/down capture compare geometric mean returns on the dates the benchmark
+    rose/fell.
+
+    Parameters
+    ----------
+    strategy : pd.Series
+        Daily strategy returns
+    benchmarks : pd.DataFrame
+        Benchmark returns on the same index, e.g. from ``benchmarks.benchmark_matrix``
+    periods : int
+        Periods per year used to annualize
+
+    Returns
+    -------
+    pd.DataFrame
+        ``RELATIVE_METRICS`` x benchmark; NaN where a statistic is undefined (for example
+        beta against a constant risk-free series)
+    """
+    s_values = strategy.reindex(benchmarks.index).to_numpy(dtype=float)
+    b_values = benchmarks.to_numpy(dtype=float)
+    valid = ~np.isnan(s_values)[:, None] & ~np.isnan(b_values)
+
+    count, s, b, mean_s, mean_b, centred_s, centred_b = _masked_moments(s_values, b_values, valid)
+    active = np.where(valid, s - b, 0.0)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        dof = count - 1
+        covariance = (centred_s * centred_b).sum(axis=0) / dof
+        var_s = (centred_s ** 2).sum(axis=0) / dof
+        var_b = (centred_b ** 2).sum(axis=0) / dof
+        # A constant benchmark (e.g. a fixed risk-free rate) has no variance to regress on
+        spread = np.where(valid, b, -np.inf).max(axis=0) - np.where(valid, b, np.inf).min(axis=0)
+        var_b = np.where(spread == 0, 0.0, var_b)
+        correlation = covariance / np.sqrt(var_s * var_b)
+        beta = covariance / var_b
+        alpha = (mean_s - beta * mean_b) * periods
+
+        mean_active = active.sum(axis=0) / count
+        active_std = np.sqrt((np.where(valid, active - mean_active, 0.0) ** 2).sum(axis=0) / dof)
+        information_ratio = mean_active / active_std
+        tracking_error = active_std * np.sqrt(periods)
+
+    table = np.vstack([
+        count,
+        correlation,
+        correlation ** 2,
+        beta,
+        alpha,
+        tracking_error,
+        information_ratio,
+        _capture(s, b, valid & (b > 0)),
+        _capture(s, b, valid & (b < 0)),
+    ])
+    table[~np.isfinite(table)] = np.nan
+    return pd.DataFrame(table, index=list(RELATIVE_METRICS), columns=benchmarks.columns)
+
+
+def serialize_relative_metrics(table: pd.DataFrame) -> dict:
+    """{benchmark: {metric: value}} with NaN as None, for the JSON response."""
+    return {
+        str(name): {
+            metric: None if pd.isna(value) else (int(value) if metric == "observations" else float(value))
+            for metric, value in column.items()
+        }
+        for name, column in table.items()
+    }
@@ -0,0 +1,184 @@
+from typing import Iterable, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS = 252
+
+# Bar resolution -> pandas rule, bars per trading day (used to annualize) and the stored
+# resolution it is built from. Stored resolutions have a table in ``db_models.OHLCV_MODELS``;
+# the others are resampled from a finer table as it streams in. Futures trade close to
+# 23 hours a day, so the intraday counts are for a full electronic session.
+RESOLUTIONS = {
+    "1m": {"rule": "1min", "bars_per_day": 1380, "source": "1m"},
+    "5m": {"rule": "5min", "bars_per_day": 276, "source": "1m"},
+    "15m": {"rule": "15min", "bars_per_day": 92, "source": "1m"},
+    "1h": {"rule": "1h", "bars_per_day": 23, "source": "1h"},
+    "4h": {"rule": "4h", "bars_per_day": 6, "source": "1h"},
+    "1d": {"rule": "1D", "bars_per_day": 1, "source": "1d"},
+}
+DEFAULT_RESOLUTION = "1d"
+
+BAR_COLUMNS = ["time", "open", "high", "low", "close", "volume", "symbol"]
+
+# Calendar buckets, labelled like TimescaleDB's time_bucket: weeks start on Monday and
+# months on the 1st. Every other rule is a fixed length floored from the epoch.
+CALENDAR_RULES = ("W", "MS")
+_DAY_NS = 86_400 * 10 ** 9
+
+
+def check_resolution(resolution: str) -> str:
+    """Returns ``resolution`` if it is known, else raises ValueError listing the options."""
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"Unknown resolution '{resolution}'; use one of {list(RESOLUTIONS)}.")
+    return resolution
+
+
+def annualization_factor(resolution: str = DEFAULT_RESOLUTION) -> int:
+    """Bars per year at ``resolution``: 252 for daily bars, 252 x bars per session otherwise."""
+    return TRADING_DAYS * RESOLUTIONS[check_resolution(resolution)]["bars_per_day"]
+
+
+def is_intraday(index: pd.Index) -> bool:
+    """True when a DatetimeIndex carries times other than midnight."""
+    return isinstance(index, pd.DatetimeIndex) and bool((index != index.normalize()).any())
+
+
+def bars_from_daily(daily: pd.Series, index: pd.DatetimeIndex) -> pd.Series:
+    """
+    Spreads daily returns over intraday bars: each of a day's n bars gets
+    ``(1 + r) ** (1 / n) - 1``, so compounding over the day gives the daily return ``r``.
+    Bars on days without a daily return stay NaN.
+
+    Parameters
+    ----------
+    daily : pd.Series
+        Returns indexed by date (midnight timestamps)
+    index : pd.DatetimeIndex
+        Sorted bar times
+
+    Returns
+    -------
+    pd.Series
+        Returns on ``index``
+    """
+    days = index.normalize()
+    codes, uniques = pd.factorize(days)
+    bars_per_day = np.bincount(codes)[codes]
+    per_day = daily.reindex(uniques).to_numpy(dtype=float)[codes]
+    return pd.Series(np.power(1.0 + per_day, 1.0 / bars_per_day) - 1.0, index=index, name=daily.name)
+
+
+def bucket_starts(times: np.ndarray, rule: str) -> np.ndarray:
+    """
+    Start of the bucket each datetime64[ns] time falls in, as int64 nanoseconds.
+
+    "W" buckets start on Mondays and "MS" buckets on the first of the month; any other
+    rule is a fixed length (``pd.Timedelta(rule)``) floored from the epoch.
+    """
+    nanoseconds = times.astype("datetime64[ns]").view(np.int64)
+    if rule == "W":
+        days = nanoseconds // _DAY_NS
+        # 1970-01-01 was a Thursday, three days after a Monday
+        return (days - (days + 3) % 7) * _DAY_NS
+    if rule == "MS":
+        return times.astype("datetime64[M]").astype("datetime64[ns]").view(np.int64)
+    step = pd.Timedelta(rule).value
+    return nanoseconds // step * step
+
+
+def _aggregate(chunk: pd.DataFrame, rule: str, final: bool) -> tuple:
+    """
+    Aggregates bars sorted by (symbol, time) into ``rule`` buckets.
+
+    Unless ``final``, the rows of the last bucket are returned separately instead: the next
+    chunk may still add bars to it.
+    """
+    times = pd.DatetimeIndex(pd.to_datetime(chunk["time"]))
+    if times.tz is not None:
+        times = times.tz_localize(None)
+    buckets = bucket_starts(times.values, rule)
+    symbols = chunk["symbol"].to_numpy()
+
+    starts = np.flatnonzero(np.r_[True, (symbols[1:] != symbols[:-1]) | (buckets[1:] != buckets[:-1])])
+    carry = None
+    if not final:
+        carry = chunk.iloc[starts[-1]:]
+        starts = starts[:-1]
+    if not len(starts):
+        return pd.DataFrame(columns=BAR_COLUMNS), carry
+
+    # reduceat runs each bucket from its start to the next one; cut off the carried rows
+    limit = len(chunk) if final else len(chunk) - len(carry)
+    ends = np.r_[starts[1:], limit]
+    column = lambda name: chunk[name].to_numpy()[:limit]
+    bars = pd.DataFrame({
+        "time": buckets[starts].view("datetime64[ns]"),
+        "open": column("open")[starts],
+        "high": np.maximum.reduceat(column("high").astype(float), starts),
+        "low": np.minimum.reduceat(column("low").astype(float), starts),
+        "close": column("close")[ends - 1],
+        "volume": np.add.reduceat(column("volume").astype(np.int64), starts),
+        "symbol": symbols[starts],
+    })
+    return bars, carry
+
+
+def resample_bars(chunks: Iterable[pd.DataFrame], rule: str) -> Iterator[pd.DataFrame]:
+    """
+    Streams fine OHLCV bars into coarser ones, one vectorized pass per chunk.
+
+    Bars must arrive sorted by (symbol, time), as ``DataAccess.iter_ohlcv_data`` returns
+    them. A bucket is first open, max high, min low, last close and summed volume, and is
+    labelled with the bucket's start (see ``bucket_starts``). Only the last
+    bucket of a chunk can still grow, so its rows are carried into the next chunk; memory
+    stays at about one chunk however long the history is.
+
+    Parameters
+    ----------
+    chunks : iterable of pd.DataFrame
+        Frames with the ``BAR_COLUMNS`` columns
+    rule : str
+        Fixed bucket length, e.g. "5min", "1h" or "1D", or one of ``CALENDAR_RULES``
+
+    Yields
+    ------
+    pd.DataFrame
+        Coarse bars with the ``BAR_COLUMNS`` columns, sorted by (symbol, time)
+    """
+    carry: Optional[pd.DataFrame] = None
+    for chunk in chunks:
+        if carry is not None and len(carry):
+            chunk = pd.concat([carry, chunk], ignore_index=True)
+        if chunk.empty:
+            continue
+        bars, carry = _aggregate(chunk, rule, final=False)
+        if len(bars):
+            yield bars
+    if carry is not None and len(carry):
+        yield _aggregate(carry, rule, final=True)[0]
+
+
+def resample_returns(chunks: Iterable[pd.DataFrame], rule: str) -> Iterator[pd.DataFrame]:
+    """
+    Close-to-close returns of the bars from ``resample_bars``, streamed the same way.
+
+    Each symbol's last close is carried between chunks, so a chunk boundary never loses a
+    return; a symbol's first bar has none (NaN).
+
+    Yields
+    ------
+    pd.DataFrame
+        "time", "symbol" and "return" columns, sorted by (symbol, time)
+    """
+    last_close = {}
+    for bars in resample_bars(chunks, rule):
+        symbols = bars["symbol"].to_numpy()
+        close = bars["close"].to_numpy(dtype=float)
+        previous = np.empty_like(close)
+        previous[1:] = close[:-1]
+        firsts = np.flatnonzero(np.r_[True, symbols[1:] != symbols[:-1]])
+        previous[firsts] = [last_close.get(symbol, np.nan) for symbol in symbols[firsts]]
+        lasts = np.r_[firsts[1:], len(close)] - 1
+        last_close.update(zip(symbols[lasts], close[lasts]))
+        yield pd.DataFrame({"time": bars["time"], "symbol": symbols, "return": close / previous - 1})
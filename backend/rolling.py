@@ -0,0 +1,203 @@
+import numpy as np
+import pandas as pd
+
+from data_munging import make_serializable, serialize_dates
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+# Window lengths analysts compare side by side (1M, 3M, 6M, 12M of trading days)
+DEFAULT_WINDOWS = (21, 63, 126, 252)
+
+ROLLING_METRICS = ("mean", "std", "downside_deviation", "sharpe", "sortino", "beta", "max_drawdown")
+
+# Upper bound on the number of cells materialised at once by the NumPy drawdown fallback
+_DRAWDOWN_CHUNK_CELLS = 4_000_000
+
+
+def padded_cumsum(values: np.ndarray) -> np.ndarray:
+    """Cumulative sum along the rows with a leading zero so window sums are ``c[t + 1] - c[t + 1 - w]``."""
+    out = np.zeros((len(values) + 1,) + values.shape[1:])
+    np.cumsum(values, axis=0, out=out[1:])
+    return out
+
+
+def window_sum(cumsum: np.ndarray, window: int) -> np.ndarray:
+    """Trailing window sums from a padded cumulative sum, NaN until the window is full."""
+    n = len(cumsum) - 1
+    out = np.full((n,) + cumsum.shape[1:], np.nan)
+    if window <= n:
+        out[window - 1:] = cumsum[window:] - cumsum[:-window]
+    return out
+
+
+def _rolling_max_drawdown_numpy(log_wealth: np.ndarray, window: int) -> np.ndarray:
+    """Rolling max drawdown over ``log_wealth`` (padded with the starting level), chunked by rows."""
+    n = len(log_wealth) - 1
+    out = np.full(n, np.nan)
+    if window > n:
+        return out
+    # Each view row holds the starting level plus the ``window`` levels that follow it
+    views = np.lib.stride_tricks.sliding_window_view(log_wealth, window + 1)
+    rows_per_chunk = max(1, _DRAWDOWN_CHUNK_CELLS // (window + 1))
+    for start in range(0, len(views), rows_per_chunk):
+        chunk = views[start:start + rows_per_chunk]
+        peaks = np.maximum.accumulate(chunk, axis=1)
+        out[window - 1 + start:window - 1 + start + len(chunk)] = (chunk - peaks).min(axis=1)
+    return out
+
+
+if njit is not None:
+    @njit(cache=True)
+    def _rolling_max_drawdown_numba(log_wealth, window):
+        n = len(log_wealth) - 1
+        out = np.full(n, np.nan)
+        for end in range(window - 1, n):
+            peak = log_wealth[end + 1 - window]
+            worst = 0.0
+            for i in range(end + 2 - window, end + 2):
+                level = log_wealth[i]
+                if level > peak:
+                    peak = level
+                elif level - peak < worst:
+                    worst = level - peak
+            out[end] = worst
+        return out
+else:
+    _rolling_max_drawdown_numba = None
+
+
+def rolling_max_drawdown(returns: np.ndarray, window: int, use_numba: bool = True) -> np.ndarray:
+    """Maximum drawdown of the compounded returns inside each trailing window.
+
+    Every window starts from its own baseline of 1.0, so a window whose first return is a
+    loss registers that loss as drawdown, as ``qs.stats.max_drawdown`` does.
+    """
+    log_wealth = padded_cumsum(np.log1p(np.nan_to_num(returns)))
+    if use_numba and _rolling_max_drawdown_numba is not None:
+        worst = _rolling_max_drawdown_numba(log_wealth, window)
+    else:
+        worst = _rolling_max_drawdown_numpy(log_wealth, window)
+    return np.expm1(worst)
+
+
+def rolling_metrics(
+    returns: pd.Series,
+    benchmark: pd.Series = None,
+    windows=DEFAULT_WINDOWS,
+    rf: float = 0.0,
+    periods: int = 252,
+    metrics=ROLLING_METRICS,
+    use_numba: bool = True,
+) -> dict:
+    """Computes rolling metrics for several window lengths in a single sweep.
+
+    The linear statistics (mean, std, downside deviation, beta) come from one set of
+    cumulative sums shared by every window, so each extra window costs O(n) rather than
+    another full ``rolling`` pass. Definitions follow quantstats: Sharpe and Sortino are
+    annualized with ``sqrt(periods)`` and downside deviation divides by the window length.
+
+    Parameters
+    ----------
+    returns : pd.Series
+        Periodic returns of the strategy
+    benchmark : pd.Series, optional
+        Benchmark returns on the same index, required for ``beta``
+    windows : iterable of int
+        Window lengths, in periods
+    rf : float
+        Annualized risk-free rate subtracted from the returns
+    periods : int
+        Periods per year used for annualization
+    metrics : iterable of str
+        Subset of ``ROLLING_METRICS`` to compute
+    use_numba : bool
+        Use the numba kernel for rolling drawdown when numba is installed
+
+    Returns
+    -------
+    dict
+        Metric name -> DataFrame with one row per window and one column per date
+    """
+    windows = sorted({int(w) for w in windows})
+    metrics = [m for m in metrics if m in ROLLING_METRICS]
+    if benchmark is None:
+        metrics = [m for m in metrics if m != "beta"]
+
+    raw = returns.to_numpy(dtype=float)
+    valid = ~np.isnan(raw)
+    raw = np.where(valid, raw, 0.0)
+    x = raw - ((1 + rf) ** (1.0 / periods) - 1) if rf else raw
+    # Center before accumulating squares to keep the variance kernel numerically stable
+    shift = x[valid].mean() if valid.any() else 0.0
+    xc = np.where(valid, x - shift, 0.0)
+
+    count_cs = padded_cumsum(valid.astype(float))
+    sum_cs = padded_cumsum(xc)
+    sq_cs = padded_cumsum(xc * xc)
+    down_cs = padded_cumsum(np.where(valid, np.minimum(x, 0.0) ** 2, 0.0))
+
+    if "beta" in metrics:
+        bench = benchmark.reindex(returns.index).to_numpy(dtype=float)
+        both = valid & ~np.isnan(bench)
+        b = np.where(both, bench, 0.0)
+        bc = np.where(both, b - (b[both].mean() if both.any() else 0.0), 0.0)
+        sc = np.where(both, xc, 0.0)
+        pair_count_cs = padded_cumsum(both.astype(float))
+        bench_cs = padded_cumsum(bc)
+        bench_sq_cs = padded_cumsum(bc * bc)
+        strat_cs = padded_cumsum(sc)
+        cross_cs = padded_cumsum(sc * bc)
+
+    annual = np.sqrt(periods)
+    rows = {metric: [] for metric in metrics}
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for window in windows:
+            full = window_sum(count_cs, window) == window
+            s1 = window_sum(sum_cs, window)
+            mean_c = s1 / window
+            mean = np.where(full, mean_c + shift, np.nan)
+            var = (window_sum(sq_cs, window) - s1 * mean_c) / (window - 1) if window > 1 else np.full(len(x), np.nan)
+            std = np.where(full, np.sqrt(np.maximum(var, 0.0)), np.nan)
+            downside = np.where(full, np.sqrt(window_sum(down_cs, window) / window), np.nan)
+
+            if "mean" in rows:
+                rows["mean"].append(mean)
+            if "std" in rows:
+                rows["std"].append(std)
+            if "downside_deviation" in rows:
+                rows["downside_deviation"].append(downside)
+            if "sharpe" in rows:
+                rows["sharpe"].append(mean / std * annual)
+            if "sortino" in rows:
+                rows["sortino"].append(mean / downside * annual)
+            if "beta" in rows:
+                n_pairs = window_sum(pair_count_cs, window)
+                bench_sum = window_sum(bench_cs, window)
+                cov = window_sum(cross_cs, window) - window_sum(strat_cs, window) * bench_sum / n_pairs
+                var_b = window_sum(bench_sq_cs, window) - bench_sum * bench_sum / n_pairs
+                rows["beta"].append(np.where(n_pairs == window, cov / var_b, np.nan))
+            if "max_drawdown" in rows:
+                drawdown = rolling_max_drawdown(raw, window, use_numba=use_numba)
+                rows["max_drawdown"].append(np.where(full, drawdown, np.nan))
+
+    return {
+        metric: pd.DataFrame(np.vstack(stack), index=pd.Index(windows, name="window"), columns=returns.index)
+        for metric, stack in rows.items()
+    }
+
+
+def serialize_rolling_metrics(frames: dict) -> dict:
+    """Packs the window x date matrices into one payload that shares a single date axis."""
+    if not frames:
+        return {}
+    first = next(iter(frames.values()))
+    payload = {
+        "dates": serialize_dates(first.columns),
+        "windows": [int(w) for w in first.index],
+    }
+    for metric, frame in frames.items():
+        payload[metric] = [make_serializable(row.tolist()) for row in frame.to_numpy()]
+    return payload
@@ -0,0 +1,302 @@
+import logging
+import re
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from ohlcv_store import DEFAULT_TTL_SECONDS, PRICE_FIELDS, OHLCVStore, get_ohlcv_store
+
+logger = logging.getLogger(__name__)
+
+ADJUSTMENTS = ("none", "back", "ratio")
+# system() serves prices that actually traded unless asked otherwise: back and ratio
+# adjustment rewrite past bars with rolls that happen later, so they are only suitable
+# for returns analysis (quantstats, sweeps), which opts in to RETURNS_ADJUSTMENT
+DEFAULT_ADJUSTMENT = "none"
+RETURNS_ADJUSTMENT = "ratio"
+# "metadata" schedules rolls from ContractMetadata, "detect" finds them in the prices and
+# "auto" schedules calendar-rolled (.c.) symbols whose metadata parses and detects the rest:
+# volume- and open-interest-rolled (.v., .n.) series do not roll on a fixed calendar
+ROLL_SOURCES = ("auto", "metadata", "detect")
+
+# Databento continuous symbology: ROOT.{c,v,n}.RANK, e.g. CL.v.0 or 6M.c.0
+CONTINUOUS_SYMBOL = re.compile(r"^(?P<root>[^.]+)\.(?P<rule>[cvn])\.\d+$")
+
+# A detected roll is an open-versus-previous-close gap this many times the symbol's median
+# absolute gap, and at least MIN_ROLL_GAP in log terms
+DETECTION_THRESHOLD = 8.0
+MIN_ROLL_GAP = 0.005
+# Day of the month before each contract month on which scheduled rolls happen, when
+# "Time of Expiry" does not name one
+DEFAULT_ROLL_DAY = 15
+
+MONTH_CODES = {code: month for month, code in enumerate("FGHJKMNQUVXZ", start=1)}
+MONTH_NAMES = {name: month for month, name in enumerate(
+    ("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"), start=1)}
+
+
+def check_adjustment(adjustment: str) -> str:
+    """Returns ``adjustment`` if it is known, else raises ValueError listing the options."""
+    if adjustment not in ADJUSTMENTS:
+        raise ValueError(f"Unknown adjustment '{adjustment}'; use one of {ADJUSTMENTS}.")
+    return adjustment
+
+
+def is_continuous(symbol: str) -> bool:
+    """True for continuous-contract symbols such as ``CL.v.0``."""
+    return CONTINUOUS_SYMBOL.match(symbol) is not None
+
+
+def parse_contract_months(text: str) -> List[int]:
+    """
+    Month numbers listed in a "Contract Months" field, e.g. "H, M, U, Z",
+    "Mar, Jun, Sep, Dec" or "All months"; an empty list if nothing parses.
+    """
+    text = (text or "").strip()
+    if not text:
+        return []
+    if re.search(r"\b(all|monthly|every month|consecutive)\b", text, re.IGNORECASE):
+        return list(range(1, 13))
+    months = set()
+    for token in re.split(r"[\s,;/]+", text):
+        token = token.strip().strip(".")
+        if token.upper() in MONTH_CODES and len(token) == 1:
+            months.add(MONTH_CODES[token.upper()])
+        elif token[:3].lower() in MONTH_NAMES:
+            months.add(MONTH_NAMES[token[:3].lower()])
+    return sorted(months)
+
+
+def parse_roll_day(text: str) -> int:
+    """Day of month named in a "Time of Expiry" field ("... on the 20th ..."), else ``DEFAULT_ROLL_DAY``."""
+    match = re.search(r"\b([12]?\d|3[01])(st|nd|rd|th)\b", text or "", re.IGNORECASE)
+    return int(match.group(1)) if match else DEFAULT_ROLL_DAY
+
+
+def roll_schedule(symbol: str, metadata=None) -> Optional[dict]:
+    """
+    {"months": [...], "roll_day": int} for ``symbol`` from its ContractMetadata record
+    (looked up by full symbol, then by root), or None when it has no usable months.
+    """
+    if metadata is None:
+        from metadata_service import get_metadata_index
+        try:
+            index = get_metadata_index()
+            match = CONTINUOUS_SYMBOL.match(symbol)
+            metadata = index.get(symbol) or (index.get(match.group("root")) if match else None)
+        except Exception as e:
+            logger.warning(f"No contract metadata for {symbol}: {str(e)}")
+            metadata = None
+    if not metadata:
+        return None
+    months = parse_contract_months(metadata.get("contract_months"))
+    if not months:
+        return None
+    return {"months": months, "roll_day": parse_roll_day(metadata.get("time_of_expiry"))}
+
+
+def _symbol_starts(store: OHLCVStore) -> np.ndarray:
+    """Boolean mask of every symbol's first row."""
+    first = np.zeros(len(store), dtype=bool)
+    first[[start for start, _ in store.offsets.values()]] = True
+    return first
+
+
+def _gaps(store: OHLCVStore) -> np.ndarray:
+    """Log gap between each bar's open and the previous bar's close (NaN on first rows)."""
+    open_, close = store.columns["open"], store.columns["close"]
+    previous = np.full(len(store), np.nan)
+    previous[1:] = close[:-1]
+    previous[_symbol_starts(store)] = np.nan
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.log(open_ / previous)
+
+
+def detect_rolls(store: OHLCVStore, threshold: float = DETECTION_THRESHOLD,
+                 min_gap: float = MIN_ROLL_GAP) -> np.ndarray:
+    """
+    Rows on which a continuous series switched contracts, found from its price gaps.
+
+    A roll shows up as an outsized gap between the previous close (old contract) and the
+    open (new contract). Every symbol is scanned at once: gaps are compared with each
+    symbol's median absolute gap, gathered through the symbol codes.
+
+    Returns
+    -------
+    np.ndarray
+        Boolean mask over the store's rows
+    """
+    gaps = np.abs(_gaps(store))
+    scale = pd.Series(gaps).groupby(store.codes).median().reindex(range(len(store.categories)))
+    threshold_of_row = scale.to_numpy()[store.codes] * threshold
+    with np.errstate(invalid="ignore"):
+        return (gaps > threshold_of_row) & (gaps > min_gap)
+
+
+def scheduled_rolls(store: OHLCVStore, symbol: str, schedule: dict) -> np.ndarray:
+    """
+    Row positions (in the store) of the first bar after each scheduled roll of ``symbol``:
+    ``roll_day`` of the month before every contract month.
+    """
+    low, high = store.offsets[symbol]
+    times = store.times[low:high]
+    if not len(times):
+        return np.array([], dtype=np.int64)
+    years = np.arange(pd.Timestamp(times[0]).year, pd.Timestamp(times[-1]).year + 2)
+    contract = pd.to_datetime({
+        "year": np.repeat(years, len(schedule["months"])),
+        "month": np.tile(schedule["months"], len(years)),
+        "day": 1,
+    })
+    # Clip the day to the length of the (shorter) month before the contract month
+    month_before = contract - pd.DateOffset(months=1)
+    days = np.minimum(schedule["roll_day"], month_before.dt.days_in_month.to_numpy())
+    roll_dates = (month_before + pd.to_timedelta(days - 1, unit="D")).to_numpy(dtype=times.dtype)
+    positions = np.searchsorted(times, roll_dates, side="right")
+    positions = np.unique(positions[(positions > 0) & (positions < len(times))])
+    return low + positions
+
+
+def find_rolls(store: OHLCVStore, source: str = "auto") -> np.ndarray:
+    """Boolean mask of roll rows for every continuous symbol in the store."""
+    if source not in ROLL_SOURCES:
+        raise ValueError(f"Unknown roll source '{source}'; use one of {ROLL_SOURCES}.")
+    continuous = np.array([is_continuous(symbol) for symbol in store.categories] or [False])
+    rolls = np.zeros(len(store), dtype=bool)
+    if source != "metadata":
+        rolls = detect_rolls(store) & continuous[store.codes]
+    if source == "detect":
+        return rolls
+
+    for symbol in store.symbols:
+        match = CONTINUOUS_SYMBOL.match(symbol)
+        if match is None or (source == "auto" and match.group("rule") != "c"):
+            continue
+        schedule = roll_schedule(symbol)
+        if schedule is None:
+            continue
+        # A schedule replaces the detected rolls of its symbol
+        low, high = store.offsets[symbol]
+        rolls[low:high] = False
+        rolls[scheduled_rolls(store, symbol, schedule)] = True
+    return rolls
+
+
+def _later_sums(values: np.ndarray, store: OHLCVStore) -> np.ndarray:
+    """For every row, the sum of ``values`` over the later rows of the same symbol."""
+    suffix = np.concatenate((np.cumsum(values[::-1])[::-1], [0.0]))
+    bounds = np.array(list(store.offsets.values()), dtype=np.int64).reshape(-1, 2)
+    ends = np.repeat(bounds[:, 1], bounds[:, 1] - bounds[:, 0])
+    return suffix[np.arange(len(store)) + 1] - suffix[ends]
+
+
+def adjust(store: OHLCVStore, rolls: np.ndarray, method: str = RETURNS_ADJUSTMENT) -> OHLCVStore:
+    """
+    Roll-adjusted copy of ``store``'s prices, for every symbol in one vectorized pass.
+
+    Each roll's gap (its open against the previous close) is removed from all earlier
+    bars of the symbol, so the latest prices are untouched and history is shifted:
+
+    - "back" adds the sum of later gaps (``open - previous close``), which keeps price
+      differences (P&L per contract) intact
+    - "ratio" multiplies by the product of later ratios (``open / previous close``), which
+      keeps percentage returns intact and prices positive
+
+    Times, symbol codes and volume are shared with ``store``, not copied.
+
+    Parameters
+    ----------
+    store : OHLCVStore
+        Raw bars
+    rolls : np.ndarray
+        Boolean mask of roll rows, e.g. from ``find_rolls``
+    method : str
+        One of ``ADJUSTMENTS``
+
+    Returns
+    -------
+    OHLCVStore
+    """
+    if check_adjustment(method) == "none" or not rolls.any():
+        return store
+
+    open_ = store.columns["open"]
+    previous = np.full(len(store), np.nan)
+    previous[1:] = store.columns["close"][:-1]
+    rolls = rolls & ~_symbol_starts(store)
+
+    columns = dict(store.columns)
+    if method == "back":
+        offset = _later_sums(np.where(rolls, open_ - previous, 0.0), store)
+        for field in PRICE_FIELDS:
+            columns[field] = (store.columns[field] + offset).astype(store.columns[field].dtype)
+    else:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            log_ratio = np.where(rolls, np.log(open_ / previous), 0.0)
+        factor = np.exp(_later_sums(np.nan_to_num(log_ratio), store))
+        for field in PRICE_FIELDS:
+            columns[field] = (store.columns[field] * factor).astype(store.columns[field].dtype)
+    return OHLCVStore(store.times, store.codes, store.categories, columns)
+
+
+def roll_dates(store: OHLCVStore, rolls: np.ndarray) -> Dict[str, list]:
+    """{symbol: ["YYYY-MM-DD", ...]} of the roll rows, for reports."""
+    return {
+        symbol: [str(day) for day in store.times[low:high][rolls[low:high]].astype("datetime64[D]")]
+        for symbol, (low, high) in store.offsets.items()
+        if rolls[low:high].any()
+    }
+
+
+_lock = threading.Lock()
+# (dates, symbols, resolution, adjustment, source) -> (adjusted store, roll mask, raw store, built_at)
+_adjusted: Dict[tuple, tuple] = {}
+
+
+def _adjusted_entry(start_date: str, end_date: str, symbols: Optional[Iterable[str]], resolution: str,
+                    adjustment: str, source: str, ttl_seconds: float) -> tuple:
+    raw = get_ohlcv_store(start_date, end_date, symbols, resolution=resolution, ttl_seconds=ttl_seconds)
+    key = (start_date, end_date, None if symbols is None else tuple(symbols), resolution, adjustment, source)
+    with _lock:
+        cached = _adjusted.get(key)
+        if cached is not None and cached[2] is raw and time.monotonic() - cached[3] < ttl_seconds:
+            return cached
+        started = time.perf_counter()
+        rolls = find_rolls(raw, source)
+        entry = (adjust(raw, rolls, adjustment), rolls, raw, time.monotonic())
+        _adjusted[key] = entry
+        logger.info(f"Found {int(rolls.sum())} rolls across {len(raw.offsets)} symbols "
+                    f"({adjustment} adjustment) in {time.perf_counter() - started:.3f}s")
+        return entry
+
+
+def get_adjusted_store(start_date: str, end_date: str, symbols: Optional[Iterable[str]] = None,
+                       resolution: str = "1d", adjustment: str = DEFAULT_ADJUSTMENT,
+                       source: str = "auto", ttl_seconds: float = DEFAULT_TTL_SECONDS) -> OHLCVStore:
+    """
+    The process-wide OHLCV store with roll-adjusted continuous contracts.
+
+    Adjusted stores are cached per (dates, symbols, resolution, adjustment, source) and
+    rebuilt only when the raw store they came from is reloaded or after ``ttl_seconds``,
+    so requests never recompute the adjustment.
+    """
+    if adjustment == "none":
+        return get_ohlcv_store(start_date, end_date, symbols, resolution=resolution, ttl_seconds=ttl_seconds)
+    return _adjusted_entry(start_date, end_date, symbols, resolution, adjustment, source, ttl_seconds)[0]
+
+
+def get_roll_dates(start_date: str, end_date: str, symbols: Optional[Iterable[str]] = None,
+                   resolution: str = "1d", source: str = "auto",
+                   ttl_seconds: float = DEFAULT_TTL_SECONDS) -> Dict[str, list]:
+    """Roll dates per symbol, from the same cache as ``get_adjusted_store``."""
+    entry = _adjusted_entry(start_date, end_date, symbols, resolution, RETURNS_ADJUSTMENT, source, ttl_seconds)
+    return roll_dates(entry[2], entry[1])
+
+
+def invalidate_adjusted_stores() -> None:
+    """Drops every adjusted store, e.g. after new bars are inserted."""
+    with _lock:
+        _adjusted.clear()
@@ -0,0 +1,138 @@
+import uuid
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+# Every block is laid out as [index (int64 ns) | column 0 | column 1 | ...], all 8-byte items
+_ITEM_SIZE = 8
+
+
+def _open_block(name: str) -> shared_memory.SharedMemory:
+    """Attaches to an existing block without handing its lifetime to this process."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 always registers attached blocks with the resource tracker. Worker
+        # processes started from this one share the publisher's tracker, so the extra
+        # registration is a no-op and the publisher's unlink still cleans it up.
+        return shared_memory.SharedMemory(name=name)
+
+
+class SharedDataView:
+    """
+    Read-only NumPy/pandas views over a block published by ``SharedDataPlane``.
+
+    Nothing is copied: ``array`` and ``series`` wrap the shared buffer directly and the
+    arrays are flagged non-writeable, so one metric cannot corrupt another's inputs.
+    """
+
+    def __init__(self, handle: dict, block: shared_memory.SharedMemory = None) -> None:
+        self.handle = handle
+        self._block = block or _open_block(handle["name"])
+        length = handle["length"]
+        buffer = self._block.buf
+
+        self._index = np.ndarray((length,), dtype=np.int64, buffer=buffer)
+        self._index.flags.writeable = False
+        self._arrays = {}
+        for position, (column, dtype) in enumerate(handle["columns"]):
+            array = np.ndarray((length,), dtype=dtype, buffer=buffer, offset=(position + 1) * length * _ITEM_SIZE)
+            array.flags.writeable = False
+            self._arrays[column] = array
+
+    @property
+    def columns(self) -> list:
+        return list(self._arrays)
+
+    @property
+    def index(self) -> pd.DatetimeIndex:
+        return pd.DatetimeIndex(self._index.view("datetime64[ns]"), name=self.handle.get("index_name"))
+
+    def array(self, column: str) -> np.ndarray:
+        return self._arrays[column]
+
+    def series(self, column: str) -> pd.Series:
+        return pd.Series(self._arrays[column], index=self.index, name=column, copy=False)
+
+    def frame(self) -> pd.DataFrame:
+        return pd.DataFrame({column: self.series(column) for column in self._arrays}, copy=False)
+
+    def close(self) -> None:
+        """Releases this view's mapping; the block itself lives until the publisher unlinks it."""
+        self._index = None
+        self._arrays = {}
+        try:
+            self._block.close()
+        except BufferError:
+            # A consumer still holds a view; the mapping goes away once it is garbage collected.
+            pass
+
+
+class SharedDataPlane:
+    """
+    Publishes aligned, date-indexed arrays once into ``multiprocessing.shared_memory``.
+
+    Consumers in this or any other process call ``SharedDataPlane.attach(handle)`` to get
+    a ``SharedDataView``; N consumers cost one copy of the data instead of N serialized
+    copies. The publisher owns the block and must ``unlink`` it (or use it as a context
+    manager) once every consumer is done.
+    """
+
+    def __init__(self, block: shared_memory.SharedMemory, handle: dict) -> None:
+        self._block = block
+        self.handle = handle
+        self.view = SharedDataView(handle, block=block)
+
+    @classmethod
+    def publish(cls, index: pd.DatetimeIndex, **columns) -> "SharedDataPlane":
+        """
+        Copies ``columns`` (Series aligned to ``index`` or plain arrays) into a new block.
+
+        Series are reindexed to ``index`` first so every column shares the same date axis.
+        """
+        index = pd.DatetimeIndex(index).tz_localize(None)
+        length = len(index)
+        layout = []
+        arrays = []
+        for column, values in columns.items():
+            if isinstance(values, pd.Series):
+                values = values.reindex(index)
+            array = np.asarray(values)
+            if array.dtype.kind not in "fiu":
+                array = pd.to_numeric(pd.Series(array), errors="coerce").to_numpy()
+            array = array.astype(np.float64 if array.dtype.kind == "f" else np.int64, copy=False)
+            if len(array) != length:
+                raise ValueError(f"Column '{column}' has {len(array)} rows, expected {length}.")
+            layout.append((column, array.dtype.str))
+            arrays.append(array)
+
+        size = max(1, (len(arrays) + 1) * length * _ITEM_SIZE)
+        block = shared_memory.SharedMemory(create=True, size=size, name=f"algolens_{uuid.uuid4().hex[:16]}")
+        handle = {
+            "name": block.name,
+            "length": length,
+            "columns": layout,
+            "index_name": index.name,
+        }
+
+        np.ndarray((length,), dtype=np.int64, buffer=block.buf)[:] = index.values.astype("datetime64[ns]").view(np.int64)
+        for position, array in enumerate(arrays):
+            target = np.ndarray((length,), dtype=array.dtype, buffer=block.buf, offset=(position + 1) * length * _ITEM_SIZE)
+            target[:] = array
+        return cls(block, handle)
+
+    @staticmethod
+    def attach(handle: dict) -> SharedDataView:
+        return SharedDataView(handle)
+
+    def unlink(self) -> None:
+        """Closes the publisher's views and frees the block."""
+        self.view.close()
+        self._block.unlink()
+
+    def __enter__(self) -> "SharedDataPlane":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.unlink()
@@ -0,0 +1,147 @@
+import logging
+
+import pandas as pd
+
+from benchmarks import DEFAULT_BENCHMARK, load_benchmark
+from resample import DEFAULT_RESOLUTION, bars_from_daily, is_intraday
+from rolls import RETURNS_ADJUSTMENT
+from trading_calendar import align
+
+logger = logging.getLogger(__name__)
+
+# Bar resolutions whose price-weighted, unadjusted category series can be aggregated in the
+# database (``system.group_prices``) instead of loading every bar: resolution -> bucket
+PUSHDOWN_BUCKETS = {"1h": "hour", "1d": "day"}
+
+
+class InsufficientDataError(ValueError):
+    """Raised when there are too few observations to compute metrics."""
+
+
+def category_series(strategy_groups: dict, category: str) -> pd.Series:
+    """
+    Extracts the price-like series for a category from the output of ``system()``.
+
+    Parameters
+    ----------
+    strategy_groups : dict
+        Group name -> long-format DataFrame, plus the "portfolio" series
+    category : str
+        "portfolio" or one of the group names
+
+    Returns
+    -------
+    pd.Series
+        The portfolio series, or the equal-weighted average close of the group's symbols
+    """
+    if category == "portfolio":
+        series = strategy_groups.get("portfolio")
+    else:
+        group_df = strategy_groups.get(category)
+        if group_df is None:
+            raise ValueError(f"No data available for category '{category}'.")
+        # Pivot to get a series of average closes.
+        pivot = group_df.pivot_table(values='close', index=group_df.index, columns='symbol')
+        series = pivot.mean(axis=1).squeeze()
+
+    if series is None:
+        raise ValueError(f"No data available for category '{category}'.")
+    return series
+
+
+def load_aligned_returns(
+    category: str = "portfolio",
+    strategy_groups: dict = None,
+    weighting: str = "price",
+    rebalance: str = "monthly",
+    benchmark: str = DEFAULT_BENCHMARK,
+    resolution: str = DEFAULT_RESOLUTION,
+    adjustment: str = RETURNS_ADJUSTMENT,
+) -> tuple:
+    """
+    Loads the strategy and benchmark daily returns aligned on their common dates.
+
+    Parameters
+    ----------
+    category : str
+        "portfolio" or one of the group names returned by ``system()``
+    strategy_groups : dict, optional
+        Output of ``system()``; loaded from the database when omitted. Price-weighted,
+        unadjusted series at a ``PUSHDOWN_BUCKETS`` resolution are then averaged in the
+        database by ``system.group_prices`` rather than built from every bar
+    weighting : str
+        Portfolio construction passed to ``system()`` when it is called here
+    rebalance : str
+        Rebalance frequency passed to ``system()`` when it is called here
+    benchmark : str
+        Name of the benchmark in ``benchmarks.BENCHMARKS`` to compare against
+    resolution : str
+        Bar resolution passed to ``system()`` when it is called here; the daily benchmark
+        is placed on intraday bars with ``resample.bars_from_daily``
+    adjustment : str
+        Roll adjustment passed to ``system()`` when it is called here; returns default to
+        ratio-adjusted prices so rolls do not show up as returns
+
+    Returns
+    -------
+    tuple
+        (strategy returns, benchmark returns), both sorted and on the same index
+
+    Raises
+    ------
+    InsufficientDataError
+        If either series, or their overlap, has fewer than two observations
+    """
+    if strategy_groups is None and weighting == "price" and adjustment == "none" and resolution in PUSHDOWN_BUCKETS:
+        from system import group_prices
+        averages = group_prices(bucket=PUSHDOWN_BUCKETS[resolution], resolution=resolution)
+        if category not in averages.columns:
+            raise ValueError(f"No data available for category '{category}'.")
+        strategy_filtered = averages[category]
+    else:
+        if strategy_groups is None:
+            from system import system
+            strategy_groups = system(weighting=weighting, rebalance=rebalance, resolution=resolution,
+                                     adjustment=adjustment)
+        strategy_filtered = category_series(strategy_groups, category)
+
+    logger.info(f"Strategy data shape before processing: {strategy_filtered.shape}")
+    logger.info(f"Date range: {strategy_filtered.index.min()} to {strategy_filtered.index.max()}")
+
+    # Process the strategy series: convert to numeric, drop NAs, and compute percentage change.
+    strategy = pd.to_numeric(strategy_filtered, errors='coerce')
+    strategy = strategy.dropna().pct_change().dropna()
+
+    logger.info(f"Strategy data shape after processing: {strategy.shape}")
+
+    # Check if we have enough data to proceed
+    if len(strategy) < 2:
+        raise InsufficientDataError("Insufficient strategy data for analysis")
+
+    # The workbook is parsed once per process; later requests reuse the cached returns
+    if is_intraday(strategy.index):
+        # Each daily benchmark return is spread geometrically over that day's bars
+        sessions = strategy.index.normalize().unique()
+        benchmark = bars_from_daily(load_benchmark(benchmark, sessions), strategy.index).dropna()
+    else:
+        benchmark = load_benchmark(benchmark, strategy.index)
+
+    logger.info(f"Benchmark data shape after processing: {benchmark.shape}")
+
+    # Check if we have enough benchmark data
+    if len(benchmark) < 2:
+        raise InsufficientDataError("Insufficient benchmark data for analysis")
+
+    # Align both series on their common dates with one sorted merge over the trading calendar.
+    aligned = align({"strategy": strategy, "benchmark": benchmark}, how="inner", skipna=False)
+    logger.info(f"Number of common dates: {len(aligned)}")
+
+    # Check if we have enough common dates
+    if len(aligned) < 2:
+        raise InsufficientDataError("Insufficient overlapping data between strategy and benchmark")
+
+    strategy = aligned["strategy"].rename(strategy.name)
+    benchmark = aligned["benchmark"].rename(benchmark.name)
+
+    logger.info(f"Final data shapes - Strategy: {strategy.shape}, Benchmark: {benchmark.shape}")
+    return strategy, benchmark
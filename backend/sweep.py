@@ -0,0 +1,274 @@
+import itertools
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks import DEFAULT_BENCHMARK, check_benchmarks
+from bootstrap import HEADLINE_METRICS, headline_metrics
+from process_pool import check_workers, get_process_pool
+from relative import relative_metrics
+from resample import TRADING_DAYS
+from rolling import rolling_metrics
+from shared_data import SharedDataPlane
+
+logger = logging.getLogger(__name__)
+
+# Grid key -> settings swept when the key is omitted. Every cell is one combination.
+DEFAULT_GRID = {
+    "categories": ["portfolio"],
+    "benchmarks": [DEFAULT_BENCHMARK],
+    "windows": [30],
+    "rf": [0.0],
+    "periods": [TRADING_DAYS],
+    "dateRanges": [[None, None]],
+}
+SETTING_COLUMNS = ("category", "benchmark", "window", "rf", "periods", "start", "end")
+SWEEP_METRICS = HEADLINE_METRICS + (
+    "rolling_sharpe_mean", "rolling_sharpe_last", "rolling_volatility_mean",
+    "beta", "alpha", "correlation", "information_ratio", "observations",
+)
+COLUMNS = ("cell",) + SETTING_COLUMNS + SWEEP_METRICS + ("seconds", "error")
+
+MAX_CELLS = 5000
+
+
+def _axis(grid: dict, key: str) -> list:
+    values = grid.get(key, DEFAULT_GRID[key])
+    if not isinstance(values, (list, tuple)):
+        values = [values]
+    if not values:
+        raise ValueError(f"Grid axis '{key}' is empty.")
+    return list(values)
+
+
+def _date_range(value) -> tuple:
+    """[start, end] or {"start": ..., "end": ...}; either bound may be None (open)."""
+    if isinstance(value, dict):
+        start, end = value.get("start"), value.get("end")
+    elif isinstance(value, (list, tuple)) and len(value) == 2:
+        start, end = value
+    else:
+        raise ValueError(f"Date ranges are [start, end] pairs, got {value!r}.")
+    start = None if start is None else str(pd.Timestamp(start).date())
+    end = None if end is None else str(pd.Timestamp(end).date())
+    return start, end
+
+
+def expand_grid(grid: dict = None) -> list:
+    """
+    Expands a settings grid into its cells, the cartesian product of every axis.
+
+    Parameters
+    ----------
+    grid : dict, optional
+        ``DEFAULT_GRID`` keys -> list of values (a scalar is a one-value axis); omitted
+        axes keep their default
+
+    Returns
+    -------
+    list of dict
+        One {"category", "benchmark", "window", "rf", "periods", "start", "end"} per cell
+
+    Raises
+    ------
+    ValueError
+        For unknown axes, invalid values or a grid of more than ``MAX_CELLS`` cells
+    """
+    grid = grid or {}
+    unknown = set(grid) - set(DEFAULT_GRID)
+    if unknown:
+        raise ValueError(f"Unknown grid axes {sorted(unknown)}; use {list(DEFAULT_GRID)}.")
+
+    windows = [int(w) for w in _axis(grid, "windows")]
+    if any(w < 2 for w in windows):
+        raise ValueError("Rolling windows must be at least 2 periods.")
+    periods = [int(p) for p in _axis(grid, "periods")]
+    if any(p < 1 for p in periods):
+        raise ValueError("Periods per year must be positive.")
+    axes = [
+        [str(c) for c in _axis(grid, "categories")],
+        check_benchmarks([b or DEFAULT_BENCHMARK for b in _axis(grid, "benchmarks")]),
+        windows,
+        [float(r) for r in _axis(grid, "rf")],
+        periods,
+        [_date_range(r) for r in _axis(grid, "dateRanges")],
+    ]
+    count = int(np.prod([len(axis) for axis in axes]))
+    if count > MAX_CELLS:
+        raise ValueError(f"The grid has {count} cells; at most {MAX_CELLS} are allowed.")
+
+    return [
+        {"category": category, "benchmark": benchmark, "window": window, "rf": rf,
+         "periods": period, "start": start, "end": end}
+        for category, benchmark, window, rf, period, (start, end) in itertools.product(*axes)
+    ]
+
+
+def cell_metrics(strategy: pd.Series, benchmark: pd.Series, cell: dict) -> dict:
+    """
+    Computes the sweep metrics of one cell on aligned strategy and benchmark returns.
+
+    The returns are cut to the cell's date range; ``rf`` (annualized) is taken out of the
+    returns for the Sharpe and Sortino ratios and the rolling Sharpe, as quantstats does,
+    and every annualized figure uses the cell's ``periods``. At the base settings (30-bar
+    window, no risk-free rate, daily periods) every figure equals the one /api/quantstats
+    reports; ``check_sweep_consistency.py`` compares the two.
+
+    Raises
+    ------
+    ValueError
+        If fewer than two returns fall in the date range
+    """
+    index = strategy.index
+    low = 0 if cell["start"] is None else index.searchsorted(pd.Timestamp(cell["start"]), side="left")
+    high = len(index) if cell["end"] is None else index.searchsorted(pd.Timestamp(cell["end"]), side="right")
+    strategy, benchmark = strategy.iloc[low:high], benchmark.iloc[low:high]
+    valid = strategy.notna().to_numpy()
+    strategy, benchmark = strategy[valid], benchmark[valid]
+    if len(strategy) < 2:
+        raise ValueError("Fewer than two returns in the date range")
+
+    values = strategy.to_numpy(dtype=float)
+    periods, rf = cell["periods"], cell["rf"]
+    excess = values - ((1 + rf) ** (1.0 / periods) - 1) if rf else values
+    raw = headline_metrics(values[:, None], periods)
+    adjusted = headline_metrics(excess[:, None], periods)
+    metrics = {metric: float(raw[metric][0]) for metric in HEADLINE_METRICS}
+    metrics["sharpe"] = float(adjusted["sharpe"][0])
+    metrics["sortino"] = float(adjusted["sortino"][0])
+
+    rolling = rolling_metrics(strategy, windows=[cell["window"]], rf=rf, periods=periods, metrics=("sharpe", "std"))
+    sharpe = rolling["sharpe"].to_numpy()[0]
+    sharpe = sharpe[np.isfinite(sharpe)]
+    volatility = rolling["std"].to_numpy()[0] * np.sqrt(periods)
+    volatility = volatility[np.isfinite(volatility)]
+    metrics["rolling_sharpe_mean"] = float(sharpe.mean()) if len(sharpe) else np.nan
+    metrics["rolling_sharpe_last"] = float(sharpe[-1]) if len(sharpe) else np.nan
+    metrics["rolling_volatility_mean"] = float(volatility.mean()) if len(volatility) else np.nan
+
+    relative = relative_metrics(strategy, benchmark.to_frame("benchmark"), periods)["benchmark"]
+    for metric in ("beta", "alpha", "correlation", "information_ratio"):
+        metrics[metric] = float(relative[metric])
+    metrics["observations"] = len(values)
+    return metrics
+
+
+def _run_cells(handle: dict, cells: list) -> list:
+    """Attaches to the published returns once and evaluates a batch of (cell number, cell, pair)."""
+    view = SharedDataPlane.attach(handle)
+    rows = []
+    try:
+        for number, cell, pair in cells:
+            started = time.perf_counter()
+            row = {"cell": number, **cell}
+            try:
+                row.update(cell_metrics(view.series(f"strategy/{pair}"), view.series(f"benchmark/{pair}"), cell))
+                row["error"] = None
+            except ValueError as e:
+                row["error"] = str(e)
+            row["seconds"] = time.perf_counter() - started
+            rows.append(row)
+    finally:
+        view.close()
+    return rows
+
+
+def _load_pairs(cells: list, strategy_groups: dict) -> dict:
+    """Loads the aligned returns of every (category, benchmark) pair in the grid once."""
+    from strategy_data import load_aligned_returns
+
+    pairs = {}
+    for cell in cells:
+        key = (cell["category"], cell["benchmark"])
+        if key not in pairs:
+            pairs[key] = load_aligned_returns(key[0], strategy_groups, benchmark=key[1])
+    return pairs
+
+
+def run_sweep(grid: dict = None, strategy_groups: dict = None, max_workers: int = None,
+              on_progress=None) -> dict:
+    """
+    Runs the sweep metrics for every cell of a settings grid.
+
+    The strategy and benchmark returns of each (category, benchmark) pair are loaded and
+    aligned once and published into one shared-memory block; the cells are then split
+    into one batch per worker and spread over the shared process pool
+    (``process_pool.get_process_pool``), each worker attaching to the block instead of
+    receiving its own pickled copy of the history.
+
+    Parameters
+    ----------
+    grid : dict, optional
+        Settings grid, see ``expand_grid``
+    strategy_groups : dict, optional
+        Output of ``system()``; the process-wide cached ratio-adjusted one when omitted
+    max_workers : int, optional
+        Worker processes, at most the CPU count (the default); 1 runs every cell in-process
+    on_progress : callable, optional
+        Called with (cells done, total cells) after each batch
+
+    Returns
+    -------
+    dict
+        {"columns": [...], "rows": [{column: value}, ...]} with one row per cell, plus
+        "cells", "workers", "load_seconds" and "seconds"
+
+    Raises
+    ------
+    ValueError
+        If the grid or ``max_workers`` is invalid
+    InsufficientDataError
+        If a (category, benchmark) pair has too little data
+    """
+    started = time.perf_counter()
+    cells = expand_grid(grid)
+    workers = check_workers(max_workers)
+    if strategy_groups is None:
+        from data_context import get_strategy_groups
+        from rolls import RETURNS_ADJUSTMENT
+        strategy_groups = get_strategy_groups(RETURNS_ADJUSTMENT)
+
+    pairs = _load_pairs(cells, strategy_groups)
+    pair_numbers = {key: number for number, key in enumerate(pairs)}
+    index = pd.DatetimeIndex([])
+    for strategy, _ in pairs.values():
+        index = index.union(strategy.index)
+    columns = {}
+    for key, (strategy, benchmark) in pairs.items():
+        columns[f"strategy/{pair_numbers[key]}"] = strategy
+        columns[f"benchmark/{pair_numbers[key]}"] = benchmark
+    load_seconds = time.perf_counter() - started
+
+    tasks = [(number, cell, pair_numbers[(cell["category"], cell["benchmark"])])
+             for number, cell in enumerate(cells)]
+    workers = min(workers, len(tasks))
+    batches = [list(batch) for batch in np.array_split(np.arange(len(tasks)), max(workers, 1))]
+    batches = [[tasks[i] for i in batch] for batch in batches if len(batch)]
+
+    rows = []
+    with SharedDataPlane.publish(index, **columns) as plane:
+        if workers <= 1:
+            results = (_run_cells(plane.handle, batch) for batch in batches)
+        else:
+            results = get_process_pool().map(_run_cells, [plane.handle] * len(batches), batches)
+        try:
+            for batch_rows in results:
+                rows.extend(batch_rows)
+                if on_progress is not None:
+                    on_progress(len(rows), len(tasks))
+        finally:
+            # Cancels the batches still queued when progress reporting raised (job cancelled)
+            results.close()
+
+    seconds = time.perf_counter() - started
+    logger.info(f"Swept {len(rows)} cells over {workers} workers in {seconds:.2f}s")
+    return {
+        "columns": list(COLUMNS),
+        "rows": [{column: row.get(column, np.nan) for column in COLUMNS} for row in rows],
+        "cells": len(rows),
+        "workers": workers,
+        "load_seconds": load_seconds,
+        "seconds": seconds,
+    }
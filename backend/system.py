@@ -1,33 +1,52 @@
-from data_access import DataAccess
+from rolls import DEFAULT_ADJUSTMENT, get_adjusted_store
 import pandas as pd
 
-def system():
-    data = DataAccess()
-
-    # Define the symbols by group.
-    symbols_by_group = {
-        'stocks': ['GF.v.0'],
-        'futures': ['RB.v.0', 'CL.v.0'],
-        'options': ['YM.v.0']
-    }
-
-    # Dictionary to hold a DataFrame for each group.
-    group_dataframes = {}
-
-    # Fetch and process data for each group.
-    for group, symbols in symbols_by_group.items():
-        df = pd.DataFrame(
-            data.get_ohlcv_data('2017-06-07', '2024-12-19', symbols),
-            columns=['time', 'open', 'high', 'low', 'close', 'volume', 'symbol']
-        )
-        # Process the dataframe:
-        # - Convert 'time' to datetime and rename it to 'Date'
-        # - Set the Date as the index and remove timezone information.
-        df['time'] = pd.to_datetime(df['time'])
-        df.rename(columns={'time': 'Date'}, inplace=True)
-        df.set_index('Date', inplace=True)
-        df.index = df.index.tz_localize(None)
-        group_dataframes[group] = df
+# History loaded for the strategy groups
+START_DATE = '2017-06-07'
+END_DATE = '2024-12-19'
+
+# Define the symbols by group. Each group's symbols are sorted, as the database query
+# used to return them, and listed next to each other in the OHLCV store so that a
+# group's frame is a read-only view over the store rather than a copy.
+SYMBOLS_BY_GROUP = {
+    'stocks': ['GF.v.0'],
+    'futures': ['CL.v.0', 'RB.v.0'],
+    'options': ['YM.v.0']
+}
+SYMBOLS = [symbol for symbols in SYMBOLS_BY_GROUP.values() for symbol in symbols]
+
+def system(weighting="price", rebalance="monthly", resolution="1d", adjustment=DEFAULT_ADJUSTMENT):
+    """
+    Loads the strategy groups and builds the portfolio series.
+
+    ``resolution`` is the bar size, a key of ``resample.RESOLUTIONS``: "1d" (the default),
+    "1h" and "1m" are read from their tables, the others are resampled from a finer table
+    while it streams in. Intraday groups are indexed by bar time instead of date.
+
+    ``adjustment`` roll-adjusts continuous contracts ("ratio" or "back"; see ``rolls.adjust``)
+    so contract switches do not show up as returns. The default "none" keeps the prices
+    that traded: adjusted history depends on later rolls, so only returns analysis
+    (``rolls.RETURNS_ADJUSTMENT``) should ask for it.
+
+    weighting="price" keeps the original construction (average of raw closes). Any of
+    portfolio.WEIGHTINGS instead runs the returns-based engine over every symbol and
+    stores the portfolio as an equity curve starting at 1.0, rebalanced at ``rebalance``.
+    """
+    # Load every group's bars with one query into the shared columnar store, roll-adjusted
+    # when asked (the adjusted store is cached next to the raw one).
+    store = get_adjusted_store(START_DATE, END_DATE, SYMBOLS, resolution=resolution, adjustment=adjustment)
+
+    # Dictionary to hold a DataFrame for each group (Date index, timezone-naive).
+    group_dataframes = {group: store.frame(symbols) for group, symbols in SYMBOLS_BY_GROUP.items()}
+
+    if weighting != "price":
+        from portfolio import portfolio_returns, returns_matrix
+        from resample import annualization_factor
+
+        engine = portfolio_returns(returns_matrix(group_dataframes), weighting=weighting, rebalance=rebalance,
+                                   periods=annualization_factor(resolution))
+        group_dataframes['portfolio'] = engine["equity"].rename('portfolio')
+        return group_dataframes
 
     # Create a portfolio-level dataframe.
     # For each group, pivot the data to have each symbol's 'close' as a separate column,
@@ -49,3 +68,20 @@ def system():
     group_dataframes['portfolio'] = portfolio_df['portfolio']
 
     return group_dataframes
+
+def group_prices(bucket="day", resolution="1d", returns=False):
+    """
+    Each group's average close and the portfolio average per ``bucket`` ("hour", "day",
+    "week" or "month"), aggregated in the database where TimescaleDB is available
+    (``DataAccess.get_group_averages``) so only one row per bucket comes back.
+
+    These are raw closes: with bucket="day" the "portfolio" column equals
+    ``system()['portfolio']`` (``adjustment="none"``). Roll-adjusted views cannot be
+    aggregated in the database, since the adjustment needs every bar, so they always go
+    through ``system()``. ``strategy_data.load_aligned_returns`` uses this for price-weighted,
+    unadjusted requests. returns=True gives the bucket-to-bucket percentage change instead.
+    """
+    from data_access import DataAccess
+
+    prices = DataAccess().get_group_averages(START_DATE, END_DATE, SYMBOLS_BY_GROUP, bucket=bucket, resolution=resolution)
+    return prices.pct_change(fill_method=None) if returns else prices
@@ -0,0 +1,390 @@
+import logging
+import os
+import warnings
+
+from glass_factory import (execute_custom_code,
+                           import_custom_metric,
+                           load_custom_code,
+                           save_code_to_file)
+
+logger = logging.getLogger(__name__)
+
+# Computations behind the heavy routes, shared by the synchronous endpoints and the job queue.
+# Every task takes the request payload as ``params`` and an optional ``job`` (see ``jobs.Job``)
+# used to report progress and to stop early when the job is cancelled.
+
+
+def _progress(job, fraction, message):
+    """Reports progress and honours cancellation when running as a job."""
+    if job is not None:
+        job.check_cancelled()
+        job.report(fraction, message)
+
+
+def run_imported_metric(metric_filename, input_data):
+    """
+    Imports a saved metric and calls its custom_metric() function, falling back to
+    executing the file when it does not define one.
+    """
+    # Try to import the module, binding the inputs it declares as globals
+    from data_context import declared_inputs
+    declared = declared_inputs(load_custom_code(metric_filename) or "")
+    module = import_custom_metric(metric_filename, {name: input_data[name] for name in declared})
+    if module is None:
+        return {"success": False, "error": "Failed to import metric"}
+
+    # Check if the module has a custom_metric function
+    if hasattr(module, 'custom_metric') and callable(module.custom_metric):
+        try:
+            # Call the custom_metric function with the provided data
+            metric_result = module.custom_metric(input_data) if input_data else module.custom_metric()
+            logger.info(f"Successfully executed custom metric: {metric_filename}")
+            return {
+                "success": True,
+                "metric_value": metric_result
+            }
+        except Exception as e:
+            logger.error(f"Error executing custom metric {metric_filename}: {str(e)}")
+            return {
+                "success": False,
+                "error": f"Error executing custom metric: {str(e)}"
+            }
+
+    # If no custom_metric function, try to execute the code directly
+    return execute_custom_code(load_custom_code(metric_filename), input_data)
+
+
+def metric_sections(custom_metrics, data_for_metrics, context=None, job=None):
+    """
+    Runs saved custom metrics against one shared input dict, yielding each metric's result
+    keys (its value under "custom_<name>" and its chart under "charts") as it completes.
+    Inputs the metrics declare are resolved once from ``context``.
+    """
+    from metric_cache import cached_execute
+
+    for position, metric_filename in enumerate(custom_metrics):
+        _progress(job, 0.6 + 0.35 * position / len(custom_metrics), f"Running {metric_filename}")
+        logger.info(f"Running custom metric: {metric_filename}")
+        code = load_custom_code(metric_filename)
+        if code:
+            metric_result = cached_execute(code, data_for_metrics, context=context)
+
+            # Extract the metric name from filename
+            metric_name = os.path.splitext(metric_filename)[0]
+            section = {}
+
+            # Add metric value to results if available
+            if metric_result.get("success", False):
+                if "metric_value" in metric_result:
+                    section[f"custom_{metric_name}"] = metric_result["metric_value"]
+                    logger.info(f"Added custom metric value for {metric_name}")
+
+                # Add chart data if available
+                if "chart_data" in metric_result:
+                    section["charts"] = {metric_name: metric_result["chart_data"]}
+                    logger.info(f"Added custom chart for {metric_name}")
+            else:
+                # Log error
+                error_msg = metric_result.get("error", "Unknown error")
+                logger.error(f"Error running custom metric {metric_name}: {error_msg}")
+
+                # Add error information to results
+                section["charts"] = {f"error_{metric_name}": {"error": error_msg}}
+            yield metric_name, section
+        else:
+            logger.error(f"Custom metric file not found: {metric_filename}")
+
+
+def merge_section(results, section):
+    """Adds one streamed section to ``results``, merging custom charts into "charts"."""
+    for key, value in section.items():
+        if key == "charts":
+            results.setdefault("charts", {}).update(value)
+        else:
+            results[key] = value
+    return results
+
+
+def quantstats_sections(params, job=None):
+    """
+    Generator form of ``quantstats_task``: yields ``(section, results)`` pairs as soon as
+    each part of the /api/quantstats payload is ready. Sections are those of
+    ``quant.SECTIONS``, then "benchmarks" (relative metrics against every benchmark in
+    ``params["benchmarks"]``, default all available), then one "custom:<name>" section
+    per custom metric.
+
+    Raises
+    ------
+    InsufficientDataError
+        If there is too little data to compute metrics (before the first section)
+    ValueError
+        If a setting such as "resolution", "adjustment", "bootstrap" or a benchmark name is
+        invalid (before the first section)
+    """
+    from benchmarks import DEFAULT_BENCHMARK, benchmark_matrix, check_benchmarks
+    from quant import quant_stats_sections
+    from relative import relative_metrics, serialize_relative_metrics
+    from resample import DEFAULT_RESOLUTION, annualization_factor, check_resolution
+    from rolls import RETURNS_ADJUSTMENT, check_adjustment
+    from strategy_data import load_aligned_returns
+    from data_munging import replace_nan_and_inf, replace_infinity_with_neg_one
+    from shared_data import SharedDataPlane
+    from data_context import DataContext, get_strategy_groups
+    from decimation import check_decimation
+
+    # Get category (default "portfolio")
+    category = params.get("category", "portfolio")
+    # Get custom metrics to run (if any)
+    custom_metrics = params.get("customMetrics", [])
+    # Optional extra rolling windows, e.g. [21, 63, 126, 252]
+    rolling_windows = params.get("rollingWindows")
+    # Optional bootstrap confidence intervals: true or {"n_paths", "mean_block", "confidence", "seed"}
+    bootstrap = params.get("bootstrap")
+    if bootstrap:
+        from bootstrap import check_bootstrap_settings
+        bootstrap = check_bootstrap_settings(bootstrap) if isinstance(bootstrap, dict) else {}
+    else:
+        bootstrap = None
+    # Optional point budget per chart (roughly the chart's pixel width) and decimation method
+    max_points, decimation_method = check_decimation(params.get("maxPoints"), params.get("decimation", "lttb"))
+    # Portfolio construction: "price" (average of closes) or "equal", "inverse_vol", "vol_target"
+    weighting = params.get("weighting", "price")
+    rebalance = params.get("rebalance", "monthly")
+    # Primary benchmark (reported under the "Index" keys) and the set compared side by side
+    primary_benchmark = check_benchmarks(params.get("benchmark") or DEFAULT_BENCHMARK)[0]
+    comparison_benchmarks = params.get("benchmarks")
+    if comparison_benchmarks is not None:
+        comparison_benchmarks = check_benchmarks(comparison_benchmarks)
+    # Bar resolution, e.g. "1d" (default), "1h" or "5m"; annualization follows it
+    resolution = check_resolution(params.get("resolution") or DEFAULT_RESOLUTION)
+    periods = annualization_factor(resolution)
+    # Roll adjustment of continuous contracts: "ratio" (default), "back" or "none"
+    adjustment = check_adjustment(params.get("adjustment") or RETURNS_ADJUSTMENT)
+
+    def finish(section):
+        # Decimate last so metrics and custom code always see the full-resolution series
+        if max_points:
+            from decimation import decimate_results
+            section = decimate_results(section, max_points, decimation_method)
+        return section
+
+    logger.info(f"Running quantstats for category: {category}")
+    if custom_metrics:
+        logger.info(f"With custom metrics: {custom_metrics}")
+
+    strategy_name = "Mean Reversion"
+    benchmark_name = "Index"
+
+    # Load the strategy and benchmark returns aligned on their common dates
+    # Price-weighted daily groups come from the process-wide cache of system() output;
+    # unadjusted price-weighted series are averaged in the database instead
+    _progress(job, 0.0, "Loading returns")
+    default_groups = (weighting, resolution) == ("price", DEFAULT_RESOLUTION) and adjustment != "none"
+    strategy_groups = get_strategy_groups(adjustment) if default_groups else None
+    strategy_processed, benchmark = load_aligned_returns(
+        category, strategy_groups, weighting=weighting, rebalance=rebalance, benchmark=primary_benchmark,
+        resolution=resolution, adjustment=adjustment,
+    )
+
+    # Run quant_stats calculations with warning suppression
+    _progress(job, 0.2, "Computing metrics")
+    sections = quant_stats_sections(strategy_name, strategy_processed, benchmark_name, benchmark,
+                                    rolling_windows=rolling_windows, bootstrap=bootstrap, periods=periods)
+    while True:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", category=RuntimeWarning)
+            name, section = next(sections, (None, None))
+        if name is None:
+            break
+        # Post-process results to handle any remaining NaN or infinity values
+        section = replace_nan_and_inf(replace_infinity_with_neg_one(section))
+        yield name, finish(section)
+
+    # Relative metrics against every benchmark from one aligned date x benchmark matrix
+    _progress(job, 0.55, "Comparing benchmarks")
+    matrix = benchmark_matrix(strategy_processed.index, comparison_benchmarks)
+    yield "benchmarks", {
+        "benchmarks": serialize_relative_metrics(relative_metrics(strategy_processed, matrix, periods=periods))
+    }
+
+    # Run custom metrics if requested
+    if custom_metrics:
+        logger.info(f"Running {len(custom_metrics)} custom metrics")
+        # Publish the aligned returns once; every metric gets read-only views of the same buffer
+        shared_plane = SharedDataPlane.publish(
+            strategy_processed.index, strategy=strategy_processed, benchmark=benchmark
+        )
+        data_for_metrics = {
+            "strategy": shared_plane.view.series("strategy"),
+            "benchmark": shared_plane.view.series("benchmark"),
+            "strategy_name": strategy_name,
+            "benchmark_name": benchmark_name,
+            "shared_data": shared_plane.handle
+        }
+
+        # Declared inputs reuse the aligned returns already in shared memory
+        context = DataContext(
+            category,
+            settings={"weighting": weighting, "rebalance": rebalance, "benchmark": primary_benchmark,
+                      "resolution": resolution, "adjustment": adjustment},
+            strategy_returns=data_for_metrics["strategy"],
+            benchmark_returns=data_for_metrics["benchmark"],
+        )
+        if strategy_groups is not None:
+            context.seed(strategy_groups=strategy_groups)
+
+        try:
+            for metric_name, section in metric_sections(custom_metrics, data_for_metrics, context, job):
+                yield f"custom:{metric_name}", finish(section)
+        finally:
+            data_for_metrics = None
+            context = None
+            shared_plane.unlink()
+
+    _progress(job, 1.0, "Done")
+
+
+def quantstats_task(params, job=None):
+    """
+    Loads the aligned strategy and benchmark returns, runs quant_stats and any saved
+    custom metrics, and returns the /api/quantstats payload.
+
+    Raises
+    ------
+    InsufficientDataError
+        If there is too little data to compute metrics
+    ValueError
+        If a setting such as "resolution", "adjustment", "bootstrap" or a benchmark name is
+        invalid
+    """
+    results = {}
+    for _, section in quantstats_sections(params, job):
+        merge_section(results, section)
+    return results
+
+
+def custom_metrics_task(params, job=None):
+    """Runs the saved metrics listed in ``params["metrics"]`` and returns {filename: result}."""
+    from data_context import DataContext
+    from glass_factory import resolve_declared_inputs
+    from metric_cache import get_metric_cache
+
+    metrics = params.get("metrics")
+    if not metrics:
+        raise ValueError("Missing required fields")
+
+    # One context per request: inputs shared by several metrics are loaded once
+    context = DataContext.from_params(params)
+    results = {}
+    for position, metric_filename in enumerate(metrics):
+        _progress(job, position / len(metrics), f"Running {metric_filename}")
+        logger.info(f"Running custom metric: {metric_filename}")
+        code = load_custom_code(metric_filename)
+        if code is None:
+            results[metric_filename] = {"success": False, "error": "Metric file not found"}
+            continue
+        try:
+            input_data = resolve_declared_inputs(code, params.get("data"), context)
+        except Exception as e:
+            results[metric_filename] = {"success": False, "error": f"Error resolving inputs: {str(e)}"}
+            continue
+        # Unchanged metrics on unchanged inputs are served from the metric cache
+        results[metric_filename] = get_metric_cache().get_or_compute(
+            code, input_data, lambda: run_imported_metric(metric_filename, input_data),
+            cache_if=lambda result: result.get("success", False), namespace="import",
+        )
+
+    _progress(job, 1.0, "Done")
+    return results
+
+
+def glassfactory_task(params, job=None, on_output=None):
+    """
+    Executes ``params["code"]`` and returns the /api/glassfactory payload. ``on_output``
+    receives each printed line while the code runs.
+    """
+    from decimation import check_decimation
+
+    code = params.get("code")
+    if not code:
+        raise ValueError("No code provided")
+    save_metric = params.get("save", False)
+    # Optional point budget for the chart, checked before any code runs
+    max_points, decimation_method = check_decimation(params.get("maxPoints"), params.get("decimation", "lttb"))
+
+    # Execute the code, under the profiler if asked to
+    _progress(job, 0.0, "Running code")
+    if params.get("profile"):
+        from profiling import profile_call
+        result, report = profile_call(lambda: execute_custom_code(code, on_output=on_output))
+    else:
+        result, report = execute_custom_code(code, on_output=on_output), None
+
+    # Prepare response
+    response_data = {
+        "result": result.get("stdout", ""),
+        "success": result.get("success", False)
+    }
+
+    # Add chart data if available, thinned to maxPoints when requested
+    if "chart_data" in result:
+        response_data["chart_data"] = result["chart_data"]
+        if max_points:
+            from decimation import decimate_chart_data
+            response_data["chart_data"] = decimate_chart_data(result["chart_data"], max_points, decimation_method)
+
+    # Add error if any
+    if "error" in result:
+        response_data["error"] = result["error"]
+
+    # Add the profiling report if requested
+    if report is not None:
+        response_data["profile"] = report
+
+    # Save the code if requested
+    if save_metric and "name" in params:
+        name = params["name"]
+        description = params.get("description", "")
+        filepath = save_code_to_file(code, name, description)
+        response_data["saved"] = True
+        response_data["filepath"] = filepath
+        logger.info(f"Saved custom metric from glassfactory: {name}")
+
+    _progress(job, 1.0, "Done")
+    return response_data
+
+
+def warmup_task(params, job=None):
+    """Recomputes the cached data and standard views; returns the warm-up report."""
+    from warmup import DEFAULT_CONCURRENCY, DEFAULT_POPULAR_VIEWS, warm_up
+
+    return warm_up(
+        reason=params.get("reason", "manual"),
+        concurrency=int(params.get("concurrency", DEFAULT_CONCURRENCY)),
+        popular=int(params.get("popular", DEFAULT_POPULAR_VIEWS)),
+        job=job,
+    )
+
+
+def sweep_task(params, job=None):
+    """Runs a quant_stats settings sweep over ``params["grid"]``; returns the /api/sweep payload."""
+    from data_munging import replace_nan_and_inf
+    from sweep import run_sweep
+
+    _progress(job, 0.0, "Loading returns")
+    results = run_sweep(
+        params.get("grid"),
+        max_workers=params.get("workers"),
+        on_progress=lambda done, total: _progress(job, done / total, f"Swept {done} of {total} cells"),
+    )
+    return replace_nan_and_inf(results)
+
+
+# Job kind -> task, as accepted by POST /api/jobs
+TASKS = {
+    "quantstats": quantstats_task,
+    "custom_metrics": custom_metrics_task,
+    "glassfactory": glassfactory_task,
+    "warmup": warmup_task,
+    "sweep": sweep_task,
+}
@@ -0,0 +1,184 @@
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from data_munging import serialize_dates
+
+BAR_FIELDS = ("open", "high", "low", "close", "volume")
+DERIVED_FIELDS = ("return", "cumulative_return", "drawdown")
+
+DEFAULT_TTL_SECONDS = 300
+
+
+def _to_datetime64(timestamps) -> np.ndarray:
+    """Converts a timestamp or an iterable of timestamps to a datetime64[ns] array."""
+    index = pd.DatetimeIndex(pd.to_datetime(np.atleast_1d(np.asarray(timestamps, dtype=object))))
+    return index.tz_localize(None).values.astype("datetime64[ns]")
+
+
+def _derived_state(close: np.ndarray) -> Dict[str, np.ndarray]:
+    """Per-bar return, cumulative return since the first bar and drawdown from the running peak."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = np.empty_like(close)
+        returns[0] = np.nan
+        returns[1:] = close[1:] / close[:-1] - 1
+        cumulative = close / close[0] - 1
+        drawdown = close / np.fmax.accumulate(close) - 1
+    return {"return": returns, "cumulative_return": cumulative, "drawdown": drawdown}
+
+
+class AsOfIndex:
+    """
+    As-of lookups over the output of ``system()``.
+
+    Every symbol's bars live in one set of columns sorted by (symbol, time); ``_offsets``
+    gives each symbol's [start, end) slice. A lookup is a binary search of the requested
+    timestamps in that slice, so the latest bar at or before any moment costs O(log n) and
+    a batch of k timestamps costs O(k log n) without touching pandas.
+    """
+
+    def __init__(self, group_dataframes: Dict[str, pd.DataFrame]) -> None:
+        times, columns = [], {field: [] for field in BAR_FIELDS + DERIVED_FIELDS}
+        self.group_of: Dict[str, str] = {}
+        self._offsets: Dict[str, tuple] = {}
+        self._portfolio = None
+
+        position = 0
+        for group, df in group_dataframes.items():
+            if isinstance(df, pd.Series):
+                self._portfolio = self._build_series(df)
+                continue
+            for symbol, bars in df.groupby("symbol", sort=True):
+                bars = bars[~bars.index.duplicated(keep="last")].sort_index()
+                close = pd.to_numeric(bars["close"], errors="coerce").to_numpy(dtype=float)
+                times.append(bars.index.values.astype("datetime64[ns]"))
+                for field in BAR_FIELDS:
+                    columns[field].append(pd.to_numeric(bars[field], errors="coerce").to_numpy(dtype=float))
+                for field, values in _derived_state(close).items():
+                    columns[field].append(values)
+                self._offsets[symbol] = (position, position + len(bars))
+                self.group_of[symbol] = group
+                position += len(bars)
+
+        self._times = np.concatenate(times) if times else np.array([], dtype="datetime64[ns]")
+        self._columns = {
+            field: (np.concatenate(values) if values else np.array([], dtype=float))
+            for field, values in columns.items()
+        }
+
+    @staticmethod
+    def _build_series(series: pd.Series) -> dict:
+        series = pd.to_numeric(series, errors="coerce").dropna().sort_index()
+        value = series.to_numpy(dtype=float)
+        state = _derived_state(value) if len(value) else {field: value for field in DERIVED_FIELDS}
+        return {"times": series.index.values.astype("datetime64[ns]"), "value": value, **state}
+
+    @property
+    def symbols(self) -> List[str]:
+        return list(self._offsets)
+
+    def _positions(self, symbol: str, targets: np.ndarray) -> np.ndarray:
+        """Absolute row of the latest bar at or before each target, or -1 if none."""
+        start, end = self._offsets[symbol]
+        local = np.searchsorted(self._times[start:end], targets, side="right") - 1
+        return np.where(local >= 0, local + start, -1)
+
+    def _select(self, symbols: Optional[Iterable[str]]) -> List[str]:
+        if symbols is None:
+            return self.symbols
+        unknown = [s for s in symbols if s not in self._offsets]
+        if unknown:
+            raise KeyError(f"Unknown symbols: {unknown}")
+        return list(symbols)
+
+    def as_of(self, timestamp, symbols: Optional[Iterable[str]] = None) -> dict:
+        """
+        Latest bar and derived state per symbol at ``timestamp``.
+
+        Returns
+        -------
+        dict
+            {"timestamp", "symbols": {symbol: {...} or None}, "portfolio": {...} or None}
+        """
+        batch = self.as_of_many([timestamp], symbols)
+        snapshot = {"timestamp": batch["timestamps"][0], "symbols": {}, "portfolio": None}
+        for symbol, rows in batch["symbols"].items():
+            snapshot["symbols"][symbol] = None if rows["time"][0] is None else {
+                key: values[0] for key, values in rows.items()
+            }
+        if batch["portfolio"] is not None and batch["portfolio"]["time"][0] is not None:
+            snapshot["portfolio"] = {key: values[0] for key, values in batch["portfolio"].items()}
+        return snapshot
+
+    def as_of_many(self, timestamps, symbols: Optional[Iterable[str]] = None) -> dict:
+        """
+        Vectorized as-of lookup for many timestamps at once.
+
+        Returns
+        -------
+        dict
+            {"timestamps": [...], "symbols": {symbol: {field: [...]}}, "portfolio": {field: [...]}}
+            with one list entry per requested timestamp (None before a symbol's first bar)
+        """
+        targets = _to_datetime64(timestamps)
+        output = {"timestamps": serialize_dates(targets), "symbols": {}, "portfolio": None}
+
+        for symbol in self._select(symbols):
+            rows = self._positions(symbol, targets)
+            found = rows >= 0
+            safe = np.where(found, rows, 0)
+            record = {
+                "group": [self.group_of[symbol] if ok else None for ok in found],
+                "time": [d if ok else None for d, ok in zip(serialize_dates(self._times[safe]), found)],
+            }
+            for field, values in self._columns.items():
+                record[field] = [
+                    None if not ok or np.isnan(v) else v
+                    for v, ok in zip(values[safe].tolist(), found)
+                ]
+            output["symbols"][symbol] = record
+
+        if self._portfolio is not None and len(self._portfolio["times"]):
+            rows = np.searchsorted(self._portfolio["times"], targets, side="right") - 1
+            found = rows >= 0
+            safe = np.where(found, rows, 0)
+            portfolio = {
+                "time": [d if ok else None for d, ok in zip(serialize_dates(self._portfolio["times"][safe]), found)],
+            }
+            for field in ("value",) + DERIVED_FIELDS:
+                portfolio[field] = [
+                    None if not ok or np.isnan(v) else v
+                    for v, ok in zip(self._portfolio[field][safe].tolist(), found)
+                ]
+            output["portfolio"] = portfolio
+        return output
+
+
+_lock = threading.Lock()
+_cached_index: Optional[AsOfIndex] = None
+_built_at: Optional[float] = None
+
+
+def get_time_machine(ttl_seconds: float = DEFAULT_TTL_SECONDS, refresh: bool = False) -> AsOfIndex:
+    """Returns the process-wide as-of index, rebuilding it from ``system()`` when it expires."""
+    global _cached_index, _built_at
+    with _lock:
+        expired = _built_at is None or time.monotonic() - _built_at >= ttl_seconds
+        if refresh or _cached_index is None or expired:
+            from system import system
+
+            # As-of lookups must return prices that traded, not history rescaled by later rolls
+            _cached_index = AsOfIndex(system(adjustment="none"))
+            _built_at = time.monotonic()
+        return _cached_index
+
+
+def invalidate_time_machine() -> None:
+    """Drops the cached index, e.g. after new bars are inserted."""
+    global _cached_index, _built_at
+    with _lock:
+        _cached_index = None
+        _built_at = None
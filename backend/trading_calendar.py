@@ -0,0 +1,187 @@
+import logging
+import threading
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Span of the default calendar; dates outside it (or weekend sessions) extend it on demand
+DEFAULT_START = "1990-01-01"
+DEFAULT_END = "2040-12-31"
+DEFAULT_WEEKMASK = "Mon Tue Wed Thu Fri"
+
+JOINS = ("inner", "outer")
+
+
+def _day_numbers(index) -> Optional[np.ndarray]:
+    """
+    Days since the epoch of a daily, timezone-naive DatetimeIndex, or None when the index
+    carries intraday times or a timezone (those take the pandas path).
+    """
+    if not isinstance(index, pd.DatetimeIndex) or index.tz is not None:
+        return None
+    values = index.values
+    days = values.astype("datetime64[D]")
+    if len(values) and (days != values).any():
+        return None
+    return days.view(np.int64)
+
+
+class TradingCalendar:
+    """
+    Sorted trading sessions with an integer position for every session date.
+
+    Positions come from a dense lookup table indexed by day number, so mapping n dates
+    to positions is one subtraction and one gather (no hashing, no searching). Aligning
+    series then scatters each one into a preallocated sessions x series grid and keeps
+    the rows every series filled: one linear pass per series instead of an index
+    intersection, ``.loc`` gathers and ``sort_index`` calls.
+
+    Holidays need no special treatment: a session no series has data for is simply
+    dropped by the alignment.
+    """
+
+    def __init__(self, sessions) -> None:
+        sessions = np.unique(np.asarray(sessions, dtype="datetime64[D]"))
+        self.days = sessions.view(np.int64)
+        self.first_day = int(self.days[0])
+        self.last_day = int(self.days[-1])
+        self._lookup = np.full(self.last_day - self.first_day + 1, -1, dtype=np.int64)
+        self._lookup[self.days - self.first_day] = np.arange(len(self.days))
+
+    @classmethod
+    def business_days(cls, start: str = DEFAULT_START, end: str = DEFAULT_END,
+                      weekmask: str = DEFAULT_WEEKMASK, holidays=None) -> "TradingCalendar":
+        """Calendar of ``np.busday`` sessions between ``start`` and ``end`` (inclusive)."""
+        first = np.datetime64(start, "D")
+        last = np.datetime64(end, "D") + 1
+        days = np.arange(first, last, dtype="datetime64[D]")
+        return cls(days[np.is_busday(days, weekmask=weekmask, holidays=holidays or [])])
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+    @property
+    def sessions(self) -> pd.DatetimeIndex:
+        return pd.DatetimeIndex(self.days.view("datetime64[D]").astype("datetime64[ns]"))
+
+    def positions(self, dates) -> np.ndarray:
+        """Session position of each date, or -1 for dates that are not sessions."""
+        days = dates if isinstance(dates, np.ndarray) and dates.dtype == np.int64 \
+            else _day_numbers(pd.DatetimeIndex(dates))
+        if days is None:
+            raise ValueError("positions() needs daily, timezone-naive dates")
+        offsets = days - self.first_day
+        inside = (offsets >= 0) & (offsets < len(self._lookup))
+        result = np.full(len(days), -1, dtype=np.int64)
+        result[inside] = self._lookup[offsets[inside]]
+        return result
+
+    def covers(self, days: np.ndarray) -> bool:
+        return bool((self.positions(days) >= 0).all())
+
+    def extended(self, days: np.ndarray) -> "TradingCalendar":
+        """A calendar with the given day numbers added as sessions."""
+        return TradingCalendar(np.union1d(self.days, days).view("datetime64[D]"))
+
+    def align(self, series: Dict[str, pd.Series], how: str = "inner", skipna: bool = True) -> pd.DataFrame:
+        """
+        Aligns several daily series on their common (or combined) sessions.
+
+        Parameters
+        ----------
+        series : dict
+            Name -> pd.Series with a daily DatetimeIndex, in any order (the scatter into
+            session positions sorts it without a sort)
+        how : str
+            "inner" keeps sessions where every series has a value, "outer" where any does
+        skipna : bool
+            Treat NaN values as missing, as ``DataFrame.dropna`` would
+
+        Returns
+        -------
+        pd.DataFrame
+            One float column per series, sorted by date
+        """
+        if how not in JOINS:
+            raise ValueError(f"Unknown join '{how}'; use one of {JOINS}.")
+        names = list(series)
+        day_numbers = [_day_numbers(s.index) for s in series.values()]
+        if any(days is None for days in day_numbers):
+            return _pandas_align(series, how, skipna)
+
+        calendar = self
+        for days in day_numbers:
+            if not calendar.covers(days):
+                calendar = get_trading_calendar(extend_with=days)
+        positions = [calendar.positions(days) for days in day_numbers]
+        if not names or not any(len(p) for p in positions):
+            return pd.DataFrame({name: pd.Series(dtype=float) for name in names},
+                                index=pd.DatetimeIndex([]))
+
+        low = min(int(p.min()) for p in positions if len(p))
+        high = max(int(p.max()) for p in positions if len(p)) + 1
+        grid = np.full((high - low, len(names)), np.nan)
+        present = np.zeros((high - low, len(names)), dtype=bool)
+        for column, (values, rows) in enumerate(zip(series.values(), positions)):
+            values = values.to_numpy(dtype=float)
+            grid[rows - low, column] = values
+            present[rows - low, column] = ~np.isnan(values) if skipna else True
+
+        keep = present.all(axis=1) if how == "inner" else present.any(axis=1)
+        # Keep the inputs' resolution (ns or us) so the result matches a pandas alignment
+        unit = next(iter(series.values())).index.unit
+        index = pd.DatetimeIndex(calendar.days[low:high][keep].view("datetime64[D]")).as_unit(unit)
+        return pd.DataFrame(grid[keep], index=index, columns=names)
+
+    def reindex(self, series: pd.Series, index: pd.DatetimeIndex) -> np.ndarray:
+        """
+        ``series.reindex(index).to_numpy()`` through session positions: the series is
+        scattered into a session-indexed buffer and gathered at ``index``.
+        """
+        source_days, target_days = _day_numbers(series.index), _day_numbers(index)
+        if source_days is None or target_days is None:
+            return series.reindex(index).to_numpy(dtype=float)
+        calendar = self
+        for days in (source_days, target_days):
+            if not calendar.covers(days):
+                calendar = get_trading_calendar(extend_with=days)
+        buffer = np.full(len(calendar), np.nan)
+        buffer[calendar.positions(source_days)] = series.to_numpy(dtype=float)
+        return buffer[calendar.positions(target_days)]
+
+
+def _pandas_align(series: Dict[str, pd.Series], how: str, skipna: bool) -> pd.DataFrame:
+    """Fallback for intraday or timezone-aware indexes."""
+    frame = pd.DataFrame({name: s.astype(float) for name, s in series.items()}).sort_index()
+    if skipna:
+        return frame.dropna(how="any" if how == "inner" else "all")
+    masks = pd.DataFrame({name: frame.index.isin(s.index) for name, s in series.items()}, index=frame.index)
+    return frame[masks.all(axis=1) if how == "inner" else masks.any(axis=1)]
+
+
+_lock = threading.Lock()
+_calendar: Optional[TradingCalendar] = None
+
+
+def get_trading_calendar(extend_with: np.ndarray = None) -> TradingCalendar:
+    """
+    Returns the process-wide business-day calendar, built on first use. Dates passed in
+    ``extend_with`` that are not sessions yet (weekend bars, dates outside the span) are
+    added once and kept for later calls.
+    """
+    global _calendar
+    with _lock:
+        if _calendar is None:
+            _calendar = TradingCalendar.business_days()
+        if extend_with is not None and len(extend_with) and not _calendar.covers(extend_with):
+            _calendar = _calendar.extended(extend_with)
+            logger.info(f"Trading calendar extended to {len(_calendar)} sessions")
+        return _calendar
+
+
+def align(series: Dict[str, pd.Series], how: str = "inner", skipna: bool = True) -> pd.DataFrame:
+    """``TradingCalendar.align`` on the process-wide calendar."""
+    return get_trading_calendar().align(series, how=how, skipna=skipna)
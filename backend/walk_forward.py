@@ -0,0 +1,177 @@
+import numpy as np
+import pandas as pd
+
+from aggregation import FREQUENCIES, period_codes
+from data_munging import make_serializable, serialize_dates
+from rolling import padded_cumsum
+
+CHECKPOINT_METRICS = ("cagr", "sharpe", "sortino", "max_drawdown", "volatility", "win_rate", "beta")
+
+MODES = ("expanding", "walk_forward")
+
+# Upper bound on the number of cells materialised at once by the walk-forward drawdown
+_DRAWDOWN_CHUNK_CELLS = 4_000_000
+
+
+def checkpoint_positions(index: pd.DatetimeIndex, frequency: str = "monthly") -> np.ndarray:
+    """
+    Row positions of the last observation in every calendar period (e.g. each month-end).
+
+    The final observation is always included so the last checkpoint covers the full sample.
+    """
+    if frequency not in FREQUENCIES:
+        raise ValueError(f"Unknown frequency '{frequency}'; use one of {list(FREQUENCIES)}.")
+    codes, _ = period_codes(index)[frequency]
+    if len(codes) == 0:
+        return np.array([], dtype=np.int64)
+    return np.append(np.flatnonzero(np.diff(codes)), len(codes) - 1)
+
+
+def checkpoint_metrics(
+    returns: pd.Series,
+    benchmark: pd.Series = None,
+    checkpoints=None,
+    frequency: str = "monthly",
+    mode: str = "expanding",
+    lookback: int = 252,
+    periods: int = 252,
+    min_periods: int = 2,
+) -> pd.DataFrame:
+    """
+    Headline metrics as of every checkpoint from a single sweep over the returns.
+
+    Running accumulators (cumulative sums of returns, squared returns, downside squares,
+    wins, log growth and benchmark cross products) turn every metric over any range of
+    rows into O(1) differences, so all checkpoints cost O(n) instead of one full
+    ``quant_stats`` call per cutoff. Sortino divides by ``sqrt(sum(r[r < 0] ** 2) / n)``
+    and max drawdown starts from a baseline of 1.0, as in quantstats. CAGR annualizes
+    over ``n / periods`` years of observations, not calendar years. The last expanding
+    checkpoint equals the full-sample figures ``quant_stats`` reports on the same returns.
+
+    Parameters
+    ----------
+    returns : pd.Series
+        Daily strategy returns
+    benchmark : pd.Series, optional
+        Benchmark returns on the same index, required for ``beta``
+    checkpoints : iterable of dates, optional
+        Explicit cutoffs; each uses the last observation on or before it
+    frequency : str
+        Calendar checkpoints when ``checkpoints`` is not given ("monthly" = month-ends)
+    mode : str
+        "expanding" evaluates from the first observation to each checkpoint;
+        "walk_forward" evaluates the trailing ``lookback`` observations
+    lookback : int
+        Window length for "walk_forward"
+    periods : int
+        Periods per year used for annualization
+    min_periods : int
+        Checkpoints with fewer observations in their window are reported as NaN
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per metric and one column per checkpoint date
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode '{mode}'; use one of {MODES}.")
+
+    returns = pd.to_numeric(returns, errors="coerce").dropna().sort_index()
+    r = returns.to_numpy(dtype=float)
+    n = len(r)
+
+    if checkpoints is None:
+        ends = checkpoint_positions(returns.index, frequency)
+    else:
+        targets = pd.DatetimeIndex(pd.to_datetime(list(checkpoints))).tz_localize(None).values
+        ends = np.searchsorted(returns.index.values, targets, side="right") - 1
+        ends = np.unique(ends[ends >= 0])
+
+    starts = np.zeros_like(ends) if mode == "expanding" else np.maximum(ends - lookback + 1, 0)
+    # Window (start, end] in padded-cumsum coordinates is [starts, ends + 1)
+    lo, hi = starts, ends + 1
+    count = (hi - lo).astype(float)
+
+    sum_r = padded_cumsum(r)
+    shift = r.mean() if n else 0.0
+    centered = r - shift
+    sum_c = padded_cumsum(centered)
+    sum_c2 = padded_cumsum(centered * centered)
+    sum_down = padded_cumsum(np.minimum(r, 0.0) ** 2)
+    wins = padded_cumsum((r > 0).astype(float))
+    nonzero = padded_cumsum((r != 0).astype(float))
+    log_wealth = padded_cumsum(np.log1p(r))
+
+    annual = np.sqrt(periods)
+    metrics = {}
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = (sum_r[hi] - sum_r[lo]) / count
+        s1 = sum_c[hi] - sum_c[lo]
+        variance = (sum_c2[hi] - sum_c2[lo] - s1 * s1 / count) / (count - 1)
+        std = np.sqrt(np.maximum(variance, 0.0))
+        downside = np.sqrt((sum_down[hi] - sum_down[lo]) / count)
+        growth = log_wealth[hi] - log_wealth[lo]
+
+        metrics["cagr"] = np.expm1(growth * periods / count)
+        metrics["sharpe"] = mean / std * annual
+        metrics["sortino"] = np.where(downside > 0, mean / downside * annual, np.nan)
+        metrics["volatility"] = std * annual
+        metrics["win_rate"] = np.where(
+            nonzero[hi] - nonzero[lo] > 0,
+            (wins[hi] - wins[lo]) / (nonzero[hi] - nonzero[lo]),
+            0.0,
+        )
+
+        if mode == "expanding":
+            # Drawdown from the running peak (baseline 0 in log space), carried forward
+            drawdown = log_wealth[1:] - np.maximum(np.maximum.accumulate(log_wealth[1:]), 0.0)
+            worst = np.minimum.accumulate(drawdown) if n else drawdown
+            metrics["max_drawdown"] = np.expm1(worst[ends]) if n else np.array([])
+        else:
+            # One row per checkpoint holding the baseline level plus the trailing ``lookback``
+            # levels; leading zeros pad the windows cut short at the start (baseline 0 in log
+            # space), so every row's running peak restarts at its own checkpoint window
+            width = min(lookback, n)
+            padded = np.concatenate([np.zeros(width), log_wealth])
+            views = np.lib.stride_tricks.sliding_window_view(padded, width + 1)
+            worst = np.empty(len(ends))
+            rows_per_chunk = max(1, _DRAWDOWN_CHUNK_CELLS // (width + 1))
+            for start in range(0, len(ends), rows_per_chunk):
+                paths = views[hi[start:start + rows_per_chunk]]
+                paths = paths - paths[:, :1]
+                peaks = np.maximum.accumulate(paths, axis=1)
+                worst[start:start + len(paths)] = (paths - peaks).min(axis=1)
+            metrics["max_drawdown"] = np.expm1(worst)
+
+        if benchmark is not None:
+            b = pd.to_numeric(benchmark, errors="coerce").reindex(returns.index).to_numpy(dtype=float)
+            paired = ~np.isnan(b)
+            b = np.where(paired, b, 0.0)
+            bc = np.where(paired, b - (b[paired].mean() if paired.any() else 0.0), 0.0)
+            rc = np.where(paired, centered, 0.0)
+            pairs = padded_cumsum(paired.astype(float))
+            sb, sb2 = padded_cumsum(bc), padded_cumsum(bc * bc)
+            sr, srb = padded_cumsum(rc), padded_cumsum(rc * bc)
+            k = pairs[hi] - pairs[lo]
+            bench_sum = sb[hi] - sb[lo]
+            covariance = srb[hi] - srb[lo] - (sr[hi] - sr[lo]) * bench_sum / k
+            bench_var = sb2[hi] - sb2[lo] - bench_sum * bench_sum / k
+            metrics["beta"] = np.where(k >= 2, covariance / bench_var, np.nan)
+        else:
+            metrics["beta"] = np.full(len(ends), np.nan)
+
+    too_short = count < min_periods
+    table = pd.DataFrame(
+        {name: np.where(too_short, np.nan, metrics[name]) for name in CHECKPOINT_METRICS},
+        index=returns.index[ends],
+    ).T
+    table.columns.name = "checkpoint"
+    return table
+
+
+def serialize_checkpoint_table(table: pd.DataFrame) -> dict:
+    """Packs a metrics x checkpoint table as {"dates": [...], "metrics": {name: [...]}}."""
+    return {
+        "dates": serialize_dates(table.columns),
+        "metrics": {name: make_serializable(row.tolist()) for name, row in zip(table.index, table.to_numpy())},
+    }
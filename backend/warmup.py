@@ -0,0 +1,383 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = 3600
+DEFAULT_MAX_ENTRIES = 64
+# Views computed at once during warm-up; each one holds the full return history in memory
+DEFAULT_CONCURRENCY = 2
+# Most requested non-default views (e.g. with custom metrics selected) to warm as well
+DEFAULT_POPULAR_VIEWS = 5
+
+# /api/quantstats fields that change the computed payload, with their defaults.
+# maxPoints, decimation and stream only change how a cached payload is presented.
+RESPONSE_PARAMS = {
+    "category": "portfolio",
+    "customMetrics": [],
+    "rollingWindows": None,
+    "bootstrap": None,
+    "weighting": "price",
+    "rebalance": "monthly",
+    "benchmark": None,
+    "benchmarks": None,
+    "resolution": "1d",
+    "adjustment": "ratio",
+}
+
+
+def response_params(params: dict) -> dict:
+    """The payload-defining subset of an /api/quantstats request, with defaults filled in."""
+    core = {name: params.get(name, default) or default for name, default in RESPONSE_PARAMS.items()}
+    core["customMetrics"] = sorted(core["customMetrics"])
+    return core
+
+
+def view_label(view: dict) -> str:
+    """Short name of a view for reports, e.g. "futures customMetrics=['Custom_Chart.py']"."""
+    extras = [f"{name}={value}" for name, value in view.items()
+              if name != "category" and value != RESPONSE_PARAMS[name]]
+    return " ".join([str(view["category"]), *extras])
+
+
+def response_key(params: dict) -> str:
+    """
+    Cache key of an /api/quantstats request: its payload-defining fields plus a hash of
+    each selected custom metric's source, so editing a metric misses the cache.
+    """
+    from glass_factory import load_custom_code
+
+    core = response_params(params)
+    sources = {
+        name: hashlib.sha256((load_custom_code(name) or "").encode("utf-8")).hexdigest()
+        for name in core["customMetrics"]
+    }
+    return json.dumps({**core, "sources": sources}, sort_keys=True)
+
+
+class ResponseCache:
+    """
+    Full-resolution /api/quantstats payloads, LRU-bounded and expiring after ``ttl_seconds``.
+
+    ``invalidate`` bumps a generation counter, and results computed under an older
+    generation are dropped on ``put``, so a computation that started before an ingest
+    never lands in the cache afterwards. Request counts per view feed ``popular``.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl_seconds: float = DEFAULT_TTL_SECONDS) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.generation = 0
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._requests: Counter = Counter()
+        self._params: dict = {}
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "stale_stores": 0, "invalidations": 0}
+
+    def get(self, key: str):
+        """Returns the cached payload or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[1] < self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return entry[0]
+            self._stats["misses"] += 1
+            return None
+
+    def put(self, key: str, results: dict, generation: int) -> bool:
+        """Stores a payload computed under ``generation``; returns False if it is already stale."""
+        with self._lock:
+            if generation != self.generation:
+                self._stats["stale_stores"] += 1
+                return False
+            self._entries[key] = (results, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._stats["stores"] += 1
+            return True
+
+    def record_request(self, key: str, params: dict) -> None:
+        with self._lock:
+            self._requests[key] += 1
+            self._params[key] = response_params(params)
+
+    def popular(self, count: int) -> list:
+        """Payload-defining params of the ``count`` most requested views."""
+        with self._lock:
+            return [self._params[key] for key, _ in self._requests.most_common(count)]
+
+    def invalidate(self) -> None:
+        """Drops every payload; computations already running will not be stored."""
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+            self._stats["invalidations"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._stats,
+                "entries": len(self._entries),
+                "generation": self.generation,
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+            }
+
+
+_response_cache: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> ResponseCache:
+    """Returns the process-wide response cache."""
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = ResponseCache()
+    return _response_cache
+
+
+def present(results: dict, params: dict) -> dict:
+    """Applies the request's presentation options (decimation) to a cached payload."""
+    from decimation import check_decimation, decimate_results
+
+    max_points, method = check_decimation(params.get("maxPoints"), params.get("decimation", "lttb"))
+    if not max_points:
+        return results
+    # Shallow copy: decimation replaces top-level series and never touches the cached ones
+    return decimate_results(dict(results), max_points, method)
+
+
+def cached_quantstats(params: dict, refresh: bool = False, record: bool = True) -> dict:
+    """
+    ``tasks.quantstats_task`` served from the response cache.
+
+    The full-resolution payload is cached, so clients with different chart widths share
+    one entry; ``refresh`` recomputes even on a hit.
+    """
+    from decimation import check_decimation
+    from tasks import quantstats_task
+
+    # Bad presentation options fail before any work, not after the payload was computed
+    check_decimation(params.get("maxPoints"), params.get("decimation", "lttb"))
+    cache = get_response_cache()
+    key = response_key(params)
+    if record:
+        cache.record_request(key, params)
+    results = None if refresh else cache.get(key)
+    if results is None:
+        generation = cache.generation
+        results = quantstats_task(response_params(params))
+        cache.put(key, results, generation)
+    return present(results, params)
+
+
+def stream_quantstats(params: dict, refresh: bool = False):
+    """
+    ``tasks.quantstats_sections`` served from the response cache: a hit is one "cached"
+    section with the whole payload, a miss streams live sections and caches their union.
+    """
+    from decimation import check_decimation
+    from tasks import merge_section, quantstats_sections
+
+    check_decimation(params.get("maxPoints"), params.get("decimation", "lttb"))
+    cache = get_response_cache()
+    key = response_key(params)
+    cache.record_request(key, params)
+    results = None if refresh else cache.get(key)
+    if results is not None:
+        yield "cached", present(results, params)
+        return
+
+    generation = cache.generation
+    results = {}
+    for name, section in quantstats_sections(response_params(params)):
+        merge_section(results, section)
+        yield name, present(section, params)
+    cache.put(key, results, generation)
+
+
+def invalidate_derived_data() -> None:
+    """Drops every cache built from the OHLCV table."""
+    from data_context import invalidate_strategy_groups
+    from ohlcv_store import invalidate_ohlcv_store
+    from rolls import invalidate_adjusted_stores
+    from time_machine import invalidate_time_machine
+
+    get_response_cache().invalidate()
+    invalidate_ohlcv_store()
+    invalidate_adjusted_stores()
+    invalidate_strategy_groups()
+    invalidate_time_machine()
+
+
+def _run_stage(name: str, steps: dict, concurrency: int, job=None) -> dict:
+    """Runs ``steps`` ({label: callable}) on at most ``concurrency`` threads and times each."""
+    start = time.perf_counter()
+    items = []
+
+    def timed(label, step):
+        began = time.perf_counter()
+        try:
+            step()
+            return {"name": label, "ok": True, "seconds": time.perf_counter() - began}
+        except Exception as e:
+            logger.error(f"Warm-up step {name}/{label} failed: {str(e)}")
+            return {"name": label, "ok": False, "seconds": time.perf_counter() - began, "error": str(e)}
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix=f"warmup-{name}") as executor:
+        futures = [executor.submit(timed, label, step) for label, step in steps.items()]
+        try:
+            for future in as_completed(futures):
+                items.append(future.result())
+                if job is not None:
+                    job.check_cancelled()
+        except BaseException:
+            executor.shutdown(wait=True, cancel_futures=True)
+            raise
+    return {"stage": name, "seconds": time.perf_counter() - start, "items": items}
+
+
+_last_report: Optional[dict] = None
+_warm_lock = threading.Lock()
+
+
+def standard_views(strategy_groups: dict, popular: int = DEFAULT_POPULAR_VIEWS) -> list:
+    """
+    The views warmed after an ingest: the default dashboard for every category, then the
+    most requested other views (custom metric selections, rolling windows, weightings).
+    """
+    categories = ["portfolio"] + [group for group in strategy_groups if group != "portfolio"]
+    views = [response_params({"category": category}) for category in categories]
+    for params in get_response_cache().popular(len(categories) + popular):
+        if len(views) >= len(categories) + popular:
+            break
+        if params not in views:
+            views.append(params)
+    return views
+
+
+def warm_up(reason: str = "manual", concurrency: int = DEFAULT_CONCURRENCY,
+            popular: int = DEFAULT_POPULAR_VIEWS, job=None) -> dict:
+    """
+    Recomputes the cached data and the standard dashboard views in dependency order.
+
+    Stages run one after another and the steps within a stage run on up to
+    ``concurrency`` threads:
+
+    1. data     - ``system()`` output and the benchmark workbook
+    2. indexes  - as-of index and covariance/correlation service (rebuilt from system())
+    3. views    - /api/quantstats payloads from ``standard_views`` into the response cache
+
+    Returns
+    -------
+    dict
+        Report with "reason", "started_at", "seconds", per-stage and per-step timings,
+        the warmed "views" and the number of failed steps
+    """
+    global _last_report
+    from benchmarks import load_benchmark_returns
+    from correlation import get_correlation_service
+    from data_context import get_strategy_groups
+    from rolls import RETURNS_ADJUSTMENT
+    from time_machine import get_time_machine
+
+    def progress(fraction, message):
+        if job is not None:
+            job.check_cancelled()
+            job.report(fraction, message)
+
+    with _warm_lock:
+        started_at = time.time()
+        start = time.perf_counter()
+        logger.info(f"Warm-up started ({reason})")
+        stages = []
+
+        progress(0.0, "Loading data")
+        stages.append(_run_stage("data", {
+            "strategy_groups": lambda: get_strategy_groups(refresh=True),
+            "adjusted_groups": lambda: get_strategy_groups(RETURNS_ADJUSTMENT, refresh=True),
+            "benchmark": load_benchmark_returns,
+        }, concurrency, job))
+
+        progress(0.2, "Building indexes")
+        stages.append(_run_stage("indexes", {
+            "time_machine": lambda: get_time_machine(refresh=True),
+            "correlation": lambda: get_correlation_service(refresh=True),
+        }, concurrency, job))
+
+        progress(0.4, "Computing views")
+        views = standard_views(get_strategy_groups(), popular)
+        stages.append(_run_stage("views", {
+            view_label(view): (lambda view=view: cached_quantstats(view, refresh=True, record=False))
+            for view in views
+        }, concurrency, job))
+
+        report = {
+            "reason": reason,
+            "started_at": started_at,
+            "seconds": time.perf_counter() - start,
+            "concurrency": concurrency,
+            "stages": stages,
+            "views": views,
+            "errors": sum(not item["ok"] for stage in stages for item in stage["items"]),
+        }
+        _last_report = report
+        logger.info(f"Warm-up finished in {report['seconds']:.2f}s: {len(views)} views, {report['errors']} errors")
+        progress(1.0, "Done")
+        return report
+
+
+def last_report() -> Optional[dict]:
+    """Report of the most recent warm-up in this process, if any."""
+    return _last_report
+
+
+def warmup_after_ingest(records) -> None:
+    """``DataAccess.on_ingest`` listener: drops stale caches and queues a warm-up job."""
+    from jobs import get_job_manager
+    from metadata_service import get_metadata_index
+
+    invalidate_derived_data()
+    # New symbols usually arrive with their contract metadata; reload it on the next read
+    get_metadata_index().invalidate()
+    job_id = get_job_manager().submit("warmup", {"reason": f"ingest of {len(records)} records"}, lane="batch", priority=10)
+    logger.info(f"Queued warm-up job {job_id} after ingest")
+
+
+def install_ingest_hook() -> None:
+    """Warms the caches after every ``DataAccess.insert_data`` in this process."""
+    from data_access import on_ingest
+    on_ingest(warmup_after_ingest)
+
+
+def start_scheduler(interval_seconds: float, concurrency: int = DEFAULT_CONCURRENCY) -> threading.Thread:
+    """
+    Checks the latest bar date every ``interval_seconds`` and warms up when it changed,
+    which also catches bars loaded by another process.
+    """
+    from data_access import DataAccess
+
+    def loop():
+        warmed_version = None
+        while True:
+            try:
+                version = DataAccess().get_latest_date()
+                if version != warmed_version:
+                    if warmed_version is not None:
+                        invalidate_derived_data()
+                    warm_up(reason=f"schedule (data through {version})", concurrency=concurrency)
+                    warmed_version = version
+            except Exception as e:
+                logger.error(f"Scheduled warm-up failed: {str(e)}")
+            time.sleep(interval_seconds)
+
+    thread = threading.Thread(target=loop, name="warmup-scheduler", daemon=True)
+    thread.start()
+    return thread
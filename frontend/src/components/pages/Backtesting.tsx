@@ -8,6 +8,7 @@ import { Button } from "@/components/ui/button";
 import { Menubar, MenubarMenu, MenubarTrigger } from "@/components/ui/menubar";
 import Link from "next/link";
 import Image from "next/image";
+import { readNdjson } from "@/lib/ndjson";
 
 // Keys for localStorage persistence.
 const LS_PREFERENCES = "backtesting_preferences";
@@ -102,7 +103,11 @@ export default function Backtesting() {
           preferences: prefs, 
           category: category, 
           dateRange: range,
-          customMetrics: selectedCustomMetrics
+          customMetrics: selectedCustomMetrics,
+          // Roughly one point per horizontal pixel; the backend decimates longer series
+          maxPoints: Math.round(window.innerWidth),
+          // Receive each section as soon as it is computed, cumulative curves first
+          stream: true
         }),
       });
   
@@ -111,11 +116,23 @@ export default function Backtesting() {
         throw new Error(error.error || "Failed to fetch metrics.");
       }
   
-      const data = await response.json();
+      // Render every section as it arrives instead of waiting for the whole payload
+      const data: any = {};
+      let streamError = "";
+      await readNdjson(response, (record) => {
+        if (record.section === "error") {
+          streamError = record.error;
+        } else if (record.data) {
+          const { charts, ...rest } = record.data;
+          Object.assign(data, rest);
+          if (charts) data.charts = { ...data.charts, ...charts };
+          setMetrics({ ...data });
+        }
+      });
       console.log("Fetched metrics:", data);
-      setMetrics(data);
       // Increment chart key to force re-render
       setChartKey(prev => prev + 1);
+      if (streamError) throw new Error(streamError);
     } catch (error: any) {
       console.error(error);
       alert(error.message || "An error occurred.");
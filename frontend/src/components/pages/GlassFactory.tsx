@@ -9,6 +9,7 @@ import ChartDisplay from "@/components/glassfactory/ChartDisplay";
 import DebugPanel from "@/components/glassfactory/DebugPanel";
 import SavedChartsList from "@/components/glassfactory/SavedChartsList";
 import ServerMetricsList from "@/components/glassfactory/ServerMetricsList";
+import { readNdjson } from "@/lib/ndjson";
 
 // Example code template
 const EXAMPLE_CODE = `# Available modules and functions:
@@ -16,17 +17,17 @@ const EXAMPLE_CODE = `# Available modules and functions:
 # - np (numpy)
 # - system() - returns strategy groups data
 # - quant_stats(strategy_name, strategy_data, benchmark_name, benchmark_data)
+#
+# Declare the data you need in REQUIRES and the runtime loads it once and binds it
+# to a variable of the same name: portfolio_returns, portfolio_prices, group_prices,
+# strategy_returns, benchmark_returns, category_prices, returns_matrix, strategy_groups
+REQUIRES = ["portfolio_returns"]
 
 import pandas as pd
 import numpy as np
 
-# Get data from system
-strategy_groups = system()
-portfolio_data = strategy_groups.get("portfolio")
-
-# Process the data
-processed_data = pd.to_numeric(portfolio_data, errors='coerce')
-processed_data = processed_data.dropna().pct_change().dropna()
+# Daily portfolio returns, supplied by the runtime
+processed_data = portfolio_returns
 
 # Create chart data structure for Chart.js
 dates = processed_data.index.strftime('%Y-%m-%d').tolist()
@@ -168,10 +169,22 @@ export default function GlassFactory() {
         headers: {
           "Content-Type": "application/json",
         },
-        body: JSON.stringify({ code: pythonCode }),
+        body: JSON.stringify({ code: pythonCode, maxPoints: Math.round(window.innerWidth), stream: true }),
       });
       
-      const data = await res.json();
+      // Printed lines arrive while the code is still running; the full payload comes last
+      let data: any = {};
+      let output = "";
+      await readNdjson(res, (record) => {
+        if (record.section === "stdout") {
+          output += record.line + "\n";
+          setResponse(output);
+        } else if (record.section === "result") {
+          data = record.data;
+        } else if (record.section === "error" || record.error) {
+          data = { error: record.error };
+        }
+      });
       
       if (data.error) {
         setErrorMessage(data.error);
@@ -1,10 +1,16 @@
 "use client";
 
 import React, { useEffect, useState } from "react";
-import Papa from "papaparse";
 import { Menubar, MenubarMenu, MenubarTrigger } from "@/components/ui/menubar";
 import Link from "next/link";
 import Image from "next/image";
+import {
+  Pagination,
+  PaginationContent,
+  PaginationItem,
+  PaginationNext,
+  PaginationPrevious,
+} from "@/components/ui/pagination";
 
 interface ContractMeta {
   "Databento Symbol": string;
@@ -30,49 +36,63 @@ interface ContractMeta {
   "Time of Expiry": string;
 }
 
+// Contracts per page, and how long typing must pause before the search is sent
+const PAGE_SIZE = 60;
+const SEARCH_DEBOUNCE_MS = 300;
+
 const Metadata: React.FC = () => {
   const [contracts, setContracts] = useState<ContractMeta[]>([]);
   const [loading, setLoading] = useState(true);
   const [query, setQuery] = useState("");
+  const [search, setSearch] = useState("");
+  const [page, setPage] = useState(1);
+  const [total, setTotal] = useState(0);
 
   useEffect(() => {
-    const fetchCSV = async () => {
-      try {
-        // 1. Call the Flask endpoint to ensure the CSV file is written.
-        // Adjust the URL as needed.
-        await fetch("http://127.0.0.1:5000/metadata");
+    // Wait for a pause in typing, then search from the first page
+    const timer = setTimeout(() => {
+      setSearch(query);
+      setPage(1);
+    }, SEARCH_DEBOUNCE_MS);
+    return () => clearTimeout(timer);
+  }, [query]);
 
-        // 2. After the CSV is written, fetch it from the public folder.
-        const response = await fetch("/metadata.csv");
-        const csvText = await response.text();
-
-        Papa.parse<ContractMeta>(csvText, {
-          header: true,
-          skipEmptyLines: true,
-          complete: (results) => {
-            setContracts(results.data);
-            setLoading(false);
-          },
+  useEffect(() => {
+    // Filtering and paging happen server-side against the cached metadata index.
+    const controller = new AbortController();
+    const fetchMetadata = async () => {
+      try {
+        const params = new URLSearchParams({
+          q: search,
+          page: String(page),
+          page_size: String(PAGE_SIZE),
         });
-      } catch (error) {
-        console.error("Error fetching or parsing CSV:", error);
+        const response = await fetch(
+          `http://127.0.0.1:5000/api/metadata?${params.toString()}`,
+          { signal: controller.signal }
+        );
+        const data = await response.json();
+        setContracts(data.records ?? []);
+        setTotal(data.total ?? 0);
+      } catch (error: any) {
+        if (error.name !== "AbortError") {
+          console.error("Error fetching metadata:", error);
+        }
+      } finally {
         setLoading(false);
       }
     };
 
-    fetchCSV();
-  }, []);
+    fetchMetadata();
+    return () => controller.abort();
+  }, [search, page]);
 
   if (loading) {
     return <div>Loading metadata...</div>;
   }
 
-  // Filter contracts by "Name" or "Databento Symbol"
-  const lowerQuery = query.toLowerCase();
-  const filteredContracts = contracts.filter((contract) =>
-    contract["Name"].toLowerCase().includes(lowerQuery) ||
-    contract["Databento Symbol"].toLowerCase().includes(lowerQuery)
-  );
+  const filteredContracts = contracts;
+  const pageCount = Math.max(1, Math.ceil(total / PAGE_SIZE));
 
   return (
     <div className="flex flex-col h-screen">
@@ -201,7 +221,40 @@ const Metadata: React.FC = () => {
           ))}
         </div>
       ) : (
-        <div>No contracts found for "{query}".</div>
+        <div>No contracts found for "{search}".</div>
+      )}
+      {total > PAGE_SIZE && (
+        <Pagination className="my-4">
+          <PaginationContent>
+            <PaginationItem>
+              <PaginationPrevious
+                href="#"
+                aria-disabled={page <= 1}
+                className={page <= 1 ? "pointer-events-none opacity-50" : ""}
+                onClick={(e) => {
+                  e.preventDefault();
+                  setPage((current) => Math.max(1, current - 1));
+                }}
+              />
+            </PaginationItem>
+            <PaginationItem>
+              <span className="px-4 text-sm">
+                Page {page} of {pageCount} ({total} contracts)
+              </span>
+            </PaginationItem>
+            <PaginationItem>
+              <PaginationNext
+                href="#"
+                aria-disabled={page >= pageCount}
+                className={page >= pageCount ? "pointer-events-none opacity-50" : ""}
+                onClick={(e) => {
+                  e.preventDefault();
+                  setPage((current) => Math.min(pageCount, current + 1));
+                }}
+              />
+            </PaginationItem>
+          </PaginationContent>
+        </Pagination>
       )}
     </div>
   );
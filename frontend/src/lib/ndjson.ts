@@ -0,0 +1,25 @@
+// Reads a newline-delimited JSON response, calling onRecord for each record as it arrives.
+export async function readNdjson(
+  response: Response,
+  onRecord: (record: any) => void
+): Promise<void> {
+  if (!response.body) {
+    const text = await response.text();
+    text.split("\n").filter(Boolean).forEach((line) => onRecord(JSON.parse(line)));
+    return;
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffered = "";
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffered += decoder.decode(value, { stream: true });
+    const lines = buffered.split("\n");
+    buffered = lines.pop() ?? "";
+    lines.filter(Boolean).forEach((line) => onRecord(JSON.parse(line)));
+  }
+  buffered += decoder.decode();
+  if (buffered.trim()) onRecord(JSON.parse(buffered));
+}